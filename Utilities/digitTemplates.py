@@ -0,0 +1,113 @@
+import os
+import numpy as np
+import cv2
+
+GLYPH_SIZE = (12, 20)  # Ancho x alto al que se normaliza cada carácter
+CHARACTERS = '0123456789.-'
+
+
+def segment_glyphs(roi_bw, min_pixels=2):
+    """Separa el ROI binarizado en caracteres por columnas vacías, de izquierda a derecha
+
+    Cada carácter se recorta a las filas de toda la línea de texto para que '.' y '-'
+    conserven su posición vertical. Devuelve una lista de arreglos booleanos.
+    """
+    fg = np.asarray(roi_bw) > 0
+    columns = fg.sum(axis=0)
+    used = columns > 0
+    edges = np.flatnonzero(np.diff(np.concatenate([[False], used, [False]]).astype(np.int8)))
+    runs = [(x0, x1) for x0, x1 in zip(edges[::2], edges[1::2]) if columns[x0:x1].sum() >= min_pixels]
+    if not runs:
+        return []
+    rows = np.flatnonzero(fg[:, runs[0][0]:runs[-1][1]].any(axis=1))
+    y0, y1 = rows[0], rows[-1] + 1
+    return [fg[y0:y1, x0:x1] for x0, x1 in runs]
+
+
+def glyph_vectors(glyphs):
+    """Matriz (caracteres x pixeles) normalizada a media cero y norma uno"""
+    vectors = np.array([cv2.resize(g.astype(np.float32), GLYPH_SIZE, interpolation=cv2.INTER_AREA).ravel()
+                        for g in glyphs], dtype=np.float32).reshape(len(glyphs), -1)
+    vectors -= vectors.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-6)
+
+
+def clean_label(text):
+    return ''.join(c for c in text if c in CHARACTERS)
+
+
+class DigitRecognizer:
+    """Reconocedor por plantillas de la fuente fija del overlay de la cámara
+
+    Las plantillas se aprenden de lecturas de Tesseract en las que el número de
+    caracteres coincide con el de la segmentación; cada carácter se clasifica por
+    correlación normalizada contra todas las plantillas a la vez.
+    """
+    def __init__(self, min_confidence=0.85, max_samples=30):
+        self.min_confidence = min_confidence
+        self.max_samples = max_samples  # Muestras por carácter antes de dejar de aprender
+        self.sums = {}
+        self.counts = {}
+        self._templates = None
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        recognizer = cls(**kwargs)
+        if os.path.exists(path):
+            with np.load(path) as data:
+                for char, total, count in zip(data['chars'], data['sums'], data['counts']):
+                    recognizer.sums[str(char)] = total
+                    recognizer.counts[str(char)] = int(count)
+        return recognizer
+
+    def save(self, path):
+        chars = sorted(self.sums)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, chars=np.array(chars),
+                     sums=np.array([self.sums[c] for c in chars], dtype=np.float32).reshape(len(chars), -1),
+                     counts=np.array([self.counts[c] for c in chars], dtype=np.int64))
+        os.replace(tmp_path, path)
+
+    def needs_samples(self):
+        digits = [self.counts.get(c, 0) for c in '0123456789']
+        return min(digits) < self.max_samples
+
+    def learn(self, roi_bw, text):
+        """Añade los caracteres de una lectura de Tesseract; False si no se pudo alinear"""
+        label = clean_label(text)
+        glyphs = segment_glyphs(roi_bw)
+        if not label or len(glyphs) != len(label):
+            return False
+        for char, vector in zip(label, glyph_vectors(glyphs)):
+            if self.counts.get(char, 0) >= self.max_samples:
+                continue
+            self.sums[char] = self.sums.get(char, 0) + vector
+            self.counts[char] = self.counts.get(char, 0) + 1
+            self._templates = None
+        return True
+
+    def templates(self):
+        """(caracteres, matriz de plantillas normalizadas)"""
+        if self._templates is None:
+            chars = sorted(self.sums)
+            if chars:
+                matrix = np.array([self.sums[c] / self.counts[c] for c in chars], dtype=np.float32)
+                matrix -= matrix.mean(axis=1, keepdims=True)
+                matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-6)
+            else:
+                matrix = np.empty((0, GLYPH_SIZE[0] * GLYPH_SIZE[1]), dtype=np.float32)
+            self._templates = (chars, matrix)
+        return self._templates
+
+    def recognize(self, roi_bw):
+        """(texto, confianza); la confianza es la peor correlación entre los caracteres"""
+        chars, matrix = self.templates()
+        glyphs = segment_glyphs(roi_bw)
+        if not chars or not glyphs:
+            return None, 0.0
+        scores = glyph_vectors(glyphs) @ matrix.T
+        best = scores.argmax(axis=1)
+        text = ''.join(chars[i] for i in best)
+        return text, float(scores[np.arange(len(best)), best].min())
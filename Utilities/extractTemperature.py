@@ -3,12 +3,123 @@ import pytesseract
 import pandas as pd
 import os
 import re
+import time
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image
+
+from roiDecode import decode_roi_gray, ROICache
+from digitTemplates import DigitRecognizer
+from ocrCache import OCRCache, OCR_CACHE_FILE, roi_key
+
+try:
+    import tesserocr  # API de Tesseract en proceso: evita lanzar un ejecutable por imagen
+except ImportError:
+    tesserocr = None
 
 # Configurar la ruta de Tesseract
 pytesseract.pytesseract.tesseract_cmd = 'C:/Program Files/Tesseract-OCR/tesseract.exe'
+OCR_CONFIG = '--psm 8 -c tessedit_char_whitelist=0123456789.-'
+ROI_KEYS = ('roi_x1', 'roi_y1', 'size_x', 'size_y')
+
+_tess_api = None  # Motor de Tesseract persistente del proceso (si hay tesserocr)
+_worker_recognizer = None
+_worker_roi_params = None
+_worker_ocr_cache = None
+
+def tesseract_text(roi_bw):
+    """Texto de Tesseract para el ROI, con el motor del proceso si está disponible"""
+    global _tess_api
+    if tesserocr is not None:
+        try:
+            if _tess_api is None:
+                _tess_api = tesserocr.PyTessBaseAPI(psm=tesserocr.PSM.SINGLE_WORD)
+                _tess_api.SetVariable('tessedit_char_whitelist', '0123456789.-')
+            _tess_api.SetImage(Image.fromarray(roi_bw))
+            return _tess_api.GetUTF8Text()
+        except RuntimeError:
+            pass
+    return pytesseract.image_to_string(roi_bw, config=OCR_CONFIG)
+
+def new_ocr_stats():
+    """Contadores de lecturas y tiempo por motor (caché / plantillas / Tesseract)"""
+    return {'cached': 0, 'templates': 0, 'tesseract': 0, 'time_templates': 0.0, 'time_tesseract': 0.0}
+
+def read_roi_temperature(roi_bw, recognizer=None, stats=None, ocr_cache=None):
+    """
+    Lee la temperatura del ROI binarizado
+    
+    Un ROI binarizado idéntico a uno ya leído reutiliza esa lectura (las hechas por
+    plantillas solo si hay reconocedor). Con un reconocedor por plantillas se usa su
+    lectura si la confianza es suficiente; si no, se recurre a Tesseract y la lectura
+    sirve para aprender nuevas plantillas.
+    
+    Args:
+        roi_bw: ROI binarizado
+        recognizer: DigitRecognizer opcional
+        stats: Diccionario de new_ocr_stats() a actualizar (opcional)
+        ocr_cache: OCRCache opcional con lecturas por contenido del ROI
+    
+    Returns:
+        float: Valor numérico de temperatura o None si no se puede extraer
+    """
+    if stats is None:
+        stats = new_ocr_stats()
+    if ocr_cache is None:
+        return _read_roi(roi_bw, recognizer, stats)[0]
+    key = roi_key(roi_bw)
+    found, value = ocr_cache.lookup(key, allow_templates=recognizer is not None)
+    if found:
+        stats['cached'] += 1
+        return value
+    value, engine = _read_roi(roi_bw, recognizer, stats)
+    ocr_cache.put(key, value, engine)
+    return value
+
+def _read_roi(roi_bw, recognizer, stats):
+    """(valor, motor que lo leyó)"""
+    if recognizer is not None:
+        start = time.perf_counter()
+        text, confidence = recognizer.recognize(roi_bw)
+        stats['time_templates'] += time.perf_counter() - start
+        value = extract_numeric_value(text) if text else None
+        if value is not None and confidence >= recognizer.min_confidence:
+            stats['templates'] += 1
+            return value, 'templates'
+    
+    start = time.perf_counter()
+    text = tesseract_text(roi_bw)
+    stats['time_tesseract'] += time.perf_counter() - start
+    stats['tesseract'] += 1
+    if recognizer is not None and recognizer.needs_samples():
+        recognizer.learn(roi_bw, text)
+    return extract_numeric_value(text), 'tesseract'
+
+def compare_with_tesseract(roi_bws, recognizer):
+    """
+    Compara el reconocedor por plantillas con Tesseract sobre una muestra de ROIs
+    
+    Returns:
+        dict: Coincidencias, lecturas aceptadas por plantillas y ms por imagen de cada motor
+    """
+    agree = accepted = 0
+    time_templates = time_tesseract = 0.0
+    for roi_bw in roi_bws:
+        start = time.perf_counter()
+        text, confidence = recognizer.recognize(roi_bw)
+        time_templates += time.perf_counter() - start
+        start = time.perf_counter()
+        reference = extract_numeric_value(tesseract_text(roi_bw))
+        time_tesseract += time.perf_counter() - start
+        if text and confidence >= recognizer.min_confidence:
+            accepted += 1
+            agree += extract_numeric_value(text) == reference
+    n = max(len(roi_bws), 1)
+    return {'samples': len(roi_bws), 'accepted': accepted, 'agree': agree,
+            'ms_templates': 1000 * time_templates / n, 'ms_tesseract': 1000 * time_tesseract / n}
 
-def extract_temperature_from_image(image_path, roi_x1=260, roi_y1=10, size_x=120, size_y=40, thresh=240, show_roi=False):
+def extract_temperature_from_image(image_path, roi_x1=260, roi_y1=10, size_x=120, size_y=40, thresh=240, show_roi=False,
+                                   roi_cache=None, recognizer=None, stats=None, ocr_cache=None):
     """
     Extrae la temperatura de una imagen usando OCR en una región específica (ROI)
     
@@ -18,18 +129,31 @@ def extract_temperature_from_image(image_path, roi_x1=260, roi_y1=10, size_x=120
         size_x, size_y: Tamaño del ROI
         thresh: Umbral para binarización
         show_roi: Si True, muestra la imagen con el ROI marcado
+        roi_cache: ROICache opcional con los ROIs ya decodificados
+        recognizer: DigitRecognizer opcional (Tesseract queda como respaldo)
+        stats: Contadores de new_ocr_stats() (opcional)
+        ocr_cache: OCRCache opcional con lecturas por contenido del ROI
     
     Returns:
         float: Valor numérico de temperatura o None si no se puede extraer
     """
     try:
-        # Leer la imagen
+        if not show_roi:
+            # Solo se decodifica el ROI (o se toma de la caché)
+            if roi_cache is not None:
+                roi_gray = roi_cache.get(image_path)
+            else:
+                roi_gray = decode_roi_gray(image_path, roi_x1, roi_y1, size_x, size_y)
+            roi_bw = cv2.threshold(roi_gray, thresh, 255, cv2.THRESH_BINARY)[1]
+            return read_roi_temperature(roi_bw, recognizer, stats, ocr_cache)
+        
+        # Leer la imagen completa para mostrarla
         frame = cv2.imread(image_path)
         if frame is None:
             print(f"Error: No se pudo cargar la imagen {image_path}")
             return None
         
-        # Si se solicita visualización, mostrar la imagen con el ROI
+        # Mostrar la imagen con el ROI
         if show_roi:
             frame_display = frame.copy()
             # Dibujar rectángulo del ROI
@@ -61,7 +185,7 @@ def extract_temperature_from_image(image_path, roi_x1=260, roi_y1=10, size_x=120
             cv2.destroyAllWindows()
         
         # Extraer texto con OCR
-        text = pytesseract.image_to_string(roi_bw, config='--psm 8 -c tessedit_char_whitelist=0123456789.-')
+        text = pytesseract.image_to_string(roi_bw, config=OCR_CONFIG)
         
         # Extraer solo el valor numérico
         temperature = extract_numeric_value(text)
@@ -98,7 +222,166 @@ def extract_numeric_value(text):
     
     return None
 
-def process_csv_with_temperature(csv_path, images_folder='cam2', output_csv=None, show_roi=False, roi_params=None):
+def init_ocr_worker(tesseract_cmd, roi_params, templates_path, ocr_cache_path=None):
+    """Prepara un proceso del pool: ruta de Tesseract, ROI, plantillas y caché de OCR cargadas una sola vez"""
+    global _worker_recognizer, _worker_roi_params, _worker_ocr_cache
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    _worker_roi_params = roi_params
+    _worker_recognizer = DigitRecognizer.load(templates_path) if templates_path else None
+    _worker_ocr_cache = OCRCache(ocr_cache_path) if ocr_cache_path else None
+
+def ocr_chunk(tasks):
+    """
+    Lee la temperatura de un bloque de imágenes en un proceso del pool
+    
+    Args:
+        tasks: Lista de (trabajo, fila, ruta, roi_gris en caché o None)
+    
+    Returns:
+        tuple: (lista de (trabajo, fila, ruta, temperatura, roi_gris decodificado o None), contadores,
+                errores, lecturas nuevas para la caché de OCR)
+    """
+    box = [_worker_roi_params[key] for key in ROI_KEYS]
+    stats = new_ocr_stats()
+    results = []
+    errors = []
+    for job, row, path, roi_gray in tasks:
+        try:
+            decoded = roi_gray is None
+            if decoded:
+                roi_gray = decode_roi_gray(path, *box)
+            roi_bw = cv2.threshold(roi_gray, _worker_roi_params['thresh'], 255, cv2.THRESH_BINARY)[1]
+            value = read_roi_temperature(roi_bw, _worker_recognizer, stats, _worker_ocr_cache)
+            results.append((job, row, path, value, roi_gray if decoded else None))
+        except Exception as e:
+            results.append((job, row, path, None, None))
+            errors.append(f"Error procesando {path}: {e}")
+    new_readings = _worker_ocr_cache.take_pending() if _worker_ocr_cache is not None else {}
+    return results, stats, errors, new_readings
+
+def bootstrap_recognizer(recognizer, tasks, roi_cache_of, roi_params, stats, ocr_cache=None, max_images=200):
+    """Aprende plantillas en el proceso principal con las primeras imágenes; devuelve sus lecturas"""
+    values = {}
+    for job, row, path in tasks[:max_images]:
+        if not recognizer.needs_samples():
+            break
+        try:
+            roi_gray = roi_cache_of[job].get(path)
+            roi_bw = cv2.threshold(roi_gray, roi_params['thresh'], 255, cv2.THRESH_BINARY)[1]
+            values[(job, row)] = read_roi_temperature(roi_bw, recognizer, stats, ocr_cache)
+        except Exception as e:
+            print(f"Error procesando {path}: {e}")
+            values[(job, row)] = None
+    return values
+
+def ocr_images_parallel(tasks, roi_cache_of, roi_params, workers=None, recognizer=None,
+                        templates_path=None, stats=None, chunk_size=64, ocr_cache=None):
+    """
+    Lee temperaturas con un pool de procesos que mantienen su motor de OCR cargado
+    
+    Args:
+        tasks: Lista de (trabajo, fila, ruta); trabajo identifica el CSV/carpeta
+        roi_cache_of: Diccionario trabajo -> ROICache de su carpeta de imágenes
+        roi_params: Parámetros del ROI (roi_x1, roi_y1, size_x, size_y, thresh)
+        workers: Número de procesos (por defecto, uno por núcleo)
+        recognizer: DigitRecognizer opcional; se completa en el proceso principal antes de repartir
+        templates_path: Archivo donde se guardan las plantillas que cargan los procesos
+        stats: Contadores de new_ocr_stats() a actualizar (opcional)
+        chunk_size: Imágenes por bloque enviado a cada proceso
+        ocr_cache: OCRCache opcional; los procesos la cargan y el principal guarda lo nuevo
+    
+    Returns:
+        dict: (trabajo, fila) -> temperatura o None
+    """
+    if stats is None:
+        stats = new_ocr_stats()
+    values = {}
+    if recognizer is not None:
+        values = bootstrap_recognizer(recognizer, tasks, roi_cache_of, roi_params, stats, ocr_cache)
+        recognizer.save(templates_path)
+    
+    # Imágenes con ROI ya decodificado y lectura en caché: se resuelven sin repartirlas
+    pending = []
+    for job, row, path in tasks:
+        if (job, row) in values:
+            continue
+        roi_gray = roi_cache_of[job].cached(path)
+        if roi_gray is not None and ocr_cache is not None:
+            roi_bw = cv2.threshold(roi_gray, roi_params['thresh'], 255, cv2.THRESH_BINARY)[1]
+            found, value = ocr_cache.lookup(roi_key(roi_bw), allow_templates=recognizer is not None)
+            if found:
+                stats['cached'] += 1
+                values[(job, row)] = value
+                continue
+        pending.append((job, row, path, roi_gray))  # El ROI en caché viaja con la tarea
+    if ocr_cache is not None:
+        ocr_cache.flush()  # Los procesos cargan la caché desde el archivo
+    if not pending:
+        print(f"Todas las imágenes resueltas sin OCR ({stats['cached']} desde la caché)")
+        return values
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    
+    total = len(tasks)
+    done = len(values)
+    failures = sum(value is None for value in values.values())
+    start = time.perf_counter()
+    print(f"Procesando {len(pending)} imágenes en bloques de {chunk_size}...")
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_ocr_worker,
+                             initargs=(pytesseract.pytesseract.tesseract_cmd, roi_params,
+                                       templates_path if recognizer is not None else None,
+                                       ocr_cache.path if ocr_cache is not None else None)) as executor:
+        futures = {executor.submit(ocr_chunk, chunk): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            try:
+                results, chunk_stats, errors, new_readings = future.result()
+            except Exception as e:
+                # El bloque completo cuenta como procesado y fallido
+                print(f"Error en un bloque: {e}")
+                results = [(job, row, path, None, None) for job, row, path, _ in futures[future]]
+                chunk_stats, errors, new_readings = new_ocr_stats(), [], {}
+            for job, row, path, value, roi_gray in results:
+                values[(job, row)] = value
+                failures += value is None
+                if roi_gray is not None:
+                    roi_cache_of[job].put(path, roi_gray)
+            for key in stats:
+                stats[key] += chunk_stats[key]
+            if ocr_cache is not None:
+                ocr_cache.merge(new_readings)
+            for error in errors[:3]:
+                print(f"  {error}")
+            done += len(results)
+            elapsed = time.perf_counter() - start
+            print(f"Procesadas {done}/{total} imágenes - {done / max(elapsed, 1e-9):.1f} img/s - "
+                  f"{failures} fallidas")
+    if ocr_cache is not None:
+        ocr_cache.flush()
+    return values
+
+def output_csv_for(csv_path):
+    """Ruta de salida por defecto: <nombre>_with_temperature.csv junto al CSV original"""
+    return Path(csv_path).parent / f"{Path(csv_path).stem}_with_temperature.csv"
+
+def save_with_temperature(df, temperatures, output_csv):
+    """Agrega la columna de temperatura, guarda el CSV y muestra estadísticas"""
+    df['temperature'] = temperatures
+    df.to_csv(output_csv, index=False)
+    print(f"\nResultado guardado en: {output_csv}")
+    
+    valid_temps = [t for t in temperatures if t is not None]
+    print(f"\nEstadísticas:")
+    print(f"- Total de imágenes procesadas: {len(temperatures)}")
+    print(f"- Temperaturas extraídas exitosamente: {len(valid_temps)}")
+    print(f"- Temperaturas fallidas: {len(temperatures) - len(valid_temps)}")
+    
+    if valid_temps:
+        print(f"- Temperatura promedio: {sum(valid_temps)/len(valid_temps):.2f}")
+        print(f"- Temperatura mínima: {min(valid_temps):.2f}")
+        print(f"- Temperatura máxima: {max(valid_temps):.2f}")
+
+def process_csv_with_temperature(csv_path, images_folder='cam2', output_csv=None, show_roi=False, roi_params=None,
+                                 use_templates=False, templates_path=None, compare_sample=50, workers=None,
+                                 use_ocr_cache=True):
     """
     Procesa el CSV agregando la columna de temperatura extraída de las imágenes
     
@@ -108,6 +391,11 @@ def process_csv_with_temperature(csv_path, images_folder='cam2', output_csv=None
         output_csv: Ruta del archivo CSV de salida (opcional)
         show_roi: Si True, muestra el ROI para cada imagen
         roi_params: Diccionario con parámetros del ROI (roi_x1, roi_y1, size_x, size_y, thresh)
+        use_templates: Si True, lee los dígitos por plantillas aprendidas de Tesseract
+        templates_path: Archivo .npz de plantillas (por defecto digit_templates.npz en la carpeta de imágenes)
+        compare_sample: Imágenes con las que se compara el reconocedor contra Tesseract al final
+        workers: Si se indica, procesa en paralelo con ese número de procesos (0 = uno por núcleo)
+        use_ocr_cache: Si True, reutiliza lecturas de ROIs idénticos (ocr_cache.sqlite en la carpeta de imágenes)
     """
     try:
         # Configurar parámetros del ROI
@@ -137,60 +425,77 @@ def process_csv_with_temperature(csv_path, images_folder='cam2', output_csv=None
         
         # Lista para almacenar las temperaturas
         temperatures = []
+        roi_box = {key: roi_params[key] for key in ROI_KEYS}
+        roi_cache = ROICache(str(images_path), **roi_box)
+        stats = new_ocr_stats()
+        recognizer = None
+        if use_templates:
+            if templates_path is None:
+                templates_path = str(images_path / 'digit_templates.npz')
+            recognizer = DigitRecognizer.load(templates_path)
+        ocr_cache = OCRCache(str(images_path / OCR_CACHE_FILE)) if use_ocr_cache else None
+        processed_paths = []
         
-        print("Procesando imágenes...")
-        if show_roi:
-            print("MODO VISUALIZACIÓN: Se mostrará el ROI para cada imagen")
-            print("Presiona cualquier tecla para avanzar a la siguiente imagen")
-        
-        # Procesar cada timestamp
-        for idx, timestamp in enumerate(df['timestamp']):
-            print(f"Procesando {idx+1}/{len(df)}: {timestamp}")
+        if workers is not None and not show_roi:
+            rows = [(idx, str(images_path / f"{timestamp}.jpg")) for idx, timestamp in enumerate(df['timestamp'])]
+            tasks = [(0, idx, path) for idx, path in rows if os.path.exists(path)]
+            print(f"Imágenes encontradas: {len(tasks)} de {len(rows)}")
+            values = ocr_images_parallel(tasks, {0: roi_cache}, roi_params, workers or None,
+                                         recognizer, templates_path, stats, ocr_cache=ocr_cache)
+            temperatures = [values.get((0, idx)) for idx in range(len(df))]
+            processed_paths = [path for _, _, path in tasks]
+        else:
+            print("Procesando imágenes...")
+            if show_roi:
+                print("MODO VISUALIZACIÓN: Se mostrará el ROI para cada imagen")
+                print("Presiona cualquier tecla para avanzar a la siguiente imagen")
             
-            # Construir la ruta de la imagen
-            image_filename = f"{timestamp}.jpg"
-            image_path = images_path / image_filename
+            # Procesar cada timestamp
+            for idx, timestamp in enumerate(df['timestamp']):
+                print(f"Procesando {idx+1}/{len(df)}: {timestamp}")
             
-            # Extraer temperatura
-            if image_path.exists():
-                temperature = extract_temperature_from_image(
-                    str(image_path), 
-                    show_roi=show_roi,
-                    **roi_params
-                )
-                temperatures.append(temperature)
+                # Construir la ruta de la imagen
+                image_filename = f"{timestamp}.jpg"
+                image_path = images_path / image_filename
+            
+                # Extraer temperatura
+                if image_path.exists():
+                    temperature = extract_temperature_from_image(
+                        str(image_path), 
+                        show_roi=show_roi,
+                        roi_cache=roi_cache,
+                        recognizer=recognizer,
+                        stats=stats,
+                        ocr_cache=ocr_cache,
+                        **roi_params
+                    )
+                    temperatures.append(temperature)
+                    processed_paths.append(str(image_path))
                 
-                if temperature is not None:
-                    print(f"  -> Temperatura extraída: {temperature}")
+                    if temperature is not None:
+                        print(f"  -> Temperatura extraída: {temperature}")
+                    else:
+                        print(f"  -> No se pudo extraer temperatura")
                 else:
-                    print(f"  -> No se pudo extraer temperatura")
-            else:
-                print(f"  -> Imagen no encontrada: {image_path}")
-                temperatures.append(None)
-        
-        # Agregar la columna de temperatura al DataFrame
-        df['temperature'] = temperatures
+                    print(f"  -> Imagen no encontrada: {image_path}")
+                    temperatures.append(None)
+            
+        # Guardar los ROIs decodificados para siguientes ejecuciones (p. ej. con otro umbral)
+        roi_cache.save()
+        if recognizer is not None:
+            recognizer.save(templates_path)
+        if ocr_cache is not None:
+            ocr_cache.flush()
+            print(f"Lecturas reutilizadas de la caché de OCR: {stats['cached']} ({len(ocr_cache)} ROIs distintos)")
         
         # Guardar el resultado en la misma carpeta que el CSV original
         if output_csv is None:
-            csv_dir = Path(csv_path).parent
-            csv_name = Path(csv_path).stem
-            output_csv = csv_dir / f"{csv_name}_with_temperature.csv"
-        
-        df.to_csv(output_csv, index=False)
-        print(f"\nResultado guardado en: {output_csv}")
+            output_csv = output_csv_for(csv_path)
+        save_with_temperature(df, temperatures, output_csv)
         
-        # Mostrar estadísticas
-        valid_temps = [t for t in temperatures if t is not None]
-        print(f"\nEstadísticas:")
-        print(f"- Total de imágenes procesadas: {len(temperatures)}")
-        print(f"- Temperaturas extraídas exitosamente: {len(valid_temps)}")
-        print(f"- Temperaturas fallidas: {len(temperatures) - len(valid_temps)}")
-        
-        if valid_temps:
-            print(f"- Temperatura promedio: {sum(valid_temps)/len(valid_temps):.2f}")
-            print(f"- Temperatura mínima: {min(valid_temps):.2f}")
-            print(f"- Temperatura máxima: {max(valid_temps):.2f}")
+        if recognizer is not None and not show_roi:
+            print_recognizer_report(stats, recognizer, roi_cache, processed_paths,
+                                    roi_params['thresh'], compare_sample)
         
         return df
         
@@ -198,6 +503,109 @@ def process_csv_with_temperature(csv_path, images_folder='cam2', output_csv=None
         print(f"Error procesando el CSV: {e}")
         return None
 
+def print_recognizer_report(stats, recognizer, roi_cache, image_paths, thresh, compare_sample):
+    """Muestra cuántas lecturas resolvió cada motor y la comparación contra Tesseract"""
+    print(f"\nReconocimiento por plantillas:")
+    print(f"- Lecturas reutilizadas de la caché de OCR: {stats['cached']}")
+    print(f"- Lecturas por plantillas: {stats['templates']}")
+    print(f"- Lecturas por Tesseract (respaldo/aprendizaje): {stats['tesseract']}")
+    if stats['tesseract']:
+        print(f"- Tesseract: {1000 * stats['time_tesseract'] / stats['tesseract']:.1f} ms/imagen")
+    total = stats['templates'] + stats['tesseract']
+    if total:
+        print(f"- Plantillas: {1000 * stats['time_templates'] / total:.2f} ms/imagen")
+    
+    if compare_sample and image_paths:
+        step = max(1, len(image_paths) // compare_sample)
+        sample = image_paths[::step][:compare_sample]
+        roi_bws = [cv2.threshold(roi_cache.get(path), thresh, 255, cv2.THRESH_BINARY)[1] for path in sample]
+        result = compare_with_tesseract(roi_bws, recognizer)
+        print(f"- Comparación con Tesseract en {result['samples']} imágenes: "
+              f"{result['agree']}/{result['accepted']} coincidencias entre las aceptadas, "
+              f"{result['ms_templates']:.2f} ms vs {result['ms_tesseract']:.1f} ms por imagen")
+
+def find_experiment_csvs(base_folder, images_subfolder='cam2'):
+    """data.csv de todos los experimentos bajo una carpeta de campaña que tienen carpeta de imágenes"""
+    found = []
+    for folder, dirs, files in os.walk(base_folder):
+        dirs.sort()
+        if 'data.csv' in files and os.path.isdir(os.path.join(folder, images_subfolder)):
+            found.append(os.path.join(folder, 'data.csv'))
+    return found
+
+def process_campaign_with_temperature(base_folder, images_subfolder='cam2', roi_params=None, workers=None,
+                                      use_templates=False, templates_path=None, chunk_size=64,
+                                      use_ocr_cache=True):
+    """
+    Extrae la temperatura de todos los experimentos de una campaña con un único pool de procesos
+    
+    Args:
+        base_folder: Carpeta de campaña (se buscan data.csv en todas sus subcarpetas)
+        images_subfolder: Subcarpeta de imágenes de cada experimento
+        roi_params: Diccionario con parámetros del ROI (roi_x1, roi_y1, size_x, size_y, thresh)
+        workers: Número de procesos (por defecto, uno por núcleo)
+        use_templates: Si True, lee los dígitos por plantillas compartidas por toda la campaña
+        templates_path: Archivo .npz de plantillas (por defecto digit_templates.npz en la campaña)
+        chunk_size: Imágenes por bloque enviado a cada proceso
+        use_ocr_cache: Si True, reutiliza lecturas de ROIs idénticos (ocr_cache.sqlite en la campaña)
+    
+    Returns:
+        list: Rutas de los CSV generados
+    """
+    if roi_params is None:
+        roi_params = {
+            'roi_x1': 260,
+            'roi_y1': 10,
+            'size_x': 120,
+            'size_y': 40,
+            'thresh': 240
+        }
+    
+    csv_paths = find_experiment_csvs(base_folder, images_subfolder)
+    print(f"Experimentos encontrados: {len(csv_paths)}")
+    
+    # Todas las imágenes de la campaña en una sola lista de tareas (trabajo = experimento)
+    frames, roi_cache_of, tasks = {}, {}, []
+    for job, csv_path in enumerate(csv_paths):
+        df = pd.read_csv(csv_path)
+        if 'timestamp' not in df.columns:
+            print(f"Se omite {csv_path}: no tiene columna 'timestamp'")
+            continue
+        images_path = Path(csv_path).parent / images_subfolder
+        frames[job] = df
+        roi_cache_of[job] = ROICache(str(images_path), **{key: roi_params[key] for key in ROI_KEYS})
+        for idx, timestamp in enumerate(df['timestamp']):
+            path = str(images_path / f"{timestamp}.jpg")
+            if os.path.exists(path):
+                tasks.append((job, idx, path))
+    
+    recognizer = None
+    if use_templates:
+        if templates_path is None:
+            templates_path = os.path.join(base_folder, 'digit_templates.npz')
+        recognizer = DigitRecognizer.load(templates_path)
+    
+    ocr_cache = OCRCache(os.path.join(base_folder, OCR_CACHE_FILE)) if use_ocr_cache else None
+    stats = new_ocr_stats()
+    start = time.perf_counter()
+    values = ocr_images_parallel(tasks, roi_cache_of, roi_params, workers, recognizer,
+                                 templates_path, stats, chunk_size, ocr_cache)
+    elapsed = time.perf_counter() - start
+    
+    outputs = []
+    for job, df in frames.items():
+        roi_cache_of[job].save()
+        print(f"\n=== {csv_paths[job]} ===")
+        output_csv = output_csv_for(csv_paths[job])
+        save_with_temperature(df, [values.get((job, idx)) for idx in range(len(df))], output_csv)
+        outputs.append(output_csv)
+    
+    failures = sum(value is None for value in values.values())
+    print(f"\nCampaña: {len(tasks)} imágenes en {elapsed:.1f} s ({len(tasks) / max(elapsed, 1e-9):.1f} img/s), "
+          f"{failures} fallidas; caché: {stats['cached']}, plantillas: {stats['templates']}, "
+          f"Tesseract: {stats['tesseract']}")
+    return outputs
+
 def adjust_roi_interactively(sample_image_path):
     """
     Función interactiva para ajustar el ROI visualmente
@@ -260,7 +668,7 @@ def adjust_roi_interactively(sample_image_path):
                 roi_display = cv2.resize(roi_bw, (roi_params['size_x']*3, roi_params['size_y']*3), interpolation=cv2.INTER_NEAREST)
                 
                 # Extraer texto
-                text = pytesseract.image_to_string(roi_bw, config='--psm 8 -c tessedit_char_whitelist=0123456789.-')
+                text = pytesseract.image_to_string(roi_bw, config=OCR_CONFIG)
                 temp_value = extract_numeric_value(text)
                 
                 # Mostrar resultado OCR
@@ -334,14 +742,15 @@ def main():
     print("1. Procesamiento normal (usa ROI por defecto)")
     print("2. Ajustar ROI interactivamente primero")
     print("3. Procesar con visualización del ROI (para verificar)")
+    print("4. Procesamiento rápido en paralelo (plantillas de dígitos, Tesseract como respaldo)")
     
     while True:
         try:
-            choice = input("Ingresa tu opción (1-3): ").strip()
-            if choice in ['1', '2', '3']:
+            choice = input("Ingresa tu opción (1-4): ").strip()
+            if choice in ['1', '2', '3', '4']:
                 break
             else:
-                print("Por favor ingresa 1, 2 o 3")
+                print("Por favor ingresa 1, 2, 3 o 4")
         except KeyboardInterrupt:
             print("\nOperación cancelada")
             return
@@ -365,7 +774,9 @@ def main():
     
     # Procesar
     print("Iniciando procesamiento...")
-    result_df = process_csv_with_temperature(csv_file, images_folder, show_roi=show_roi, roi_params=roi_params)
+    result_df = process_csv_with_temperature(csv_file, images_folder, show_roi=show_roi, roi_params=roi_params,
+                                             use_templates=(choice == '4'),
+                                             workers=0 if choice == '4' else None)
     
     if result_df is not None:
         print("\n¡Procesamiento completado exitosamente!")
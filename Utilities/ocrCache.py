@@ -0,0 +1,90 @@
+import os
+import sqlite3
+import hashlib
+import numpy as np
+
+OCR_CACHE_FILE = 'ocr_cache.sqlite'
+
+
+def roi_key(roi_bw):
+    """Hash del contenido del ROI binarizado (forma + pixeles encendidos)
+
+    No depende de la posición del ROI ni del umbral: si al cambiarlos el ROI binarizado
+    resulta idéntico, la lectura se reutiliza.
+    """
+    bits = np.packbits(np.asarray(roi_bw) > 0)
+    digest = hashlib.blake2b(np.array(np.shape(roi_bw), dtype=np.int32).tobytes(), digest_size=16)
+    digest.update(bits.tobytes())
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """Lecturas de OCR por contenido del ROI, en memoria y en un archivo sqlite
+
+    Cada lectura guarda el motor que la produjo ('templates' o 'tesseract'): las de
+    plantillas solo se sirven cuando se usan plantillas. Las lecturas fallidas no se
+    guardan, para volver a intentarlas.
+
+    Los procesos del pool cargan la caché y devuelven sus lecturas nuevas con
+    take_pending(); solo el proceso principal escribe el archivo con flush().
+    """
+    def __init__(self, path):
+        self.path = path
+        self.values = {}  # clave -> (valor, motor)
+        self.pending = {}  # Lecturas nuevas todavía no escritas
+        if os.path.exists(path):
+            try:
+                conn = sqlite3.connect(path)
+                try:
+                    # La tabla 'readings' anterior no registraba el motor y se ignora
+                    has_table = conn.execute("SELECT name FROM sqlite_master WHERE type='table' "
+                                             "AND name='ocr_readings'").fetchone()
+                    if has_table:
+                        self.values = {key: (value, engine) for key, value, engine in conn.execute(
+                            "SELECT key, value, engine FROM ocr_readings WHERE value IS NOT NULL")}
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                print(f"Caché de OCR ignorada ({e})")
+
+    def __len__(self):
+        return len(self.values)
+
+    def lookup(self, key, allow_templates=True):
+        """(encontrado, valor); sin allow_templates se ignoran las lecturas por plantillas"""
+        entry = self.values.get(key)
+        if entry is not None and (allow_templates or entry[1] == 'tesseract'):
+            return True, entry[0]
+        return False, None
+
+    def put(self, key, value, engine):
+        if value is None:
+            return
+        current = self.values.get(key)
+        if current is not None and current[1] == 'tesseract' and engine != 'tesseract':
+            return  # No reemplazar una lectura de Tesseract por una de plantillas
+        self.values[key] = (value, engine)
+        self.pending[key] = (value, engine)
+
+    def take_pending(self):
+        pending, self.pending = self.pending, {}
+        return pending
+
+    def merge(self, readings):
+        for key, (value, engine) in readings.items():
+            self.put(key, value, engine)
+
+    def flush(self):
+        """Escribe en el archivo las lecturas nuevas"""
+        if not self.pending:
+            return
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS ocr_readings "
+                             "(key TEXT PRIMARY KEY, value REAL, engine TEXT)")
+                conn.executemany("INSERT OR REPLACE INTO ocr_readings (key, value, engine) VALUES (?, ?, ?)",
+                                 [(key, value, engine) for key, (value, engine) in self.pending.items()])
+        finally:
+            conn.close()
+        self.pending = {}
@@ -0,0 +1,81 @@
+import os
+import numpy as np
+from PIL import Image
+
+ROI_CACHE_FILE = '.ocr_roi_cache.npz'
+
+
+def decode_roi_gray(image_path, roi_x1, roi_y1, size_x, size_y):
+    """ROI en escala de grises sin la conversión de color de la imagen completa
+
+    En JPEG se pide directamente la luminancia con Image.draft (misma escala), que usa
+    los mismos pesos que cv2.COLOR_BGR2GRAY; otros formatos se convierten a gris.
+    """
+    with Image.open(image_path) as img:
+        if img.format == 'JPEG':
+            img.draft('L', img.size)
+        # Recortado al borde de la imagen, igual que al indexar el arreglo completo
+        width, height = img.size
+        roi = img.crop((roi_x1, roi_y1, min(roi_x1 + size_x, width), min(roi_y1 + size_y, height)))
+        gray = np.asarray(roi if roi.mode == 'L' else roi.convert('L'))
+    return np.ascontiguousarray(gray)
+
+
+class ROICache:
+    """ROIs en gris por imagen, en memoria y en un .npz junto a las imágenes
+
+    Permite repetir la extracción con otro umbral sin volver a leer las imágenes.
+    Cada entrada se valida con el mtime del archivo; cambiar el ROI vacía la caché.
+    """
+    def __init__(self, folder, roi_x1, roi_y1, size_x, size_y):
+        self.path = os.path.join(folder, ROI_CACHE_FILE)
+        self.box = (roi_x1, roi_y1, size_x, size_y)
+        self.entries = {}  # nombre -> (mtime_ns, roi)
+        self.changed = False
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as cache:
+                if tuple(int(v) for v in cache['box']) != self.box:
+                    return
+                for name, mtime, roi in zip(cache['names'], cache['mtimes'], cache['rois']):
+                    self.entries[str(name)] = (int(mtime), roi)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Caché de ROI ignorada ({e})")
+
+    def cached(self, image_path):
+        """ROI guardado si sigue vigente, o None"""
+        entry = self.entries.get(os.path.basename(image_path))
+        if entry is not None and entry[0] == os.stat(image_path).st_mtime_ns:
+            return entry[1]
+        return None
+
+    def put(self, image_path, roi):
+        self.entries[os.path.basename(image_path)] = (os.stat(image_path).st_mtime_ns, roi)
+        self.changed = True
+
+    def get(self, image_path):
+        roi = self.cached(image_path)
+        if roi is None:
+            roi = decode_roi_gray(image_path, *self.box)
+            self.put(image_path, roi)
+        return roi
+
+    def save(self):
+        """Escribe la caché si hubo cambios (solo ROIs completos, apilables)"""
+        if not self.changed:
+            return
+        shape = (self.box[3], self.box[2])
+        items = [(name, mtime, roi) for name, (mtime, roi) in sorted(self.entries.items())
+                 if roi.shape == shape]
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, box=np.array(self.box),
+                     names=np.array([name for name, _, _ in items]),
+                     mtimes=np.array([mtime for _, mtime, _ in items], dtype=np.int64),
+                     rois=np.array([roi for _, _, roi in items], dtype=np.uint8).reshape(-1, *shape))
+        os.replace(tmp_path, self.path)
+        self.changed = False
@@ -0,0 +1,157 @@
+import os
+import cv2
+import cv2.aruco as aruco
+import numpy as np
+
+# Carpeta donde se guardan intrínsecos y tablas de remapeo (junto a este módulo,
+# no en el directorio de trabajo, para encontrarla sin importar desde dónde se lance)
+CALIBRATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Calibration')
+
+# Tableros disponibles en la GUI: nombre -> argumentos de CameraCalibrator. El GridBoard
+# usa 5x7 = 35 marcadores porque DICT_4X4_50 solo tiene 50.
+CALIBRATION_BOARDS = {
+    "Ajedrez 9x6": {'board_type': 'chessboard', 'pattern_size': (9, 6)},
+    "ArUco GridBoard 5x7": {'board_type': 'aruco', 'pattern_size': (5, 7)},
+}
+
+
+def calibration_path(camera_id, width, height, folder=CALIBRATION_DIR):
+    """Ruta del archivo de calibración para una cámara y resolución"""
+    return os.path.join(folder, f"cam{camera_id}_{width}x{height}.npz")
+
+
+class RectificationMaps:
+    """Tablas de remapeo (distorsión + inclinación) precalculadas para una cámara"""
+    def __init__(self, map1, map2):
+        self.map1 = map1
+        self.map2 = map2
+        self.height, self.width = map1.shape[:2]
+
+    def matches(self, image):
+        """Indica si las tablas corresponden a la resolución de la imagen"""
+        return image.shape[0] == self.height and image.shape[1] == self.width
+
+    def clip_roi(self, roi):
+        """Recorta el ROI (x, y, w, h) a los límites de la imagen rectificada"""
+        if roi is None:
+            return 0, 0, self.width, self.height
+        x, y, w, h = [int(v) for v in roi]
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(self.width, x + w), min(self.height, y + h)
+        if x1 <= x0 or y1 <= y0:
+            return 0, 0, self.width, self.height
+        return x0, y0, x1 - x0, y1 - y0
+
+    def remap_roi(self, image, roi=None):
+        """Rectifica solo el ROI indicado; regresa el recorte y su origen (x, y)"""
+        x, y, w, h = self.clip_roi(roi)
+        patch = cv2.remap(image, self.map1[y:y + h, x:x + w], self.map2[y:y + h, x:x + w],
+                          cv2.INTER_LINEAR)
+        return patch, (x, y)
+
+
+class CameraCalibrator:
+    """Acumula vistas de un tablero (ajedrez o ArUco) y calcula los intrínsecos"""
+    def __init__(self, board_type='chessboard', pattern_size=(9, 6), square_mm=10.0,
+                 aruco_dict=aruco.DICT_4X4_50, marker_mm=20.0, separation_mm=5.0):
+        self.board_type = board_type
+        self.pattern_size = pattern_size
+        self.object_points = []
+        self.image_points = []
+        self.image_size = None
+
+        if board_type == 'chessboard':
+            objp = np.zeros((pattern_size[0] * pattern_size[1], 3), np.float32)
+            objp[:, :2] = np.mgrid[0:pattern_size[0], 0:pattern_size[1]].T.reshape(-1, 2) * square_mm
+            self.chessboard_points = objp
+        else:
+            dictionary = aruco.getPredefinedDictionary(aruco_dict)
+            self.board = aruco.GridBoard(pattern_size, marker_mm, separation_mm, dictionary)
+            self.detector = aruco.ArucoDetector(dictionary, aruco.DetectorParameters())
+
+    def reset(self):
+        self.object_points = []
+        self.image_points = []
+        self.image_size = None
+
+    def add_view(self, image):
+        """Detecta el tablero en la imagen; regresa True si la vista se agregó"""
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        size = (gray.shape[1], gray.shape[0])
+        if self.image_size is not None and size != self.image_size:
+            return False
+
+        if self.board_type == 'chessboard':
+            flags = cv2.CALIB_CB_ADAPTIVE_THRESH + cv2.CALIB_CB_NORMALIZE_IMAGE + cv2.CALIB_CB_FAST_CHECK
+            found, corners = cv2.findChessboardCorners(gray, self.pattern_size, flags)
+            if not found:
+                return False
+            criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
+            corners = cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), criteria)
+            obj_points = self.chessboard_points
+        else:
+            corners, ids, _ = self.detector.detectMarkers(gray)
+            if ids is None or len(ids) < 4:
+                return False
+            obj_points, corners = self.board.matchImagePoints(corners, ids)
+            if obj_points is None or len(obj_points) < 16:
+                return False
+
+        self.object_points.append(obj_points.astype(np.float32))
+        self.image_points.append(corners.astype(np.float32))
+        self.image_size = size
+        return True
+
+    def calibrate(self, rectify_tilt=True):
+        """Calcula intrínsecos; la última vista define el plano de medición"""
+        if len(self.image_points) < 3:
+            raise ValueError("Se necesitan al menos 3 vistas del tablero")
+
+        rms, camera_matrix, dist_coeffs, rvecs, _ = cv2.calibrateCamera(
+            self.object_points, self.image_points, self.image_size, None, None)
+
+        # Rotación que deja el plano del tablero paralelo al sensor (corrige la inclinación)
+        rotation = np.eye(3)
+        if rectify_tilt:
+            board_rotation, _ = cv2.Rodrigues(rvecs[-1])
+            rotation = board_rotation.T
+
+        return {
+            'camera_matrix': camera_matrix,
+            'dist_coeffs': dist_coeffs,
+            'rotation': rotation,
+            'image_size': np.array(self.image_size),
+            'rms': rms
+        }
+
+
+def build_rectification_maps(calibration):
+    """Construye las tablas de initUndistortRectifyMap a partir de los intrínsecos"""
+    size = tuple(int(v) for v in calibration['image_size'])
+    new_matrix, _ = cv2.getOptimalNewCameraMatrix(
+        calibration['camera_matrix'], calibration['dist_coeffs'], size, 0)
+    map1, map2 = cv2.initUndistortRectifyMap(
+        calibration['camera_matrix'], calibration['dist_coeffs'], calibration['rotation'],
+        new_matrix, size, cv2.CV_16SC2)
+    return RectificationMaps(map1, map2)
+
+
+def save_calibration(camera_id, calibration, folder=CALIBRATION_DIR):
+    """Guarda intrínsecos y tablas de remapeo en disco; regresa las tablas"""
+    maps = build_rectification_maps(calibration)
+    os.makedirs(folder, exist_ok=True)
+    path = calibration_path(camera_id, maps.width, maps.height, folder)
+    np.savez(path, map1=maps.map1, map2=maps.map2, **calibration)
+    return maps
+
+
+def load_rectification(camera_id, width, height, folder=CALIBRATION_DIR):
+    """Carga las tablas de remapeo en caché; None si la cámara no está calibrada"""
+    path = calibration_path(camera_id, width, height, folder)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        if 'map1' in data and 'map2' in data:
+            return RectificationMaps(data['map1'], data['map2'])
+        calibration = {key: data[key] for key in data.files}
+    return save_calibration(camera_id, calibration, folder)
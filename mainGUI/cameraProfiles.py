@@ -0,0 +1,92 @@
+import os
+import json
+import time
+import cv2
+
+# Archivo con el modo negociado y los ajustes de cada cámara (junto a este módulo,
+# no en el directorio de trabajo)
+PROFILE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'camera_profiles.json')
+
+# Ajustes del driver que se guardan y se vuelven a aplicar sin abrir el diálogo.
+# Los modos automáticos van primero para que no sobrescriban los valores manuales.
+SETTING_PROPS = [
+    ('auto_exposure', cv2.CAP_PROP_AUTO_EXPOSURE),
+    ('auto_wb', cv2.CAP_PROP_AUTO_WB),
+    ('autofocus', cv2.CAP_PROP_AUTOFOCUS),
+    ('exposure', cv2.CAP_PROP_EXPOSURE),
+    ('gain', cv2.CAP_PROP_GAIN),
+    ('brightness', cv2.CAP_PROP_BRIGHTNESS),
+    ('contrast', cv2.CAP_PROP_CONTRAST),
+    ('saturation', cv2.CAP_PROP_SATURATION),
+    ('sharpness', cv2.CAP_PROP_SHARPNESS),
+    ('wb_temperature', cv2.CAP_PROP_WB_TEMPERATURE),
+    ('focus', cv2.CAP_PROP_FOCUS),
+    ('zoom', cv2.CAP_PROP_ZOOM),
+]
+
+
+def load_profiles(path=PROFILE_FILE):
+    """Carga los perfiles de cámara guardados (dict por id de cámara)"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_profiles(profiles, path=PROFILE_FILE):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(profiles, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def fourcc_to_str(value):
+    value = int(value)
+    return "".join(chr((value >> 8 * i) & 0xFF) for i in range(4))
+
+
+def read_mode(cap):
+    """Modo negociado realmente por el driver"""
+    return {
+        'fourcc': fourcc_to_str(cap.get(cv2.CAP_PROP_FOURCC)),
+        'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+    }
+
+
+def read_settings(cap):
+    """Ajustes actuales del driver (solo los que la cámara reporta)"""
+    settings = {}
+    for name, prop in SETTING_PROPS:
+        value = cap.get(prop)
+        if value != -1:
+            settings[name] = value
+    return settings
+
+
+def apply_settings(cap, settings):
+    for name, prop in SETTING_PROPS:
+        if name in settings:
+            cap.set(prop, settings[name])
+
+
+def open_camera(index, width, height, fourcc='MJPG', profile=None, backend=cv2.CAP_DSHOW):
+    """Abre la cámara con el modo del perfil (si existe); regresa (cap, modo, segundos)"""
+    start = time.perf_counter()
+    if profile:
+        fourcc = profile.get('fourcc', fourcc)
+        width = profile.get('width', width)
+        height = profile.get('height', height)
+
+    cap = cv2.VideoCapture(index, backend)
+    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter.fourcc(*fourcc))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    if profile and profile.get('settings'):
+        apply_settings(cap, profile['settings'])
+
+    mode = read_mode(cap) if cap.isOpened() else {}
+    return cap, mode, time.perf_counter() - start
@@ -0,0 +1,71 @@
+import cv2
+import numpy as np
+
+# Tamaño físico del ArUco de referencia (id 0)
+ARUCO_WIDTH_MM = 20
+ARUCO_HEIGHT_MM = 20
+REFERENCE_ID = 0
+
+kernel = np.ones((5, 5), np.uint8)
+
+
+def color_mask(image, mode, lower, upper):
+    """Máscara binaria del marcador de color en modo RGB o HSV"""
+    if mode == "RGB":
+        return cv2.inRange(image, np.array(lower), np.array(upper))
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    return cv2.inRange(hsv, np.array(lower), np.array(upper))
+
+
+def find_marker_centroid(mask):
+    """Centroide (cx, cy) del contorno más grande de la máscara o None"""
+    opening = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+    closing = cv2.morphologyEx(opening, cv2.MORPH_CLOSE, kernel)
+    contours, _ = cv2.findContours(closing, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+    largest = max(contours, key=cv2.contourArea)
+    M = cv2.moments(largest)
+    if M["m00"] == 0:
+        return None
+    return int(M["m10"] / M["m00"]), int(M["m01"] / M["m00"])
+
+
+def aruco_reference(corners, ids, width_mm=ARUCO_WIDTH_MM, height_mm=ARUCO_HEIGHT_MM):
+    """Escala [px/mm vertical, px/mm horizontal] y centro [y, x] del ArUco de referencia"""
+    if ids is None:
+        return None, None
+    x_scale = []
+    y_scale = []
+    center = None
+    for i, marker_id in enumerate(ids.flatten()):
+        if marker_id != REFERENCE_ID:
+            continue
+        pts = corners[i][0]
+        if (pts[3][0] - pts[0][0]) > 0 and (pts[2][0] - pts[1][0]) > 0:
+            x_scale.append((pts[1][1] - pts[0][1]) / width_mm)
+            x_scale.append((pts[2][1] - pts[3][1]) / width_mm)
+            y_scale.append((pts[3][0] - pts[0][0]) / height_mm)
+            y_scale.append((pts[2][0] - pts[1][0]) / height_mm)
+        center = [np.mean(pts[:, 1]), np.mean(pts[:, 0])]
+    if not x_scale:
+        return None, center
+    return [sum(x_scale) / len(x_scale), sum(y_scale) / len(y_scale)], center
+
+
+def deflection_mm(center, cx, scale):
+    """Distancia horizontal en mm entre el ArUco de referencia y el marcador de color"""
+    return (center[1] - cx) * (1 / scale[1])
+
+
+def measure_deflection(image, detector, mode, lower, upper, last_scale=None):
+    """Mide la distancia cruda en un cuadro; regresa (distancia_mm o None, escala usada)"""
+    centroid = find_marker_centroid(color_mask(image, mode, lower, upper))
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    corners, ids, _ = detector.detectMarkers(gray)
+    scale, center = aruco_reference(corners, ids)
+    if scale is None:
+        scale = last_scale
+    if centroid is None or center is None or scale is None:
+        return None, scale
+    return deflection_mm(center, centroid[0], scale), scale
@@ -0,0 +1,212 @@
+import os
+import json
+import time
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+# Archivo donde se guarda la cola (sobrevive a un reinicio de la GUI); junto a este
+# módulo para encontrarla sin importar desde qué directorio se lance la GUI
+QUEUE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scheduler_queue.json')
+
+
+def expand_protocol(protocol):
+    """Convierte los pasos de un protocolo en una lista plana de acciones"""
+    actions = []
+    for step in protocol.get('steps', []):
+        step_type = step.get('type')
+        repeat = int(step.get('repeat', 1))
+        if step_type == 'cycles':
+            for _ in range(int(step['n']) * repeat):
+                actions.append({'type': 'run', 'active_ms': int(step['active_ms']),
+                                'rest_ms': int(step['rest_ms'])})
+        elif step_type == 'ramp':
+            start = int(step['active_start_ms'])
+            stop = int(step['active_stop_ms'])
+            increment = int(step['active_step_ms'])
+            if increment == 0 or (stop - start) * increment < 0:
+                raise ValueError(f"Rampa inválida en protocolo '{protocol.get('name')}'")
+            values = list(range(start, stop + (1 if increment > 0 else -1), increment))
+            for _ in range(repeat):
+                for active in values:
+                    for _ in range(int(step.get('cycles_per_value', 1))):
+                        actions.append({'type': 'run', 'active_ms': active,
+                                        'rest_ms': int(step['rest_ms'])})
+        elif step_type == 'wait':
+            for _ in range(repeat):
+                actions.append({'type': 'wait',
+                                'until_below_C': step.get('until_below_C'),
+                                'key': step.get('key', 'temp_mosfet_C'),
+                                'min_s': float(step.get('min_s', 0)),
+                                'timeout_s': float(step.get('timeout_s', 3600))})
+        else:
+            raise ValueError(f"Tipo de paso desconocido: {step_type}")
+    return actions
+
+
+class ExperimentScheduler(QObject):
+    """Ejecuta sin supervisión una cola de protocolos de ciclos, rampas y pausas"""
+    run_requested = pyqtSignal(int, int, str)   # tiempo activo, tiempo de reposo, nombre de corrida
+    status_request = pyqtSignal()               # pide el estado/temperatura al Arduino
+    status_signal = pyqtSignal(str)
+    queue_finished_signal = pyqtSignal()
+
+    def __init__(self, queue_path=QUEUE_FILE, poll_ms=1000, gap_ms=500):
+        super().__init__()
+        self.queue_path = queue_path
+        self.gap_ms = gap_ms
+        self.protocols = []
+        self.active = False
+        self.waiting = None
+        self.last_values = {}
+        self.max_retries = 3
+        self.retries = 0  # Reintentos de la acción actual tras una corrida interrumpida
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(poll_ms)
+        self.poll_timer.timeout.connect(self._poll_wait)
+        self.load()
+
+    # --- Persistencia de la cola ---
+    def load(self):
+        if os.path.exists(self.queue_path):
+            with open(self.queue_path) as f:
+                self.protocols = json.load(f).get('protocols', [])
+
+    def save(self):
+        tmp_path = self.queue_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'protocols': self.protocols}, f, indent=2)
+        os.replace(tmp_path, self.queue_path)
+
+    def add_protocols_from_file(self, path):
+        """Agrega a la cola los protocolos de un archivo JSON (uno o una lista)"""
+        with open(path) as f:
+            content = json.load(f)
+        protocols = content if isinstance(content, list) else content.get('protocols', [content])
+        for protocol in protocols:
+            actions = expand_protocol(protocol)
+            self.protocols.append({
+                'name': protocol.get('name', f"protocolo{len(self.protocols) + 1}"),
+                'steps': protocol.get('steps', []),
+                'total_actions': len(actions),
+                'next_action': 0,
+                'status': 'pending'
+            })
+        self.save()
+        self.status_signal.emit(self.describe())
+
+    def clear(self):
+        if self.active:
+            return
+        self.protocols = []
+        self.save()
+        self.status_signal.emit(self.describe())
+
+    def has_pending(self):
+        return any(p['status'] != 'done' for p in self.protocols)
+
+    def describe(self):
+        lines = []
+        for p in self.protocols:
+            lines.append(f"{p['name']}: {p['status']} ({p['next_action']}/{p['total_actions']})")
+        return "\n".join(lines) if lines else "Cola vacía"
+
+    # --- Ejecución ---
+    def start(self):
+        if self.active or not self.has_pending():
+            return False
+        self.active = True
+        self.retries = 0
+        self._advance()
+        return True
+
+    def stop(self):
+        self.active = False
+        self.waiting = None
+        self.poll_timer.stop()
+        self.status_signal.emit("Cola detenida\n" + self.describe())
+
+    def _current(self):
+        for p in self.protocols:
+            if p['status'] != 'done':
+                return p
+        return None
+
+    def _advance(self):
+        if not self.active:
+            return
+        protocol = self._current()
+        if protocol is None:
+            self.active = False
+            self.status_signal.emit("Cola terminada\n" + self.describe())
+            self.queue_finished_signal.emit()
+            return
+
+        actions = expand_protocol(protocol)
+        if protocol['next_action'] >= len(actions):
+            protocol['status'] = 'done'
+            self.save()
+            self._advance()
+            return
+
+        protocol['status'] = 'running'
+        self.save()
+        action = actions[protocol['next_action']]
+        if action['type'] == 'run':
+            run_name = f"{protocol['name']}_{protocol['next_action'] + 1:04d}"
+            self.status_signal.emit(f"Corrida {run_name}: activo {action['active_ms']} ms, "
+                                    f"reposo {action['rest_ms']} ms\n" + self.describe())
+            self.run_requested.emit(action['active_ms'], action['rest_ms'], run_name)
+        else:
+            self.waiting = dict(action, started=time.time())
+            self.last_values.pop(action['key'], None)
+            self.status_signal.emit(f"Pausa en {protocol['name']} hasta recuperar temperatura\n"
+                                    + self.describe())
+            self.poll_timer.start()
+
+    def _complete_action(self):
+        self.retries = 0
+        protocol = self._current()
+        if protocol is not None:
+            protocol['next_action'] += 1
+            if protocol['next_action'] >= protocol['total_actions']:
+                protocol['status'] = 'done'
+            self.save()
+        QTimer.singleShot(self.gap_ms, self._advance)
+
+    def on_run_finished(self, completed=True, retry=False):
+        """Llamado por la GUI al terminar una corrida (TERMINATED) o al abortarla
+
+        Con `retry` (corrida interrumpida, p. ej. por un reinicio del Arduino) la misma
+        acción se repite hasta max_retries veces antes de detener la cola.
+        """
+        if not self.active or self.waiting is not None:
+            return
+        if completed:
+            self._complete_action()
+        elif retry and self.retries < self.max_retries:
+            self.retries += 1
+            self.status_signal.emit(f"Corrida interrumpida, reintento {self.retries} de {self.max_retries}")
+            QTimer.singleShot(self.gap_ms, self._advance)
+        else:
+            self.stop()
+
+    def on_sensor_data(self, data):
+        for key, value in data.items():
+            if isinstance(value, (int, float)):
+                self.last_values[key] = value
+
+    def _poll_wait(self):
+        if self.waiting is None:
+            self.poll_timer.stop()
+            return
+        self.status_request.emit()
+        elapsed = time.time() - self.waiting['started']
+        value = self.last_values.get(self.waiting['key'])
+        threshold = self.waiting['until_below_C']
+        recovered = threshold is None or (value is not None and value <= threshold)
+        if (recovered and elapsed >= self.waiting['min_s']) or elapsed >= self.waiting['timeout_s']:
+            if not recovered:
+                self.status_signal.emit("Tiempo máximo de pausa alcanzado, continuando")
+            self.waiting = None
+            self.poll_timer.stop()
+            self._complete_action()
@@ -14,47 +14,63 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QH
                            QFrame, QGroupBox, QDoubleSpinBox, QInputDialog, QDialog, QVBoxLayout,
                            QDialogButtonBox,QLineEdit,QSlider)
 from PyQt5.QtGui import QPixmap, QImage, QFont, QIcon
-from PyQt5.QtCore import Qt, QTimer, pyqtSlot, QSize, QThread, pyqtSignal
+from PyQt5.QtCore import Qt, QTimer, pyqtSlot, QSize, QThread, pyqtSignal, QMutex
 import numpy as np
+from cameraCalibration import (CALIBRATION_DIR, CALIBRATION_BOARDS, CameraCalibrator, load_rectification,
+                               save_calibration)
+from deflectionTracking import find_marker_centroid, aruco_reference, deflection_mm, color_mask
+from experimentScheduler import ExperimentScheduler
+from cameraProfiles import open_camera, read_mode, read_settings, load_profiles, save_profiles
 kernel = np.ones((5,5),np.uint8)
 class VideoCapture(QThread):
     change_pixmap_signal = pyqtSignal(np.ndarray, int)
+    opened_signal = pyqtSignal(int, dict)  # id de cámara, modo negociado y tiempos
     
-    def __init__(self, camera_id):
+    def __init__(self, camera_id, profile=None, width=1024, height=576, fps_frames=30):
         super().__init__()
         self.camera_id = camera_id
         self.running = True
+        self.profile = profile
+        self.width = width
+        self.height = height
+        self.fps_frames = fps_frames
+        self.show_settings_requested = False
+        self.final_settings = None
         
     def run(self):
-              
-        if self.camera_id == 1:
-            cap = self.init_videocapture(self.camera_id,1024,576)
-            cap.set(cv2.CAP_PROP_SETTINGS,1)
-        else:
-            cap = self.init_videocapture(self.camera_id,1024,576)
-            #cap = cv2.VideoCapture(self.camera_id,cv2.CAP_DSHOW)
-            cap.set(cv2.CAP_PROP_SETTINGS,1)
-        #if self.camera_id == 0:
-        #    cap.set(cv2.CAP_PROP_SETTINGS,1)
+        # Cada hilo abre su cámara, así que las cámaras se abren en paralelo
+        cap, mode, open_s = open_camera(self.camera_id, self.width, self.height, profile=self.profile)
         
         if not cap.isOpened():
             print(f"Error: No se pudo abrir la cámara {self.camera_id}")
+            self.opened_signal.emit(self.camera_id, {})
             return
-            
+
+        # El diálogo del driver solo se muestra si la cámara no tiene perfil guardado
+        if not (self.profile and self.profile.get('settings')):
+            cap.set(cv2.CAP_PROP_SETTINGS, 1)
+
+        frame_times = []
         while self.running:
+            if self.show_settings_requested:
+                self.show_settings_requested = False
+                cap.set(cv2.CAP_PROP_SETTINGS, 1)
             ret, frame = cap.read()
             if ret:
+                # Medir los FPS alcanzados en los primeros cuadros
+                if len(frame_times) <= self.fps_frames:
+                    frame_times.append(time.perf_counter())
+                    if len(frame_times) == self.fps_frames + 1:
+                        fps = self.fps_frames / (frame_times[-1] - frame_times[0])
+                        self.opened_signal.emit(self.camera_id, dict(mode, fps=round(fps, 2), open_s=open_s))
                 self.change_pixmap_signal.emit(frame, self.camera_id)
             #time.sleep(0.03)  # Limitar la velocidad de captura
             
+        self.final_settings = dict(read_mode(cap), settings=read_settings(cap))
         cap.release()
-    
-    def init_videocapture(self,index,width, height):
-        camera = cv2.VideoCapture(index, cv2.CAP_DSHOW)
-        camera.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter.fourcc('M', 'J', 'P', 'G'))
-        camera.set(cv2.CAP_PROP_FRAME_WIDTH, width)
-        camera.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
-        return camera
+
+    def request_settings_dialog(self):
+        self.show_settings_requested = True
 
     def stop(self):
         self.running = False
@@ -64,15 +80,34 @@ class SerialThread(QThread):
     received_data_signal = pyqtSignal(str)
     connection_status_signal = pyqtSignal(bool, str)
     json_data_signal = pyqtSignal(dict)
+    link_lost_signal = pyqtSignal(str)
+    link_restored_signal = pyqtSignal(str)
     
     def __init__(self):
         super().__init__()
         self.serial_port = None
         self.running = False
+        self.port_name = None
+        self.baudrate = None
+        self.device_id = None  # (vid, pid, serial_number) del puerto para re-detectarlo
+        self.max_backoff = 10.0
+        # Tras reabrir el puerto el Arduino se reinicia (DTR) y descarta lo que llegue
+        # mientras arranca, así que STATUS se reenvía hasta recibir respuesta
+        self.status_interval = 2.0
+        self.status_timeout = 20.0
+        self.status_retry_at = None
+        self.status_deadline = None
+        self.port_mutex = QMutex()  # Evita reabrir el puerto mientras stop() lo cierra
         
     def connect_serial(self, port, baudrate):
         try:
             self.serial_port = serial.Serial(port, baudrate, timeout=1)
+            self.port_name = port
+            self.baudrate = baudrate
+            self.device_id = None
+            for info in serial.tools.list_ports.comports():
+                if info.device == port and info.vid is not None:
+                    self.device_id = (info.vid, info.pid, info.serial_number)
             self.connection_status_signal.emit(True, f"Conexión establecida en {port} a {baudrate} baudios")
             self.running = True
             return True
@@ -81,8 +116,14 @@ class SerialThread(QThread):
             return False
             
     def run(self):
-        while self.running and self.serial_port:
+        while self.running:
+            if self.serial_port is None or not self.serial_port.is_open:
+                if not self.reconnect():
+                    break
+                continue
             try:
+                if self.status_retry_at is not None and time.time() >= self.status_retry_at:
+                    self.poll_status()
                 if self.serial_port.in_waiting > 0:
                     data = self.serial_port.readline().decode('utf-8').strip()
                     self.received_data_signal.emit(data)
@@ -90,15 +131,80 @@ class SerialThread(QThread):
                     # Intentar procesar como JSON
                     try:
                         json_data = json.loads(data)
+                        if "state" in json_data:
+                            self.status_retry_at = None
                         self.json_data_signal.emit(json_data)
                     except json.JSONDecodeError:
                         pass
                         
             except Exception as e:
+                if not self.running:
+                    break
                 self.received_data_signal.emit(f"Error: {str(e)}")
-                break
+                self.link_lost_signal.emit(str(e))
+                self.close_port()
+                continue
                 
             time.sleep(0.01)
+
+    def find_port(self):
+        # Re-detectar el Arduino por VID/PID/número de serie (el nombre del puerto puede cambiar)
+        ports = serial.tools.list_ports.comports()
+        if self.device_id is not None:
+            for info in ports:
+                if (info.vid, info.pid, info.serial_number) == self.device_id:
+                    return info.device
+        for info in ports:
+            if info.device == self.port_name:
+                return info.device
+        return None
+
+    def reconnect(self):
+        # Reintentar la conexión con espera exponencial hasta que se detenga el hilo
+        delay = 0.5
+        while self.running:
+            port = self.find_port()
+            if port is not None:
+                self.port_mutex.lock()
+                try:
+                    if not self.running:
+                        return False  # stop() llegó mientras se buscaba el puerto
+                    self.serial_port = serial.Serial(port, self.baudrate, timeout=1)
+                    self.port_name = port
+                except Exception:
+                    self.serial_port = None
+                finally:
+                    self.port_mutex.unlock()
+                if self.serial_port is not None:
+                    self.link_restored_signal.emit(port)
+                    # Preguntar al firmware en qué estado quedó, cuando termine de arrancar
+                    self.status_deadline = time.time() + self.status_timeout
+                    self.status_retry_at = time.time() + self.status_interval
+                    return True
+            waited = 0.0
+            while self.running and waited < delay:
+                time.sleep(0.1)
+                waited += 0.1
+            delay = min(delay * 2, self.max_backoff)
+        return False
+
+    def poll_status(self):
+        # Reenviar STATUS hasta que el firmware responda o se agote el tiempo
+        now = time.time()
+        if now >= self.status_deadline:
+            self.status_retry_at = None
+            self.received_data_signal.emit("Sin respuesta a STATUS tras reconectar")
+            return
+        self.write_data("STATUS\n")
+        self.status_retry_at = now + self.status_interval
+
+    def close_port(self):
+        try:
+            if self.serial_port and self.serial_port.is_open:
+                self.serial_port.close()
+        except Exception:
+            pass
+        self.serial_port = None
             
     def write_data(self, data):
         if self.serial_port and self.serial_port.is_open:
@@ -111,9 +217,13 @@ class SerialThread(QThread):
         return False
         
     def stop(self):
-        self.running = False
-        if self.serial_port and self.serial_port.is_open:
-            self.serial_port.close()
+        self.port_mutex.lock()
+        try:
+            self.running = False
+            if self.serial_port and self.serial_port.is_open:
+                self.serial_port.close()
+        finally:
+            self.port_mutex.unlock()
         self.wait()
 
 
@@ -142,6 +252,15 @@ class SMACharacterizationApp(QMainWindow):
         self.aruco_detector = aruco.ArucoDetector(self.aruco_dict, self.aruco_parameters)
         self.distance_Y = 0.0
         self.zero_deformation = 0.0
+        self.scale_aux = None
+        self.cx = None
+        self.cy = None
+
+        # Calibración de cámara (distorsión e inclinación)
+        self.camera_calibrator = CameraCalibrator(**next(iter(CALIBRATION_BOARDS.values())))
+        self.rectification_maps = {}  # (camera_id, ancho, alto) -> tablas de remapeo o None
+        self.measure_roi = None  # ROI de medición en coordenadas rectificadas
+        self.measure_roi_margin = 60
 
 
         self.debug = False
@@ -165,9 +284,23 @@ class SMACharacterizationApp(QMainWindow):
         self.serial_thread.received_data_signal.connect(self.on_data_received)
         self.serial_thread.connection_status_signal.connect(self.on_connection_status)
         self.serial_thread.json_data_signal.connect(self.on_json_data_received)
+        self.serial_thread.link_lost_signal.connect(self.on_link_lost)
+        self.serial_thread.link_restored_signal.connect(self.on_link_restored)
+        self.last_seq = None
+        self.last_timestamp = None
+        self.pending_gap = None
+
+        # Programador de experimentos (cola persistente de protocolos)
+        self.scheduler = ExperimentScheduler()
+        self.scheduler.run_requested.connect(self.start_scheduled_run)
+        self.scheduler.status_request.connect(self.request_device_status)
+        self.scheduler.status_signal.connect(self.on_scheduler_status)
+        self.scheduler.queue_finished_signal.connect(self.on_queue_finished)
         
         # Configurar la interfaz
         self.setup_ui()
+        if self.scheduler.has_pending():
+            self.terminal.append("Cola de protocolos pendiente restaurada. Presione 'Iniciar cola' para continuar.")
         
         # Iniciar captura de cámaras
         self.init_cameras()
@@ -390,7 +523,24 @@ class SMACharacterizationApp(QMainWindow):
         self.toggle_aruco.clicked.connect(self.toggle_aruco_detection)
         calibration_layout.addWidget(self.toggle_aruco, 4, 1)
 
-        calibration_layout.setRowStretch(5, 1)
+        self.board_combo = QComboBox()
+        self.board_combo.addItems(list(CALIBRATION_BOARDS))
+        self.board_combo.currentTextChanged.connect(self.change_calibration_board)
+        calibration_layout.addWidget(self.board_combo, 5, 1)
+
+        self.capture_board_btn = QPushButton("Capturar tablero de calibración")
+        self.capture_board_btn.clicked.connect(self.capture_calibration_board)
+        calibration_layout.addWidget(self.capture_board_btn, 6, 1)
+
+        self.calibrate_camera_btn = QPushButton("Calcular calibración de cámara")
+        self.calibrate_camera_btn.clicked.connect(self.calibrate_camera)
+        calibration_layout.addWidget(self.calibrate_camera_btn, 7, 1)
+
+        self.camera_settings_btn = QPushButton("Ajustes de cámaras")
+        self.camera_settings_btn.clicked.connect(self.show_camera_settings)
+        calibration_layout.addWidget(self.camera_settings_btn, 8, 1)
+
+        calibration_layout.setRowStretch(9, 1)
         
         self.tabs.addTab(calibration_tab, "Calibración")
 #-----------------------------------------------------------------------------------------------------
@@ -435,6 +585,30 @@ class SMACharacterizationApp(QMainWindow):
         filter_tab.setLayout(filter_layout)
         self.tabs.addTab(filter_tab, "Filtro de Color")
 #-----------------------------------------------------------------------------------------------------
+        # Tab 4: Programador de experimentos
+        scheduler_tab = QWidget()
+        scheduler_layout = QGridLayout(scheduler_tab)
+
+        self.load_protocol_btn = QPushButton("Cargar protocolo...")
+        self.load_protocol_btn.clicked.connect(self.load_protocol)
+        scheduler_layout.addWidget(self.load_protocol_btn, 0, 0)
+
+        self.start_queue_btn = QPushButton("Iniciar cola")
+        self.start_queue_btn.clicked.connect(self.toggle_queue)
+        self.start_queue_btn.setEnabled(False)
+        scheduler_layout.addWidget(self.start_queue_btn, 0, 1)
+
+        self.clear_queue_btn = QPushButton("Limpiar cola")
+        self.clear_queue_btn.clicked.connect(self.clear_queue)
+        scheduler_layout.addWidget(self.clear_queue_btn, 0, 2)
+
+        self.queue_view = QTextEdit()
+        self.queue_view.setReadOnly(True)
+        self.queue_view.setText(self.scheduler.describe())
+        scheduler_layout.addWidget(self.queue_view, 1, 0, 1, 3)
+
+        self.tabs.addTab(scheduler_tab, "Programador")
+#-----------------------------------------------------------------------------------------------------
 
         bottom_splitter.addWidget(self.tabs)
         main_layout.addWidget(bottom_splitter, 1)
@@ -479,12 +653,54 @@ class SMACharacterizationApp(QMainWindow):
         self.refresh_ports()
 
     def init_cameras(self):
-        # Iniciar captura de las cámaras
+        # Iniciar captura de las cámaras (en paralelo, con el perfil guardado de cada una)
+        self.camera_profiles = load_profiles()
+        self.camera_startup = time.perf_counter()
+        self.cameras_pending = {1, 2}
         for i in [1,2]:
-            thread = VideoCapture(i)
+            thread = VideoCapture(i, profile=self.camera_profiles.get(str(i)))
             thread.change_pixmap_signal.connect(self.update_camera)
+            thread.opened_signal.connect(self.on_camera_opened)
             thread.start()
             self.camera_threads.append(thread)
+
+    def on_camera_opened(self, camera_id, mode):
+        if mode:
+            self.terminal.append(f"Cámara {camera_id}: {mode['fourcc']} {mode['width']}x{mode['height']} "
+                                 f"a {mode['fps']:.1f} FPS (apertura {mode['open_s']:.2f} s)")
+            profile = self.camera_profiles.setdefault(str(camera_id), {})
+            profile.update(fourcc=mode['fourcc'], width=mode['width'], height=mode['height'], fps=mode['fps'])
+        else:
+            self.terminal.append(f"Error: No se pudo abrir la cámara {camera_id}")
+        self.cameras_pending.discard(camera_id)
+        if not self.cameras_pending:
+            elapsed = time.perf_counter() - self.camera_startup
+            self.terminal.append(f"Cámaras listas en {elapsed:.2f} s")
+
+    def show_camera_settings(self):
+        for thread in self.camera_threads:
+            thread.request_settings_dialog()
+
+    def save_camera_profiles(self):
+        # Guardar el modo y los ajustes actuales del driver para el siguiente arranque
+        for thread in self.camera_threads:
+            if thread.final_settings:
+                profile = self.camera_profiles.setdefault(str(thread.camera_id), {})
+                profile.update(thread.final_settings)
+        try:
+            save_profiles(self.camera_profiles)
+        except OSError as e:
+            print(f"Error al guardar perfiles de cámara: {e}")
+
+    def closeEvent(self, event):
+        if self.scheduler.active:
+            self.scheduler.stop()
+        for thread in self.camera_threads:
+            thread.stop()
+        self.save_camera_profiles()
+        if self.serial_thread.isRunning():
+            self.serial_thread.stop()
+        event.accept()
             
     def update_camera(self, image, camera_id):
         # Verifica si estamos en la pestaña "Filtro de Color"
@@ -515,67 +731,50 @@ class SMACharacterizationApp(QMainWindow):
                 rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
         else:
             # --- Procesamiento normal con detección ArUco ---
+            display = image
             if camera_id == 1:
-                arucoWidth_mm = 20
-                arucoHeight_mm = 20
-                markerRadius = 30 / 2
-
-                # Aplicar filtro de color
-                filtered = self.apply_color_filter(image)
-                opening = cv2.morphologyEx(filtered, cv2.MORPH_OPEN, kernel)
-                closing = cv2.morphologyEx(opening, cv2.MORPH_CLOSE, kernel)
-                
-                # Buscar contornos y dibujar centroide en la imagen original
-                contours, _ = cv2.findContours(closing, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                if contours:
-                    largest = max(contours, key=cv2.contourArea)
-                    M = cv2.moments(largest)
-                    area = cv2.contourArea(largest)
-                    if M["m00"] != 0:
-                        cx = int(M["m10"] / M["m00"])
-                        cy = int(M["m01"] / M["m00"])
-                        self.cx = cx
-                        self.cy = cy
-                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+                # Rectificar solo el ROI de medición si la cámara está calibrada
+                maps = self.get_rectification_maps(camera_id, image)
+                if maps is not None:
+                    work, (ox, oy) = maps.remap_roi(image, self.measure_roi)
+                else:
+                    work, ox, oy = image, 0, 0
+
+                # Aplicar filtro de color y buscar el centroide del marcador
+                centroid = find_marker_centroid(self.apply_color_filter(work))
+                if centroid is not None:
+                    self.cx = centroid[0] + ox
+                    self.cy = centroid[1] + oy
+                gray = cv2.cvtColor(work, cv2.COLOR_BGR2GRAY)
                 corners, ids, rejected = self.aruco_detector.detectMarkers(gray)
+                # Llevar las esquinas a coordenadas de la imagen completa
+                corners = tuple(c + np.array([ox, oy], dtype=np.float32) for c in corners)
                 if self.aruco_detection:
-                    aruco.drawDetectedMarkers(image, corners, ids)
-                    try:
-                        cv2.circle(image, (cx, cy), 5, (0, 255, 0), -1)
-                    except:
-                        cv2.circle(image, (self.cx, self.cy), 5, (0, 255, 0), -1)
-
-                if ids is not None and (0 in ids.flatten()):
-                    x_scale = []
-                    y_scale = []
-                    centers = {}
-
-                    for id in ids.flatten():
-                        if id == 0:
-                            if (corners[id][0][3][0] - corners[id][0][0][0]) > 0 and (corners[id][0][2][0] - corners[id][0][1][0]) > 0:
-                                x_scale.append((corners[id][0][1][1] - corners[id][0][0][1]) / arucoWidth_mm)
-                                x_scale.append((corners[id][0][2][1] - corners[id][0][3][1]) / arucoWidth_mm)
-                                y_scale.append((corners[id][0][3][0] - corners[id][0][0][0]) / arucoHeight_mm)
-                                y_scale.append((corners[id][0][2][0] - corners[id][0][1][0]) / arucoHeight_mm)
-
-                    for i, corner_set in enumerate(corners):
-                        pts = corner_set[0]
-                        center_x = np.mean(pts[:, 1])
-                        center_y = np.mean(pts[:, 0])
-                        if ids[i][0] == 0:
-                                centers[ids[i][0]] = [center_x, center_y]
-                    try:
-                        scale = [sum(x_scale) / len(x_scale), sum(y_scale) / len(y_scale)]
-                        self.scale_aux = scale
-                    except:
-                        scale = self.scale_aux
-                    self.distance_Y = (centers[0][1] - self.cx) * (1 / scale[1])
+                    # Overlays sobre una copia en la misma geometría que las mediciones
+                    # (rectificada si hay calibración); el cuadro crudo queda intacto
+                    display = maps.remap_roi(image)[0] if maps is not None else image.copy()
+                    aruco.drawDetectedMarkers(display, corners, ids)
+                    if self.cx is not None:
+                        cv2.circle(display, (int(self.cx), int(self.cy)), 5, (0, 255, 0), -1)
+
+                scale, center = aruco_reference(corners, ids)
+                if scale is not None:
+                    self.scale_aux = scale
+                else:
+                    scale = self.scale_aux
+                if center is not None and scale is not None and self.cx is not None:
+                    self.distance_Y = deflection_mm(center, self.cx, scale)
                     #print('Center Aruco [0]:',centers[0])
                     #print('Center Marker:',(self.cx,self.cy))
                     #print('Distance Y:',self.distance_Y)
                     self.distance_label.setText(f"{self.distance_Y:.3f}")
+                    if maps is not None:
+                        self.update_measure_roi(corners, ids, maps)
+                elif maps is not None:
+                    # Sin referencia: volver a medir sobre el cuadro completo
+                    self.measure_roi = None
 
-            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            rgb_image = cv2.cvtColor(display, cv2.COLOR_BGR2RGB)
 
         # Mostrar en UI
         h, w, ch = rgb_image.shape
@@ -596,6 +795,52 @@ class SMACharacterizationApp(QMainWindow):
                 self.camera2_label.setPixmap(qt_pixmap)
                 self.lastFrames[1] = image
 
+    def get_rectification_maps(self, camera_id, image):
+        # Tablas de remapeo en caché por cámara y resolución
+        h, w = image.shape[:2]
+        key = (camera_id, w, h)
+        if key not in self.rectification_maps:
+            self.rectification_maps[key] = load_rectification(camera_id, w, h)
+        return self.rectification_maps[key]
+
+    def update_measure_roi(self, corners, ids, maps):
+        # ROI que contiene el ArUco de referencia y el marcador de color, con margen
+        points = [corners[i][0] for i in range(len(ids)) if ids[i][0] == 0]
+        points.append(np.array([[self.cx, self.cy]], dtype=np.float32))
+        points = np.vstack(points)
+        x0, y0 = points.min(axis=0) - self.measure_roi_margin
+        x1, y1 = points.max(axis=0) + self.measure_roi_margin
+        self.measure_roi = maps.clip_roi((x0, y0, x1 - x0, y1 - y0))
+
+    def change_calibration_board(self, name):
+        # Cambiar de tablero descarta las vistas capturadas con el anterior
+        self.camera_calibrator = CameraCalibrator(**CALIBRATION_BOARDS[name])
+        self.terminal.append(f"Tablero de calibración: {name}")
+
+    def capture_calibration_board(self):
+        frame = self.lastFrames[0]
+        if frame is None:
+            self.terminal.append("No se encontro imagen de la camara 1")
+            return
+        if self.aruco_detection:
+            QMessageBox.warning(self, "Error", "Desactive la detección de arucos antes de capturar el tablero.")
+            return
+        if self.camera_calibrator.add_view(frame.copy()):
+            self.terminal.append(f"Vista del tablero agregada ({len(self.camera_calibrator.image_points)} vistas)")
+        else:
+            self.terminal.append("No se detectó el tablero de calibración en la imagen")
+
+    def calibrate_camera(self):
+        try:
+            calibration = self.camera_calibrator.calibrate()
+            maps = save_calibration(1, calibration)
+            self.rectification_maps[(1, maps.width, maps.height)] = maps
+            self.measure_roi = None
+            self.camera_calibrator.reset()
+            self.terminal.append(f"Calibración de cámara guardada (error RMS: {calibration['rms']:.3f} px)")
+        except Exception as e:
+            QMessageBox.critical(self, "Error de calibración", f"Error: {str(e)}")
+
     def toggle_aruco_detection(self):
         if not self.aruco_detection:
             self.aruco_detection = True
@@ -675,8 +920,10 @@ class SMACharacterizationApp(QMainWindow):
         if "TERMINATED" in data:
             self.experiment_finished = True
             self.terminal.append("Experimento terminado.")
-            # Verificar si todos los requisitos están listos para habilitar el botón de experimento
-            self.toggle_experiment()
+            if self.experiment_running:
+                self.stop_experiment()
+                # Continuar con la siguiente corrida programada
+                self.scheduler.on_run_finished(completed=True)
     
     def validate_connection(self):
         if not self.serial_connected:
@@ -688,6 +935,12 @@ class SMACharacterizationApp(QMainWindow):
         self.terminal.append("Validando conexión con Arduino...")
 
     def on_json_data_received(self, data):
+        self.scheduler.on_sensor_data(data)
+        # Respuesta a STATUS: no es una lectura de experimento
+        if "state" in data:
+            self.on_device_status(data)
+            return
+
         # Actualizar lecturas de sensores
         if "current_mA" in data:
             self.current_label.setText(f"{data['current_mA']:.3f}")
@@ -712,6 +965,16 @@ class SMACharacterizationApp(QMainWindow):
     def save_experiment_data(self, data):
         # Crear timestamp para este punto de datos
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]  # Milisegundos
+
+        # Detectar huecos: reconexión pendiente o salto en el número de secuencia
+        seq = data.get('seq')
+        if self.pending_gap is not None:
+            self.record_gap(self.pending_gap['start'], timestamp, self.last_seq, seq, self.pending_gap['reason'])
+            self.pending_gap = None
+        elif seq is not None and self.last_seq is not None and seq != self.last_seq + 1:
+            self.record_gap(self.last_timestamp, timestamp, self.last_seq, seq, "salto de secuencia")
+        self.last_seq = seq
+        self.last_timestamp = timestamp
         
         # Guardar datos en CSV
         csv_path = os.path.join(self.data_folder, f"{self.current_timestamp}","data.csv")
@@ -724,16 +987,64 @@ class SMACharacterizationApp(QMainWindow):
                 data.get('busVoltage_SMA_V', 0),
                 data.get('busVoltage_ref_V', 0),
                 self.distance_Y - self.zero_deformation,
-                self.distance_Y
+                self.distance_Y,
+                seq
             ])
             
-        # Capturar frames de las cámaras
-        #for i in range(len(self.lastFrames)):
-        i = 1
-        frame = self.lastFrames[i]
-        if frame is not None:
-            frame_path = os.path.join(self.data_folder, f"{self.current_timestamp}",f"cam{i+1}", f"{timestamp}.jpg")
-            cv2.imwrite(frame_path, frame)
+        # Capturar frames de las cámaras (cam1 sin overlays, la usa retrackDeflection.py)
+        for i in range(len(self.lastFrames)):
+            frame = self.lastFrames[i]
+            if frame is not None:
+                frame_path = os.path.join(self.data_folder, f"{self.current_timestamp}",f"cam{i+1}", f"{timestamp}.jpg")
+                cv2.imwrite(frame_path, frame)
+
+    def record_gap(self, start, end, last_seq, next_seq, reason):
+        # Registrar explícitamente el hueco de datos en gaps.csv de la corrida
+        # Si la secuencia no avanza, el Arduino se reinició (DTR) y la pérdida es desconocida
+        lost = None
+        if last_seq is not None and next_seq is not None and next_seq > last_seq:
+            lost = next_seq - last_seq - 1
+        gaps_path = os.path.join(self.data_folder, f"{self.current_timestamp}", "gaps.csv")
+        new_file = not os.path.exists(gaps_path)
+        with open(gaps_path, 'a', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            if new_file:
+                writer.writerow(['gap_start', 'gap_end', 'last_seq', 'next_seq', 'lost_samples', 'reason'])
+            writer.writerow([start, end, last_seq, next_seq, lost, reason])
+        lost_text = lost if lost is not None else "desconocidas"
+        self.terminal.append(f"Hueco de datos registrado: {start} -> {end} ({lost_text} lecturas perdidas)")
+
+    def on_link_lost(self, message):
+        self.terminal.append(f"Conexión serial perdida ({message}). Reintentando...")
+        if self.experiment_running and self.pending_gap is None:
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+            self.pending_gap = {'start': timestamp, 'reason': f"desconexión: {message}"}
+
+    def on_link_restored(self, port):
+        self.terminal.append(f"Conexión serial restablecida en {port}")
+        self.port_combo.setCurrentText(port)
+
+    def on_device_status(self, data):
+        # Tras reconectar, verificar si el experimento sigue corriendo en el Arduino
+        if not self.experiment_running or data.get('state') == "RUNNING":
+            return
+        if self.pending_gap is not None:
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+            seq = data.get('seq')
+            # Un número de secuencia que no avanza indica que el Arduino se reinició al
+            # reabrir el puerto: la corrida se interrumpió, no terminó
+            reset = seq is not None and self.last_seq is not None and seq <= self.last_seq
+            reason = " (reinicio del Arduino, corrida interrumpida)" if reset else " (corrida terminada durante el hueco)"
+            self.record_gap(self.pending_gap['start'], timestamp, self.last_seq, seq,
+                            self.pending_gap['reason'] + reason)
+            self.pending_gap = None
+            self.experiment_finished = True
+            if reset:
+                self.terminal.append("El Arduino se reinició durante la desconexión; se repetirá la corrida.")
+            else:
+                self.terminal.append("El experimento terminó durante la desconexión.")
+            self.stop_experiment()
+            self.scheduler.on_run_finished(completed=not reset, retry=reset)
 
     def clear_terminal(self):
         self.terminal.clear()
@@ -749,52 +1060,109 @@ class SMACharacterizationApp(QMainWindow):
 
     def toggle_experiment(self):
         if not self.experiment_running:
-            # Iniciar experimento
-            self.experiment_finished = False
-            active_time = self.active_time_spin.value()
-            rest_time = self.rest_time_spin.value()
-
-            # Crear timestamp para identificar este experimento
-            self.current_timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-
-            # Crear carpetas para las imágenes de las cámaras
-            os.makedirs(os.path.join(self.data_folder, f"{self.current_timestamp}","cam1"), exist_ok=True)
-            os.makedirs(os.path.join(self.data_folder, f"{self.current_timestamp}","cam2"), exist_ok=True)
-
-            # Crear archivo CSV para los datos
-            csv_path = os.path.join(self.data_folder, f"{self.current_timestamp}","data.csv")
-            with open(csv_path, 'w', newline='') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(['timestamp', 'current_mA', 'force_N', 'busVoltage_SMA_V', 'busVoltage_ref_V','deflexion_mm','distancia_raw_mm'])
-            
-            # Enviar comando de inicio al Arduino
-            command = f"START {active_time} {rest_time}\n"
-            if self.serial_thread.write_data(command):
-                self.terminal.append(f"Experimento iniciado - Tiempo activo: {active_time}ms, Tiempo reposo: {rest_time}ms")
-                self.experiment_running = True
-                self.start_experiment_btn.setText("Detener experimento")
-
-                # Deshabilitar configuración durante el experimento
-                self.active_time_spin.setEnabled(False)
-                self.rest_time_spin.setEnabled(False)
-                self.browse_btn.setEnabled(False)
-            else:
-                self.terminal.append("Error al iniciar el experimento")
+            self.start_experiment(self.active_time_spin.value(), self.rest_time_spin.value())
+        else:
+            self.stop_experiment()
+
+    def start_experiment(self, active_time, rest_time, run_name=None):
+        # Iniciar experimento
+        self.experiment_finished = False
+
+        # Crear timestamp para identificar este experimento (y su carpeta)
+        self.current_timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        if run_name:
+            self.current_timestamp = f"{self.current_timestamp}_{run_name}"
+
+        # Crear carpetas para las imágenes de las cámaras
+        os.makedirs(os.path.join(self.data_folder, f"{self.current_timestamp}","cam1"), exist_ok=True)
+        os.makedirs(os.path.join(self.data_folder, f"{self.current_timestamp}","cam2"), exist_ok=True)
 
+        # Crear archivo CSV para los datos
+        csv_path = os.path.join(self.data_folder, f"{self.current_timestamp}","data.csv")
+        with open(csv_path, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['timestamp', 'current_mA', 'force_N', 'busVoltage_SMA_V', 'busVoltage_ref_V','deflexion_mm','distancia_raw_mm','seq'])
+        self.save_tracking_settings(os.path.join(self.data_folder, f"{self.current_timestamp}"))
+        self.last_seq = None
+        self.last_timestamp = None
+        self.pending_gap = None
+        
+        # Enviar comando de inicio al Arduino
+        command = f"START {active_time} {rest_time}\n"
+        if self.serial_thread.write_data(command):
+            self.terminal.append(f"Experimento iniciado - Tiempo activo: {active_time}ms, Tiempo reposo: {rest_time}ms")
+            self.experiment_running = True
+            self.start_experiment_btn.setText("Detener experimento")
+
+            # Deshabilitar configuración durante el experimento
+            self.active_time_spin.setEnabled(False)
+            self.rest_time_spin.setEnabled(False)
+            self.browse_btn.setEnabled(False)
+            return True
+        self.terminal.append("Error al iniciar el experimento")
+        return False
+
+    def stop_experiment(self):
+        if  not self.experiment_finished:
+        # Detener experimento
+            if self.serial_thread.write_data("STOP\n"):
+                self.terminal.append("Experimento detenido")
+                self.experiment_finished = True
+
+        self.experiment_running = False
+        self.start_experiment_btn.setText("Iniciar experimento")
+        
+        # Habilitar configuración
+        self.active_time_spin.setEnabled(True)
+        self.rest_time_spin.setEnabled(True)
+        self.browse_btn.setEnabled(True)
+
+    def load_protocol(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Seleccionar protocolo", "", "Protocolos (*.json)")
+        if path:
+            try:
+                self.scheduler.add_protocols_from_file(path)
+                self.terminal.append(f"Protocolo agregado a la cola: {path}")
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Protocolo inválido:\n{str(e)}")
+            self.check_experiment_requirements()
+
+    def clear_queue(self):
+        self.scheduler.clear()
+        self.check_experiment_requirements()
+
+    def toggle_queue(self):
+        if not self.scheduler.active:
+            if self.scheduler.start():
+                self.start_queue_btn.setText("Detener cola")
+                self.clear_queue_btn.setEnabled(False)
+                self.load_protocol_btn.setEnabled(False)
+                self.check_experiment_requirements()
         else:
-            if  not self.experiment_finished:
-            # Detener experimento
-                if self.serial_thread.write_data("STOP\n"):
-                    self.terminal.append("Experimento detenido")
-                    self.experiment_finished = True
-
-            self.experiment_running = False
-            self.start_experiment_btn.setText("Iniciar experimento")
-            
-            # Habilitar configuración
-            self.active_time_spin.setEnabled(True)
-            self.rest_time_spin.setEnabled(True)
-            self.browse_btn.setEnabled(True)
+            self.scheduler.stop()
+            if self.experiment_running:
+                self.stop_experiment()
+            self.on_queue_finished()
+
+    def start_scheduled_run(self, active_time, rest_time, run_name):
+        if not self.experiment_running and self.start_experiment(active_time, rest_time, run_name):
+            return
+        self.terminal.append("No se pudo iniciar la corrida programada, deteniendo cola")
+        self.scheduler.stop()
+        self.on_queue_finished()
+
+    def request_device_status(self):
+        self.serial_thread.write_data("STATUS\n")
+
+    def on_scheduler_status(self, message):
+        self.queue_view.setText(message)
+        self.terminal.append(f"[Programador] {message.splitlines()[0]}")
+
+    def on_queue_finished(self):
+        self.start_queue_btn.setText("Iniciar cola")
+        self.clear_queue_btn.setEnabled(True)
+        self.load_protocol_btn.setEnabled(True)
+        self.check_experiment_requirements()
 
     def debug_sensores(self):
         if not self.serial_connected:
@@ -902,11 +1270,10 @@ class SMACharacterizationApp(QMainWindow):
 
     def capture_zero_deformation(self):
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]  # Milisegundos
-        cwd = os.getcwd()
         try:
             frame = self.lastFrames[0]
             if frame is not None:
-                frame_path = os.path.join(cwd,'Calibration', f"{timestamp}.jpg")
+                frame_path = os.path.join(CALIBRATION_DIR, f"{timestamp}.jpg")
                 cv2.imwrite(frame_path, frame)
                 self.terminal.append("Imagen para calibración guardada correctamente")
                 self.zero_deformation = self.distance_Y
@@ -923,14 +1290,15 @@ class SMACharacterizationApp(QMainWindow):
         valid_folder = bool(self.data_folder)
         
         if valid_active_time and valid_rest_time and valid_folder and self.serial_connected and not self.debug and self.arduino_validated and not self.aruco_detection:
-            self.start_experiment_btn.setEnabled(True)
+            self.start_experiment_btn.setEnabled(not self.scheduler.active)
+            self.start_queue_btn.setEnabled(self.scheduler.active or self.scheduler.has_pending())
         else:
             self.start_experiment_btn.setEnabled(False)
+            self.start_queue_btn.setEnabled(self.scheduler.active)
 
 
     def create_calibration_directory(self):
-        cwd = os.getcwd()
-        os.makedirs(os.path.join(cwd,'Calibration'), exist_ok=True)
+        os.makedirs(CALIBRATION_DIR, exist_ok=True)
 
     def change_filter_mode(self, mode):
         self.color_filter_mode = mode
@@ -967,11 +1335,23 @@ class SMACharacterizationApp(QMainWindow):
 
     def apply_color_filter(self, image):
         if self.color_filter_mode == "RGB":
-            mask = cv2.inRange(image, np.array(self.rgb_lower), np.array(self.rgb_upper))
+            return color_mask(image, "RGB", self.rgb_lower, self.rgb_upper)
+        return color_mask(image, "HSV", self.hsv_lower, self.hsv_upper)
+
+    def save_tracking_settings(self, folder):
+        # Parámetros de seguimiento para poder re-procesar la deflexión fuera de línea
+        if self.color_filter_mode == "RGB":
+            lower, upper = self.rgb_lower, self.rgb_upper
         else:
-            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-            mask = cv2.inRange(hsv, np.array(self.hsv_lower), np.array(self.hsv_upper))
-        return mask
+            lower, upper = self.hsv_lower, self.hsv_upper
+        settings = {
+            'color_filter_mode': self.color_filter_mode,
+            'lower': list(lower),
+            'upper': list(upper),
+            'zero_deformation': self.zero_deformation
+        }
+        with open(os.path.join(folder, "tracking.json"), 'w') as f:
+            json.dump(settings, f, indent=2)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,273 @@
+"""
+Re-procesa fuera de línea la deflexión (marcador de color + ArUco) sobre los
+cuadros grabados de la cámara 1 de un experimento.
+
+Uso:
+    python retrackDeflection.py <carpeta_experimento> [--video archivo.avi [--video-offset 0.0]] [--workers 4]
+
+El trabajo se divide en bloques que se guardan como checkpoints en
+<carpeta_experimento>/retrack_checkpoints/<clave>, por lo que una ejecución
+interrumpida continúa donde se quedó. La clave depende de los parámetros de
+seguimiento, el tamaño de bloque, la fuente de cuadros y la calibración de la
+cámara, así que cambiar cualquiera de ellos no reutiliza bloques viejos.
+"""
+import os
+import sys
+import json
+import glob
+import hashlib
+import argparse
+import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import cv2.aruco as aruco
+import numpy as np
+import pandas as pd
+
+from cameraCalibration import calibration_path, load_rectification
+from deflectionTracking import measure_deflection
+
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S_%f"
+
+
+def parse_timestamp(timestamp):
+    """Convierte un timestamp de data.csv a segundos (float)"""
+    return datetime.datetime.strptime(str(timestamp), TIMESTAMP_FORMAT).timestamp()
+
+
+def load_tracking_settings(folder, args):
+    """Parámetros de seguimiento: tracking.json del experimento, sobrescritos por la línea de comandos"""
+    settings = {
+        'color_filter_mode': 'RGB',
+        'lower': [0, 0, 0],
+        'upper': [255, 255, 255],
+        'zero_deformation': None
+    }
+    path = os.path.join(folder, "tracking.json")
+    if os.path.exists(path):
+        with open(path) as f:
+            settings.update(json.load(f))
+    if args is None:
+        return settings
+    if args.mode:
+        settings['color_filter_mode'] = args.mode
+    if args.lower:
+        settings['lower'] = args.lower
+    if args.upper:
+        settings['upper'] = args.upper
+    return settings
+
+
+def frame_size(video_path, frames):
+    """(ancho, alto) de los cuadros a re-procesar, o None si no se pueden leer"""
+    if video_path:
+        cap = cv2.VideoCapture(video_path)
+        size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        cap.release()
+        return size if size[0] > 0 and size[1] > 0 else None
+    frame = cv2.imread(frames[0][1])
+    return (frame.shape[1], frame.shape[0]) if frame is not None else None
+
+
+def checkpoint_key(settings, chunk_size, source, size=None, video_offset=0.0):
+    """Huella de lo que determina el contenido de los bloques
+
+    Incluye parámetros, tamaño de bloque, fuente, desfase del video y el archivo de
+    calibración de la cámara 1 (ruta y mtime) que usa process_chunk para rectificar.
+    """
+    source = os.path.abspath(source)
+    stat = os.stat(source)
+    calibration = None
+    if size is not None:
+        path = calibration_path(1, *size)
+        calibration = [path, os.stat(path).st_mtime_ns if os.path.exists(path) else None]
+    description = {
+        'mode': settings['color_filter_mode'],
+        'lower': [int(v) for v in settings['lower']],
+        'upper': [int(v) for v in settings['upper']],
+        'chunk_size': chunk_size,
+        'source': source,
+        'source_mtime': stat.st_mtime_ns,
+        'source_size': stat.st_size if os.path.isfile(source) else None,
+        'video_offset': video_offset,
+        'calibration': calibration,
+    }
+    return hashlib.sha1(json.dumps(description, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def folder_frames(images_folder, timestamps):
+    """Lista de (timestamp, ruta) para los cuadros guardados como <timestamp>.jpg"""
+    frames = []
+    for ts in timestamps:
+        path = os.path.join(images_folder, f"{ts}.jpg")
+        if os.path.exists(path):
+            frames.append((ts, path))
+    return frames
+
+
+def video_frames(video_path, timestamps, offset=0.0):
+    """Lista de (timestamp, índice de cuadro) alineando el video al timestamp más cercano
+
+    `offset` son los segundos del video en los que ocurre el primer timestamp de
+    data.csv (positivo si el video empezó antes).
+    """
+    cap = cv2.VideoCapture(video_path)
+    n_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+    if n_frames <= 0 or not timestamps:
+        return []
+
+    seconds = np.array([parse_timestamp(ts) for ts in timestamps])
+    seconds -= seconds[0] - offset
+    frame_times = np.arange(n_frames) / fps
+
+    # Cuadro más cercano para cada fila de data.csv
+    idx = np.clip(np.searchsorted(frame_times, seconds), 1, max(n_frames - 1, 1))
+    left = frame_times[idx - 1]
+    right = frame_times[np.minimum(idx, n_frames - 1)]
+    idx = np.where(np.abs(seconds - left) <= np.abs(right - seconds), idx - 1, idx)
+    # Las filas fuera de la duración del video (por el desfase) no tienen cuadro
+    inside = (seconds >= -0.5 / fps) & (seconds <= frame_times[-1] + 0.5 / fps)
+    return [(ts, int(i)) for ts, i, ok in zip(timestamps, idx, inside) if ok and 0 <= i < n_frames]
+
+
+def process_chunk(chunk_id, items, settings, video_path, checkpoint_dir):
+    """Mide la distancia cruda en un bloque de cuadros y guarda el checkpoint"""
+    detector = aruco.ArucoDetector(aruco.getPredefinedDictionary(aruco.DICT_4X4_50),
+                                   aruco.DetectorParameters())
+    maps = None
+    cap = cv2.VideoCapture(video_path) if video_path else None
+    last_scale = None
+    last_frame_index = None
+    frame = None
+    rows = []
+
+    for ts, source in items:
+        if cap is not None:
+            # Lectura secuencial; solo se busca si el índice salta
+            if last_frame_index is None or source != last_frame_index + 1:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, source)
+            if source != last_frame_index:
+                ok, frame = cap.read()
+                frame = frame if ok else None
+            last_frame_index = source
+        else:
+            frame = cv2.imread(source)
+
+        distance = None
+        if frame is not None:
+            if maps is None:
+                maps = load_rectification(1, frame.shape[1], frame.shape[0]) or False
+            image = maps.remap_roi(frame)[0] if maps else frame
+            distance, last_scale = measure_deflection(
+                image, detector, settings['color_filter_mode'],
+                settings['lower'], settings['upper'], last_scale)
+        rows.append((ts, np.nan if distance is None else distance))
+
+    if cap is not None:
+        cap.release()
+
+    df = pd.DataFrame(rows, columns=['timestamp', 'distancia_raw_mm'])
+    path = os.path.join(checkpoint_dir, f"chunk_{chunk_id:05d}.csv")
+    df.to_csv(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+    return chunk_id, len(rows)
+
+
+def detect_outliers(values, window=9, n_sigmas=4.0):
+    """Marca cuadros fallidos o con saltos respecto a la mediana móvil (MAD robusto)"""
+    series = pd.Series(values)
+    median = series.rolling(window, center=True, min_periods=1).median()
+    residual = (series - median).abs()
+    mad = 1.4826 * residual.median()
+    if not np.isfinite(mad) or mad == 0:
+        mad = residual[residual > 0].median() if (residual > 0).any() else 1.0
+    return (series.isna() | (residual > n_sigmas * mad)).to_numpy()
+
+
+def retrack(folder, video_path=None, images_folder=None, workers=None, chunk_size=200, args=None,
+            video_offset=0.0):
+    """Re-procesa la deflexión de un experimento y escribe data_retracked.csv"""
+    csv_path = os.path.join(folder, "data.csv")
+    df = pd.read_csv(csv_path, dtype={'timestamp': str})
+    timestamps = df['timestamp'].tolist()
+    settings = load_tracking_settings(folder, args)
+
+    if video_path:
+        source = video_path
+        frames = video_frames(video_path, timestamps, video_offset)
+    else:
+        source = images_folder or os.path.join(folder, "cam1")
+        frames = folder_frames(source, timestamps) if os.path.isdir(source) else []
+    if not frames:
+        print("Error: No se encontraron cuadros para re-procesar")
+        return None
+
+    key = checkpoint_key(settings, chunk_size, source, frame_size(video_path, frames), video_offset)
+    checkpoint_dir = os.path.join(folder, "retrack_checkpoints", key)
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    chunks = [frames[i:i + chunk_size] for i in range(0, len(frames), chunk_size)]
+    pending = [k for k in range(len(chunks))
+               if not os.path.exists(os.path.join(checkpoint_dir, f"chunk_{k:05d}.csv"))]
+    print(f"{len(frames)} cuadros en {len(chunks)} bloques ({len(chunks) - len(pending)} ya procesados)")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(process_chunk, k, chunks[k], settings, video_path, checkpoint_dir)
+                   for k in pending]
+        for done, future in enumerate(as_completed(futures), start=1):
+            chunk_id, n = future.result()
+            print(f"Bloque {chunk_id} listo ({n} cuadros) - {done}/{len(pending)}")
+
+    tracked = pd.concat([pd.read_csv(p, dtype={'timestamp': str})
+                         for p in sorted(glob.glob(os.path.join(checkpoint_dir, "chunk_*.csv")))])
+    tracked = tracked.drop_duplicates('timestamp').set_index('timestamp')['distancia_raw_mm']
+    raw = df['timestamp'].map(tracked)
+
+    # Cero de deformación: el guardado en tracking.json o el implícito en data.csv
+    zero = settings.get('zero_deformation')
+    if zero is None and {'distancia_raw_mm', 'deflexion_mm'} <= set(df.columns):
+        zero = float((df['distancia_raw_mm'] - df['deflexion_mm']).median())
+    zero = zero or 0.0
+
+    df['distancia_raw_mm_retrack'] = raw
+    df['deflexion_mm_retrack'] = raw - zero
+    outliers = detect_outliers(raw.to_numpy(dtype=float))
+    df['retrack_outlier'] = outliers
+
+    output_csv = os.path.join(folder, "data_retracked.csv")
+    df.to_csv(output_csv, index=False)
+    df.loc[outliers, ['timestamp', 'distancia_raw_mm_retrack']].to_csv(
+        os.path.join(folder, "retrack_outliers.csv"), index=False)
+
+    print(f"\nResultado guardado en: {output_csv}")
+    print(f"- Cuadros re-procesados: {int(raw.notna().sum())} de {len(df)}")
+    print(f"- Cuadros atípicos o fallidos: {int(outliers.sum())}")
+    for ts in df.loc[outliers, 'timestamp'].head(20):
+        print(f"    {ts}")
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-procesa la deflexión de un experimento grabado")
+    parser.add_argument("folder", help="Carpeta del experimento (contiene data.csv)")
+    parser.add_argument("--video", help="Video de la cámara 1 en lugar de la carpeta cam1")
+    parser.add_argument("--video-offset", type=float, default=0.0,
+                        help="Segundos del video en los que ocurre el primer timestamp de data.csv")
+    parser.add_argument("--images", help="Carpeta de imágenes (por defecto <folder>/cam1)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=200)
+    parser.add_argument("--mode", choices=["RGB", "HSV"])
+    parser.add_argument("--lower", type=int, nargs=3)
+    parser.add_argument("--upper", type=int, nargs=3)
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(args.folder, "data.csv")):
+        print(f"Error: No se encontró data.csv en {args.folder}")
+        sys.exit(1)
+    retrack(args.folder, args.video, args.images, args.workers, args.chunk_size, args, args.video_offset)
+
+
+if __name__ == "__main__":
+    main()
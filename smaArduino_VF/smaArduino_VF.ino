@@ -31,6 +31,7 @@ bool experimentRunning = false;               // Flag para indicar si el experim
 bool isRelayActive = false;                   // Estado del relé
 String inputBuffer = "";                      // Buffer para recibir datos por Serial
 bool commandComplete = false;                 // Flag para indicar que un comando está completo
+unsigned long sampleSeq = 0;                  // Número de secuencia de cada lectura enviada
 
 // Configuración del ARDUINO
 void setup() {
@@ -125,6 +126,10 @@ void handleCommand(String command) {
       }
     }
   }
+  // Reporta el estado actual (usado por el programador de experimentos)
+  else if (command == "STATUS") {
+    sendStatus();
+  }
   else if (command == "STOP") {
     if (currentState == RUNNING){
       currentState = IDLE;
@@ -157,6 +162,20 @@ void handleCommand(String command) {
   }
 }
 
+// Envía el estado del programa y la temperatura del sensor MLX en formato JSON
+void sendStatus() {
+  Serial.print("{");
+  Serial.print("\"state\":\"");
+  Serial.print(currentState == RUNNING ? "RUNNING" : (currentState == DEBUG ? "DEBUG" : "IDLE"));
+  Serial.print("\",");
+  Serial.print("\"seq\":"); Serial.print(sampleSeq); Serial.print(",");
+  if (currentState == RUNNING) {
+    Serial.print("\"elapsed_ms\":"); Serial.print(millis() - experimentStartTime); Serial.print(",");
+  }
+  Serial.print("\"temp_mosfet_C\":"); Serial.print(mlx.readObjectTempC(), 2);
+  Serial.println("}");
+}
+
 // Modifica el estado del relevador
 void setRelay(bool state) {
   isRelayActive = state;
@@ -199,11 +218,14 @@ void sendSensorData() {
 
   // Solo imprimir si estamos en DEBUG o RUNNING
   if (currentState == DEBUG || currentState == RUNNING) {
+    sampleSeq++;
     Serial.print("{");
+    Serial.print("\"seq\":"); Serial.print(sampleSeq); Serial.print(",");
     Serial.print("\"current_mA\":"); Serial.print(avgCurrent_SMA, 3); Serial.print(",");
     Serial.print("\"force_N\":"); Serial.print(avgForce, 3); Serial.print(",");
     Serial.print("\"busVoltage_SMA_V\":"); Serial.print(avgBusVoltage_SMA, 3); Serial.print(",");
     Serial.print("\"busVoltage_ref_V\":"); Serial.print(avgBusVoltage_ref, 3); Serial.print(",");
+    Serial.print("\"temp_mosfet_C\":"); Serial.print(avgMosfetTemp, 2); Serial.print(",");
     Serial.print("\"relay_state\":"); Serial.print(isRelayActive);
     Serial.println("}");
   }
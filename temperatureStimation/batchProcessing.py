@@ -0,0 +1,137 @@
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from PIL import Image
+
+from rgbLookup import RGBTemperatureLUT
+from patchStatistics import patch_statistics
+from frameRegistration import shift_position
+from paletteCalibration import PaletteCalibration
+
+_worker_lut = None
+_worker_palette = None
+
+
+def init_worker(lut_path, bits, k, palette=None):
+    """Cada proceso carga la tabla RGB una sola vez (mapeada en memoria)
+
+    `palette` = (ruta de la tabla normalizada, escalas por imagen) activa la
+    calibración por cuadro según la barra de color.
+    """
+    global _worker_lut, _worker_palette
+    _worker_lut = RGBTemperatureLUT(np.load(lut_path, mmap_mode='r'), bits, k)
+    if palette is not None:
+        normalized_path, scales = palette
+        normalized = RGBTemperatureLUT(np.load(normalized_path, mmap_mode='r'), bits, k, normalized_path)
+        _worker_palette = PaletteCalibration(normalized, scales)
+
+
+def worker_lut():
+    return _worker_lut
+
+
+def frame_lut(path):
+    """Tabla para un cuadro: la de su escala si hay calibración de paleta, si no la general"""
+    if _worker_palette is not None:
+        lut = _worker_palette.lut_for(path)
+        if lut is not None:
+            return lut
+    return _worker_lut
+
+
+def load_rgb(path):
+    """Decodifica una imagen como arreglo RGB (alto, ancho, 3)"""
+    with Image.open(path) as img:
+        return np.asarray(img.convert('RGB'))
+
+
+def process_points_chunk(tasks, positions, radius=0, shape='disk', offsets=None):
+    """Temperatura en las posiciones fijas para un bloque de (índice, timestamp, ruta)
+
+    Con `offsets` (nombre de imagen -> (dx, dy)) las posiciones se trasladan según
+    el registro de cada cuadro.
+    """
+    results = []
+    errors = []
+    for idx, ts, path in tasks:
+        try:
+            lut = frame_lut(path)
+            rgb = load_rgb(path)
+            height, width = rgb.shape[:2]
+            frame_positions = [shift_position(pos, offsets, path) for pos in positions]
+            points = [None] * len(positions)
+            inside = [i for i, pos in enumerate(frame_positions)
+                      if pos and 0 <= pos[0] < width and 0 <= pos[1] < height]
+            if inside:
+                stats = patch_statistics(rgb, [frame_positions[i] for i in inside], lut.lookup, radius, shape)
+                for j, i in enumerate(inside):
+                    x, y = frame_positions[i]
+                    r, g, b = (int(v) for v in rgb[y, x])
+                    points[i] = {
+                        'x': x, 'y': y, 'r': r, 'g': g, 'b': b, 'temperature': float(stats['mean'][j]),
+                        'median': float(stats['median'][j]), 'max': float(stats['max'][j]),
+                        'std': float(stats['std'][j])
+                    }
+            results.append((idx, ts, points))
+        except Exception as e:
+            errors.append(f"Error procesando {path}: {str(e)}")
+    return len(tasks), (results, errors)
+
+
+def split_chunks(items, workers=None, max_chunk=64):
+    """Divide la lista en bloques para repartir entre los procesos"""
+    workers = workers or os.cpu_count() or 1
+    size = max(1, min(max_chunk, len(items) // (workers * 8) or 1))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class BatchRunner:
+    """Ejecuta bloques en un pool de procesos desde un hilo de fondo
+
+    El progreso y los resultados se publican en `self.queue` como tuplas:
+    ('progress', hechos, total), ('result', resultado) y ('finished', cancelado, error).
+    """
+    def __init__(self, func, chunks, lut, workers=None, args=(), palette=None):
+        self.func = func
+        self.chunks = chunks
+        self.lut = lut
+        self.palette = palette
+        self.workers = workers
+        self.args = args
+        self.queue = queue.Queue()
+        self.total = sum(len(chunk) for chunk in chunks)
+        self._cancel = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _run(self):
+        done = 0
+        error = None
+        if self.lut is not None:
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                           initargs=(self.lut.path, self.lut.bits, self.lut.k,
+                                                     self.palette))
+        else:
+            executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            futures = [executor.submit(self.func, chunk, *self.args) for chunk in self.chunks]
+            for future in as_completed(futures):
+                if self._cancel.is_set():
+                    break
+                n, result = future.result()
+                done += n
+                self.queue.put(('result', result))
+                self.queue.put(('progress', done, self.total))
+        except Exception as e:
+            error = str(e)
+        finally:
+            executor.shutdown(wait=not self._cancel.is_set(), cancel_futures=True)
+            self.queue.put(('finished', self._cancel.is_set(), error))
@@ -0,0 +1,45 @@
+import os
+import json
+
+
+def journal_path(data_csv_file):
+    """Diario de ediciones junto a data.csv (data.journal.jsonl)"""
+    return os.path.splitext(data_csv_file)[0] + '.journal.jsonl'
+
+
+class EditJournal:
+    """Diario de solo-anexar con una edición JSON por línea; se vacía al guardar"""
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def replay(self):
+        """Ediciones registradas desde el último guardado (ignora una última línea truncada)"""
+        if not os.path.exists(self.path):
+            return []
+        events = []
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    break
+        return events
+
+    def append(self, event):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(event, default=float) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def clear(self):
+        """Compactación: los datos ya están en data.csv, el diario vuelve a empezar"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,89 @@
+import os
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+QUALITY_FILE = 'frame_quality.csv'
+THUMB_SIZE = (32, 24)
+
+
+def load_small_rgb(path, max_side=320):
+    """Decodifica la imagen reducida (en JPEG directamente a baja resolución)"""
+    with Image.open(path) as img:
+        scale = max(1.0, max(img.size) / max_side)
+        size = (max(8, int(img.size[0] / scale)), max(8, int(img.size[1] / scale)))
+        img.draft('RGB', size)
+        return np.asarray(img.convert('RGB').resize(size, Image.BILINEAR), dtype=np.float32)
+
+
+def frame_metrics(rgb):
+    """Nitidez (varianza del laplaciano), fracción saturada, fracción de overlay y miniatura"""
+    gray = rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    laplacian = (gray[1:-1, :-2] + gray[1:-1, 2:] + gray[:-2, 1:-1] + gray[2:, 1:-1] -
+                 4 * gray[1:-1, 1:-1])
+    saturated = np.mean(rgb.max(axis=2) >= 250)
+    # Menús y cuadros de texto de la cámara: pixeles claros sin color, ajenos a la paleta
+    chroma = rgb.max(axis=2) - rgb.min(axis=2)
+    overlay = np.mean((chroma < 12) & (gray > 180))
+    thumb = np.asarray(Image.fromarray(gray.astype(np.uint8)).resize(THUMB_SIZE, Image.BILINEAR))
+    return float(laplacian.var()), float(saturated), float(overlay), thumb
+
+
+def quality_chunk(tasks):
+    """Métricas de calidad para un bloque de (índice, timestamp, ruta)"""
+    results = []
+    errors = []
+    for idx, _, path in tasks:
+        try:
+            results.append((idx, *frame_metrics(load_small_rgb(path))))
+        except Exception as e:
+            errors.append(f"Error evaluando {path}: {str(e)}")
+    return len(tasks), (results, errors)
+
+
+def _robust_z(values):
+    median = np.nanmedian(values)
+    mad = np.nanmedian(np.abs(values - median)) * 1.4826
+    return (values - median) / max(mad, 1e-9)
+
+
+def suggest_bad_frames(results, z_threshold=4.0, max_saturation=0.05):
+    """Tabla de métricas por imagen con la razón sugerida para descartarla ('' si es buena)
+
+    Los umbrales son relativos a la propia serie (mediana y MAD), así que no dependen
+    de la escena. El salto temporal marca cuadros que difieren de ambos vecinos.
+    """
+    if not results:
+        return pd.DataFrame(columns=['index', 'sharpness', 'saturation', 'overlay', 'jump', 'reason'])
+    results = sorted(results, key=lambda r: r[0])
+    df = pd.DataFrame([r[:4] for r in results], columns=['index', 'sharpness', 'saturation', 'overlay'])
+    thumbs = np.stack([r[4] for r in results]).astype(np.float32)
+
+    # Diferencia media con el cuadro anterior y con el siguiente
+    step = np.abs(np.diff(thumbs, axis=0)).mean(axis=(1, 2)) if len(thumbs) > 1 else np.empty(0)
+    before = np.concatenate([[np.nan], step])
+    after = np.concatenate([step, [np.nan]])
+    df['jump'] = np.fmin(before, after)
+
+    # Además del puntaje robusto se exige una diferencia relevante frente a la mediana
+    sharpness = df['sharpness'].values
+    blurred = ((_robust_z(np.log(sharpness + 1e-6)) < -z_threshold) &
+               (sharpness < 0.5 * np.nanmedian(sharpness)))
+    saturated = df['saturation'].values > max_saturation
+    overlaid = (_robust_z(df['overlay'].values) > z_threshold) & (df['overlay'].values > 0.01)
+    jump = df['jump'].values
+    with np.errstate(invalid='ignore'):
+        jumped = (_robust_z(jump) > z_threshold) & (jump > 2 * np.nanmedian(jump))
+
+    reasons = []
+    for flags in zip(blurred, saturated, overlaid, jumped):
+        names = [name for name, flag in zip(('borrosa', 'saturada', 'menú', 'salto'), flags) if flag]
+        reasons.append(", ".join(names))
+    df['reason'] = reasons
+    return df
+
+
+def save_quality(df, folder, image_names):
+    out = df.copy()
+    out.insert(1, 'image', [image_names[i] for i in out['index']])
+    out.to_csv(os.path.join(folder, QUALITY_FILE), index=False)
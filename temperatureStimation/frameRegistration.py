@@ -0,0 +1,108 @@
+import os
+import json
+import numpy as np
+from PIL import Image
+
+OFFSETS_FILE = '.frame_offsets.json'
+
+
+def registration_size(reference_path, max_side=256):
+    """Tamaño reducido (ancho, alto) en el que se registran los cuadros"""
+    with Image.open(reference_path) as img:
+        width, height = img.size
+    scale = max(1.0, max(width, height) / max_side)
+    return max(8, int(round(width / scale))), max(8, int(round(height / scale)))
+
+
+def load_gray_small(path, size):
+    """Decodifica en escala de grises reducida; en JPEG se decodifica directamente a baja resolución"""
+    with Image.open(path) as img:
+        full_size = img.size
+        img.draft('L', size)
+        small = img.convert('L').resize(size, Image.BILINEAR)
+    return np.asarray(small, dtype=np.float32), full_size
+
+
+def _spectrum(image, window):
+    return np.fft.rfft2((image - image.mean()) * window)
+
+
+def _subpixel(values, i):
+    """Ajuste parabólico del pico con sus vecinos (índices circulares)"""
+    left, center, right = values[(i - 1) % len(values)], values[i], values[(i + 1) % len(values)]
+    denominator = left - 2 * center + right
+    return 0.0 if denominator == 0 else 0.5 * (left - right) / denominator
+
+
+def phase_correlation(reference_spectrum, image, window):
+    """Desplazamiento (dx, dy) de `image` respecto a la referencia y altura del pico (0-1)"""
+    cross = _spectrum(image, window) * np.conj(reference_spectrum)
+    cross /= np.maximum(np.abs(cross), 1e-12)
+    correlation = np.fft.irfft2(cross, s=image.shape)
+
+    iy, ix = np.unravel_index(np.argmax(correlation), correlation.shape)
+    height, width = correlation.shape
+    dy = iy + _subpixel(correlation[:, ix], iy)
+    dx = ix + _subpixel(correlation[iy, :], ix)
+    if dy > height / 2:
+        dy -= height
+    if dx > width / 2:
+        dx -= width
+    return float(dx), float(dy), float(correlation[iy, ix])
+
+
+def register_chunk(tasks, reference_path, size):
+    """Desplazamiento de cada (fila, timestamp, ruta) del bloque respecto al cuadro de referencia"""
+    reference, full_size = load_gray_small(reference_path, size)
+    window = np.outer(np.hanning(size[1]), np.hanning(size[0])).astype(np.float32)
+    reference_spectrum = _spectrum(reference, window)
+    scale_x, scale_y = full_size[0] / size[0], full_size[1] / size[1]
+
+    results = []
+    errors = []
+    for _, _, path in tasks:
+        try:
+            image, _ = load_gray_small(path, size)
+            dx, dy, response = phase_correlation(reference_spectrum, image, window)
+            results.append((os.path.basename(path), dx * scale_x, dy * scale_y, response))
+        except Exception as e:
+            errors.append(f"Error registrando {path}: {str(e)}")
+    return len(tasks), (results, errors)
+
+
+def load_offsets(folder, reference, size):
+    """Desplazamientos en caché de la carpeta (vacío si cambió la referencia o la escala)"""
+    path = os.path.join(folder, OFFSETS_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cached.get('reference') != reference or tuple(cached.get('size', ())) != tuple(size):
+        return {}
+    return {name: tuple(values) for name, values in cached.get('offsets', {}).items()}
+
+
+def save_offsets(folder, reference, size, offsets):
+    path = os.path.join(folder, OFFSETS_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'reference': reference, 'size': list(size),
+                   'offsets': {name: list(values) for name, values in offsets.items()}}, f)
+    os.replace(tmp_path, path)
+
+
+def relative_offsets(offsets, reference_name):
+    """(dx, dy) por imagen respecto a la imagen donde se definieron los puntos"""
+    ref_dx, ref_dy = offsets.get(reference_name, (0.0, 0.0, 1.0))[:2]
+    return {name: (values[0] - ref_dx, values[1] - ref_dy) for name, values in offsets.items()}
+
+
+def shift_position(pos, offsets, path):
+    """Posición de un punto de la referencia trasladada al cuadro `path`"""
+    if not offsets or pos is None:
+        return pos
+    dx, dy = offsets.get(os.path.basename(path), (0.0, 0.0))
+    return int(round(pos[0] + dx)), int(round(pos[1] + dy))
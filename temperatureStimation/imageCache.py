@@ -0,0 +1,56 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from batchProcessing import load_rgb
+
+
+class ImageCache:
+    """Caché LRU de imágenes decodificadas (RGB) con precarga en segundo plano"""
+    def __init__(self, max_items=16, workers=2):
+        self.max_items = max_items
+        self._images = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def _store(self, path, image):
+        with self._lock:
+            self._pending.pop(path, None)
+            self._images[path] = image
+            self._images.move_to_end(path)
+            while len(self._images) > self.max_items:
+                self._images.popitem(last=False)
+
+    def _decode(self, path):
+        image = load_rgb(path)
+        self._store(path, image)
+        return image
+
+    def get(self, path):
+        """Imagen decodificada; espera a la precarga si ya está en curso"""
+        with self._lock:
+            if path in self._images:
+                self._images.move_to_end(path)
+                return self._images[path]
+            future = self._pending.get(path)
+        if future is not None:
+            try:
+                return future.result()
+            except Exception:
+                pass
+        return self._decode(path)
+
+    def prefetch(self, paths):
+        """Decodifica en segundo plano las imágenes que aún no están en caché"""
+        with self._lock:
+            missing = [p for p in paths if p not in self._images and p not in self._pending]
+            for path in missing:
+                self._pending[path] = self._executor.submit(self._decode, path)
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
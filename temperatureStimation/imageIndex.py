@@ -0,0 +1,102 @@
+import os
+import re
+import json
+import datetime
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+INDEX_FILE = '.image_index.json'
+TIMESTAMP_PATTERN = re.compile(r'(\d{8})_(\d{6})_(\d{1,6})')
+
+
+def parse_timestamp(text):
+    """Extrae 'YYYYmmdd_HHMMSS_fff' y su valor en segundos; (None, None) si no hay"""
+    match = TIMESTAMP_PATTERN.search(str(text))
+    if not match:
+        return None, None
+    key = match.group(0)
+    try:
+        seconds = datetime.datetime.strptime(key, "%Y%m%d_%H%M%S_%f").timestamp()
+    except ValueError:
+        return key, None
+    return key, seconds
+
+
+class ImageIndex:
+    """Índice de una carpeta de imágenes por timestamp, construido en una sola pasada"""
+    def __init__(self, folder, files):
+        self.folder = folder
+        self.files = files
+        self.by_stem = {}
+        self.by_timestamp = {}
+        self.by_number = {}
+        times = []
+
+        for name in files:
+            self.by_stem.setdefault(os.path.splitext(name)[0], name)
+            key, seconds = parse_timestamp(name)
+            if key is not None:
+                self.by_timestamp.setdefault(key, name)
+                if seconds is not None:
+                    times.append((seconds, name))
+            for number in re.findall(r'\d+', name):
+                self.by_number.setdefault(number, name)
+
+        times.sort()
+        self.seconds = np.array([t for t, _ in times], dtype=np.float64)
+        self.sorted_files = [name for _, name in times]
+
+    @staticmethod
+    def _folder_mtime(folder):
+        return os.stat(folder).st_mtime_ns
+
+    @classmethod
+    def for_folder(cls, folder, use_cache=True):
+        """Carga el índice en caché si la carpeta no cambió; si no, lo reconstruye"""
+        cache_path = os.path.join(folder, INDEX_FILE)
+        if use_cache and os.path.exists(cache_path):
+            try:
+                with open(cache_path) as f:
+                    cached = json.load(f)
+                if cached.get('mtime_ns') == cls._folder_mtime(folder):
+                    return cls(folder, cached['files'])
+            except (OSError, ValueError, KeyError):
+                pass
+
+        files = sorted(f for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTENSIONS))
+        index = cls(folder, files)
+        if use_cache:
+            try:
+                tmp_path = cache_path + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump({'mtime_ns': 0, 'files': files}, f)
+                os.replace(tmp_path, cache_path)
+                # Escribir la caché modifica la carpeta: se guarda el mtime resultante
+                mtime = cls._folder_mtime(folder)
+                with open(cache_path, 'w') as f:
+                    json.dump({'mtime_ns': mtime, 'files': files}, f)
+            except OSError:
+                pass
+        return index
+
+    def match(self, timestamp, tolerance_s=None):
+        """Archivo para el timestamp: coincidencia exacta o el más cercano dentro de la tolerancia"""
+        timestamp = str(timestamp)
+        for table in (self.by_stem, self.by_timestamp, self.by_number):
+            if timestamp in table:
+                return table[timestamp]
+
+        if tolerance_s is None or len(self.seconds) == 0:
+            return None
+        _, seconds = parse_timestamp(timestamp)
+        if seconds is None:
+            return None
+        pos = np.searchsorted(self.seconds, seconds)
+        candidates = [i for i in (pos - 1, pos) if 0 <= i < len(self.seconds)]
+        best = min(candidates, key=lambda i: abs(self.seconds[i] - seconds))
+        if abs(self.seconds[best] - seconds) <= tolerance_s:
+            return self.sorted_files[best]
+        return None
+
+    def match_all(self, timestamps, tolerance_s=None):
+        return [self.match(ts, tolerance_s) for ts in timestamps]
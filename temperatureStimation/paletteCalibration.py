@@ -0,0 +1,153 @@
+import os
+import re
+import json
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from rgbLookup import RGBTemperatureLUT
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+LAYOUT_FILE = 'colorbar.json'
+SCALE_FILE = 'palette_scale.csv'
+OCR_CONFIG = '--psm 7 -c tessedit_char_whitelist=0123456789.-'
+
+
+def load_layout(path):
+    """Posición de la barra de color y de las etiquetas de escala en la imagen
+
+    {"bar": [x0, y0, x1, y1], "max_label": [x, y, ancho, alto],
+     "min_label": [x, y, ancho, alto], "thresh": 240}
+    """
+    with open(path) as f:
+        layout = json.load(f)
+    for key in ('bar', 'max_label', 'min_label'):
+        if key not in layout:
+            raise ValueError(f"Falta '{key}' en {path}")
+    layout.setdefault('thresh', 240)
+    return layout
+
+
+def read_colorbar(rgb, layout):
+    """Colores de la barra de arriba (máximo) a abajo (mínimo), mediana a lo ancho de la barra"""
+    x0, y0, x1, y1 = layout['bar']
+    bar = np.asarray(rgb[y0:y1, x0:x1, :3], dtype=np.float64)
+    return np.median(bar, axis=1)
+
+
+def read_number(rgb, roi, thresh):
+    """Valor numérico de una etiqueta de la imagen (OCR sobre el ROI binarizado)"""
+    if pytesseract is None:
+        raise ImportError("Se requiere pytesseract para leer la escala de la barra de color")
+    x, y, w, h = roi
+    gray = np.asarray(Image.fromarray(np.ascontiguousarray(rgb[y:y + h, x:x + w, :3])).convert('L'))
+    binary = np.where(gray > thresh, 255, 0).astype(np.uint8)
+    text = pytesseract.image_to_string(binary, config=OCR_CONFIG)
+    matches = re.findall(r'-?\d+\.?\d*', text.replace(' ', ''))
+    return float(matches[0]) if matches else None
+
+
+def scale_chunk(tasks, layout):
+    """Lee mínimo y máximo de escala para un bloque de (índice, timestamp, ruta)"""
+    results = []
+    errors = []
+    for _, _, path in tasks:
+        try:
+            with Image.open(path) as img:
+                rgb = np.asarray(img.convert('RGB'))
+            tmax = read_number(rgb, layout['max_label'], layout['thresh'])
+            tmin = read_number(rgb, layout['min_label'], layout['thresh'])
+            if tmin is None or tmax is None or tmax <= tmin:
+                errors.append(f"Escala no legible en {path}: {tmin} - {tmax}")
+                continue
+            results.append((os.path.basename(path), tmin, tmax))
+        except Exception as e:
+            errors.append(f"Error leyendo escala de {path}: {str(e)}")
+    return len(tasks), (results, errors)
+
+
+def load_scales(folder):
+    """Escalas por imagen guardadas (leídas por OCR o proporcionadas a mano)"""
+    path = os.path.join(folder, SCALE_FILE)
+    if not os.path.exists(path):
+        return {}
+    df = pd.read_csv(path)
+    return {name: (float(tmin), float(tmax)) for name, tmin, tmax in zip(df['image'], df['tmin'], df['tmax'])}
+
+
+def save_scales(folder, scales):
+    rows = [(name, tmin, tmax) for name, (tmin, tmax) in sorted(scales.items())]
+    pd.DataFrame(rows, columns=['image', 'tmin', 'tmax']).to_csv(os.path.join(folder, SCALE_FILE), index=False)
+
+
+def build_normalized_lut(colors, k=10, bits=8, cache_dir=None):
+    """Tabla RGB -> posición relativa en la barra (1 = máximo, 0 = mínimo), en caché por paleta"""
+    colors = np.asarray(colors, dtype=np.float64)
+    digest = hashlib.sha1(np.round(colors).astype(np.uint8).tobytes() + f"k={k};bits={bits}".encode())
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = os.path.join(cache_dir, f"palette_{digest.hexdigest()[:16]}.npy")
+        if os.path.exists(cache_path):
+            return RGBTemperatureLUT(np.load(cache_path), bits, k, cache_path)
+
+    table = pd.DataFrame(colors, columns=['R', 'G', 'B'])
+    table['Temperature'] = np.linspace(1.0, 0.0, len(colors))
+    lut = RGBTemperatureLUT.build(table, k, bits)
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(cache_path, lut.table)
+        lut.path = cache_path
+    return lut
+
+
+class ScaledLUT:
+    """Tabla normalizada llevada a un rango [tmin, tmax]; misma interfaz que RGBTemperatureLUT
+
+    Solo guarda el rango y reescala después de consultar la tabla normalizada, que es
+    el único arreglo grande y se comparte entre todos los rangos.
+    """
+    def __init__(self, normalized, tmin, tmax):
+        self.normalized = normalized
+        self.bits = normalized.bits
+        self.k = normalized.k
+        self.shift = normalized.shift
+        self.path = None
+        self.tmin = tmin
+        self.tmax = tmax
+
+    def lookup(self, rgb):
+        return self.tmin + (self.tmax - self.tmin) * self.normalized.lookup(rgb)
+
+    def lookup_pixel(self, r, g, b):
+        return self.tmin + (self.tmax - self.tmin) * self.normalized.lookup_pixel(r, g, b)
+
+
+class PaletteCalibration:
+    """Tabla por cuadro según la escala de la barra de color, en caché por rango"""
+    def __init__(self, normalized, scales, max_cached=32):
+        self.normalized = normalized
+        self.scales = scales
+        self.max_cached = max_cached
+        self._luts = OrderedDict()
+
+    def lut_for_range(self, tmin, tmax):
+        key = (round(tmin, 1), round(tmax, 1))
+        if key in self._luts:
+            self._luts.move_to_end(key)
+            return self._luts[key]
+        lut = ScaledLUT(self.normalized, *key)
+        self._luts[key] = lut
+        if len(self._luts) > self.max_cached:
+            self._luts.popitem(last=False)
+        return lut
+
+    def lut_for(self, image_name):
+        """Tabla del cuadro, o None si no se conoce su escala"""
+        scale = self.scales.get(os.path.basename(image_name))
+        return self.lut_for_range(*scale) if scale else None
@@ -0,0 +1,40 @@
+import numpy as np
+
+PATCH_SHAPES = ('disk', 'square')
+PATCH_STATS = ('mean', 'median', 'max', 'std')
+
+
+def patch_offsets(radius, shape='disk'):
+    """Desplazamientos (dy, dx) de los pixeles del parche alrededor del centro"""
+    radius = int(radius)
+    dy, dx = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+    if shape == 'disk':
+        inside = dy**2 + dx**2 <= radius**2
+        dy, dx = dy[inside], dx[inside]
+    return dy.ravel(), dx.ravel()
+
+
+def patch_statistics(rgb, positions, infer, radius=0, shape='disk'):
+    """Estadísticas de temperatura en el parche de cada punto, calculadas de una vez
+
+    `infer` convierte un arreglo (..., 3) RGB en temperaturas. Regresa un dict
+    estadística -> arreglo (n_puntos,); los pixeles fuera de la imagen se ignoran.
+    """
+    positions = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+    height, width = rgb.shape[:2]
+    dy, dx = patch_offsets(radius, shape)
+
+    ys = positions[:, 1:2] + dy[None, :]
+    xs = positions[:, 0:1] + dx[None, :]
+    valid = (ys >= 0) & (ys < height) & (xs >= 0) & (xs < width)
+    temps = np.asarray(infer(rgb[np.clip(ys, 0, height - 1), np.clip(xs, 0, width - 1), :3]),
+                       dtype=np.float64)
+    temps = np.where(valid, temps, np.nan)
+
+    with np.errstate(invalid='ignore'):
+        return {
+            'mean': np.nanmean(temps, axis=1),
+            'median': np.nanmedian(temps, axis=1),
+            'max': np.nanmax(temps, axis=1),
+            'std': np.nanstd(temps, axis=1),
+        }
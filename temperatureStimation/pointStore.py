@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+
+# Campo de cada punto -> prefijo de columna (temp_point1, x_point1, ...)
+# temperature es la media del parche; r, g, b son los del pixel central;
+# confidence es la correlación del seguimiento automático (vacía si el punto es manual)
+POINT_FIELDS = {'x': 'x', 'y': 'y', 'r': 'r', 'g': 'g', 'b': 'b', 'temperature': 'temp',
+                'median': 'temp_median', 'max': 'temp_max', 'std': 'temp_std',
+                'confidence': 'track_conf'}
+INT_FIELDS = ('x', 'y', 'r', 'g', 'b')
+OUTPUT_FIELDS = ('temperature', 'x', 'y', 'median', 'max', 'std', 'confidence')
+
+# Registro por punto: 52 bytes en lugar de un dict de Python
+POINT_DTYPE = np.dtype([('x', np.int32), ('y', np.int32),
+                        ('r', np.uint8), ('g', np.uint8), ('b', np.uint8), ('valid', np.bool_),
+                        ('temperature', np.float64), ('median', np.float64), ('max', np.float64),
+                        ('std', np.float64), ('confidence', np.float64)])
+_EMPTY_POINT = np.array((0, 0, 0, 0, 0, False) + (np.nan,) * 5, dtype=POINT_DTYPE)
+
+
+def column_name(field, point):
+    return f"{POINT_FIELDS[field]}_point{point + 1}"
+
+
+class PointTable:
+    """Resultados por imagen en un arreglo estructurado (filas x puntos) con índice timestamp -> fila
+
+    Las filas se reservan de una vez para los timestamps conocidos (data.csv) y el
+    arreglo crece al doble si aparece uno nuevo.
+    """
+    def __init__(self, n_points=3, timestamps=None):
+        self.n_points = n_points
+        self.row_of = {}
+        self.timestamps = []  # Timestamp de cada fila reservada
+        capacity = len(timestamps) if timestamps is not None else 0
+        self.data = np.full((max(capacity, 16), n_points), _EMPTY_POINT, dtype=POINT_DTYPE)
+        self.present = np.zeros(len(self.data), dtype=bool)  # Fila registrada (aunque sin puntos)
+        self.order = np.zeros(len(self.data), dtype=np.int64)  # Orden de registro, para first()
+        self._counter = 0
+        if timestamps is not None:
+            for ts in timestamps:
+                self._row(ts)
+        self.dirty = set()  # Timestamps modificados desde el último guardado
+
+    def _row(self, timestamp):
+        """Fila del timestamp, reservándola si no existe"""
+        row = self.row_of.get(timestamp)
+        if row is not None:
+            return row
+        row = len(self.timestamps)
+        if row == len(self.data):
+            self._grow(2 * len(self.data))
+        self.row_of[timestamp] = row
+        self.timestamps.append(timestamp)
+        return row
+
+    def _grow(self, capacity):
+        data = np.full((capacity, self.n_points), _EMPTY_POINT, dtype=POINT_DTYPE)
+        data[:len(self.data)] = self.data
+        self.data = data
+        self.present = np.concatenate([self.present, np.zeros(capacity - len(self.present), dtype=bool)])
+        self.order = np.concatenate([self.order, np.zeros(capacity - len(self.order), dtype=np.int64)])
+
+    def _mark(self, row):
+        if not self.present[row]:
+            self.present[row] = True
+            self._counter += 1
+            self.order[row] = self._counter
+
+    def __len__(self):
+        return int(self.present.sum())
+
+    def __contains__(self, timestamp):
+        row = self.row_of.get(timestamp)
+        return row is not None and bool(self.present[row])
+
+    def processed_timestamps(self):
+        """Timestamps registrados, en orden de fila"""
+        n = len(self.timestamps)
+        return [self.timestamps[row] for row in np.flatnonzero(self.present[:n])]
+
+    def first_timestamp(self):
+        """Primer timestamp registrado (o None)"""
+        rows = np.flatnonzero(self.present)
+        if not len(rows):
+            return None
+        return self.timestamps[rows[np.argmin(self.order[rows])]]
+
+    def ensure(self, timestamp):
+        """Registra el timestamp aunque todavía no tenga puntos"""
+        self._mark(self._row(timestamp))
+
+    def get(self, timestamp):
+        """Lista de dicts (o None) por punto, igual que el formato anterior"""
+        if timestamp not in self:
+            return None
+        points = []
+        for record in self.data[self.row_of[timestamp]]:
+            if not record['valid']:
+                points.append(None)
+                continue
+            point = {field: float(record[field]) for field in POINT_FIELDS}
+            for field in INT_FIELDS:
+                point[field] = int(record[field])
+            points.append(point)
+        return points
+
+    def first(self):
+        timestamp = self.first_timestamp()
+        return self.get(timestamp) if timestamp is not None else None
+
+    def set_point(self, timestamp, i, point):
+        row = self._row(timestamp)
+        self._mark(row)
+        self.data[row, i] = _EMPTY_POINT if point is None else self._values(point)
+        self.dirty.add(timestamp)
+
+    @staticmethod
+    def _values(point):
+        """Tupla en el orden de POINT_DTYPE a partir del dict de un punto"""
+        get = point.get
+        return (int(get('x', 0)), int(get('y', 0)), int(get('r', 0)), int(get('g', 0)), int(get('b', 0)),
+                True, get('temperature', np.nan), get('median', np.nan), get('max', np.nan),
+                get('std', np.nan), get('confidence', np.nan))
+
+    def drop(self, timestamp):
+        row = self.row_of.get(timestamp)
+        if row is not None:
+            self.present[row] = False
+            self.data[row] = _EMPTY_POINT
+
+    def update(self, results):
+        """Incorpora en bloque una lista de (timestamp, puntos)"""
+        rows, cols, values = [], [], []
+        for timestamp, points in results:
+            row = self._row(timestamp)
+            self._mark(row)
+            self.data[row] = _EMPTY_POINT
+            for i, point in enumerate(points[:self.n_points]):
+                if point is not None:
+                    rows.append(row)
+                    cols.append(i)
+                    values.append(self._values(point))
+            self.dirty.add(timestamp)
+        if values:
+            records = np.array(values, dtype=POINT_DTYPE)
+            # None en campos opcionales (confianza de puntos manuales) queda como NaN
+            self.data[rows, cols] = records
+
+    def output_columns(self):
+        return [column_name(field, i) for i in range(self.n_points) for field in OUTPUT_FIELDS]
+
+    def clear_dirty(self):
+        self.dirty.clear()
+
+    def merge_into(self, data_df, only_dirty=False):
+        """Escribe temperatura y posición de cada punto en data_df, columna a columna desde el arreglo
+
+        Los timestamps sin resultado conservan los valores que ya tenía data_df. Con
+        `only_dirty` solo se tocan las filas modificadas desde el último guardado.
+        """
+        # Fila del arreglo para cada fila de data_df (-1 si no tiene resultado)
+        rows = np.array([self.row_of.get(ts, -1) for ts in data_df['timestamp']], dtype=np.int64)
+        has = rows >= 0
+        has[has] = self.present[rows[has]]
+        if only_dirty:
+            has &= data_df['timestamp'].isin(self.dirty).values
+        for i in range(self.n_points):
+            records = self.data[rows[has], i]
+            valid = records['valid']
+            for field in OUTPUT_FIELDS:
+                col = column_name(field, i)
+                if col in data_df.columns:
+                    values = pd.to_numeric(data_df[col], errors='coerce').to_numpy(np.float64, copy=True)
+                else:
+                    values = np.full(len(data_df), np.nan)
+                new = records[field].astype(np.float64)
+                new[~valid] = np.nan
+                target = values[has]
+                values[has] = np.where(np.isnan(new), target, new)
+                if field in INT_FIELDS:
+                    data_df[col] = pd.array(np.round(values), dtype='Float64').astype('Int64')
+                else:
+                    data_df[col] = values
+        return data_df
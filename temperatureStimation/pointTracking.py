@@ -0,0 +1,92 @@
+import os
+import cv2
+import numpy as np
+
+from batchProcessing import frame_lut, load_rgb
+from patchStatistics import patch_statistics
+
+
+def to_gray(rgb):
+    return cv2.cvtColor(np.ascontiguousarray(rgb[..., :3]), cv2.COLOR_RGB2GRAY)
+
+
+def match_point(prev_gray, gray, pos, template_radius=15, search_radius=30, shift=(0, 0), min_std=1.0):
+    """Busca en `gray` la plantilla de `prev_gray` centrada en pos; regresa (pos, correlación)
+
+    `shift` desplaza el centro de la ventana de búsqueda (movimiento global esperado).
+    Una plantilla plana (desviación menor a `min_std`) correlaciona 1.0 en cualquier
+    lugar, así que no se busca: se regresa la posición anterior con confianza 0.
+    """
+    height, width = gray.shape
+    x, y = int(pos[0]), int(pos[1])
+
+    tx0, ty0 = max(0, x - template_radius), max(0, y - template_radius)
+    tx1, ty1 = min(width, x + template_radius + 1), min(height, y + template_radius + 1)
+    template = prev_gray[ty0:ty1, tx0:tx1]
+    if template.size == 0 or template.std() < min_std:
+        return (x, y), 0.0
+
+    sdx, sdy = int(round(shift[0])), int(round(shift[1]))
+    sx0, sy0 = max(0, tx0 + sdx - search_radius), max(0, ty0 + sdy - search_radius)
+    sx1, sy1 = min(width, tx1 + sdx + search_radius), min(height, ty1 + sdy + search_radius)
+    window = gray[sy0:sy1, sx0:sx1]
+    if (template.size == 0 or window.shape[0] < template.shape[0] or
+            window.shape[1] < template.shape[1]):
+        return (x, y), 0.0
+
+    scores = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+    _, score, _, (mx, my) = cv2.minMaxLoc(scores)
+    if not np.isfinite(score):
+        return (x, y), 0.0
+    return (sx0 + mx + (x - tx0), sy0 + my + (y - ty0)), float(score)
+
+
+def track_points_chunk(tasks, reference_path, reference_positions, radius=0, shape='disk',
+                       offsets=None, template_radius=15, search_radius=30, anchor_radius=120,
+                       min_confidence=0.3):
+    """Sigue los puntos cuadro a cuadro dentro de un bloque de (índice, timestamp, ruta)
+
+    El primer cuadro de cada bloque se ancla buscando la plantilla del cuadro de
+    referencia en una ventana amplia, así los bloques son independientes y pueden
+    repartirse entre procesos. Si la correlación cae bajo `min_confidence` el punto
+    conserva la posición anterior. Con `offsets` (registro de cuadros) la búsqueda
+    se centra donde el movimiento global predice cada punto.
+    """
+    results = []
+    errors = []
+    prev_gray = to_gray(load_rgb(reference_path))
+    positions = [tuple(pos) for pos in reference_positions]
+    window = anchor_radius
+    prev_offset = (0.0, 0.0)
+
+    for idx, ts, path in tasks:
+        try:
+            rgb = load_rgb(path)
+            gray = to_gray(rgb)
+            height, width = gray.shape
+            offset = offsets.get(os.path.basename(path), (0.0, 0.0)) if offsets else (0.0, 0.0)
+            shift = (offset[0] - prev_offset[0], offset[1] - prev_offset[1])
+            confidence = []
+            tracked = []
+            for pos in positions:
+                new_pos, score = match_point(prev_gray, gray, pos, template_radius, window, shift)
+                if score < min_confidence:
+                    new_pos = (pos[0] + shift[0], pos[1] + shift[1])
+                tracked.append((min(max(int(round(new_pos[0])), 0), width - 1),
+                                min(max(int(round(new_pos[1])), 0), height - 1)))
+                confidence.append(score)
+
+            stats = patch_statistics(rgb, tracked, frame_lut(path).lookup, radius, shape)
+            points = []
+            for j, (x, y) in enumerate(tracked):
+                r, g, b = (int(v) for v in rgb[y, x, :3])
+                points.append({
+                    'x': x, 'y': y, 'r': r, 'g': g, 'b': b, 'temperature': float(stats['mean'][j]),
+                    'median': float(stats['median'][j]), 'max': float(stats['max'][j]),
+                    'std': float(stats['std'][j]), 'confidence': confidence[j]
+                })
+            results.append((idx, ts, points))
+            prev_gray, positions, window, prev_offset = gray, tracked, search_radius, offset
+        except Exception as e:
+            errors.append(f"Error procesando {path}: {str(e)}")
+    return len(tasks), (results, errors)
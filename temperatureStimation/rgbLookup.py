@@ -0,0 +1,154 @@
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+
+def infer_temperature_fuzzy(rgb_table, temps, rgb, k=10, chunk_size=4096):
+    """Inferencia fuzzy vectorizada: rgb (N, 3) -> temperaturas (N,)"""
+    rgb_table = np.asarray(rgb_table, dtype=np.float64)
+    temps = np.asarray(temps, dtype=np.float64)
+    rgb = np.asarray(rgb, dtype=np.float64).reshape(-1, 3)
+    result = np.empty(len(rgb), dtype=np.float64)
+
+    for start in range(0, len(rgb), chunk_size):
+        block = rgb[start:start + chunk_size]
+        distances = np.linalg.norm(block[:, None, :] - rgb_table[None, :, :], axis=2)
+        weights = np.exp(-k * distances**2)
+        total = weights.sum(axis=1)
+
+        # Si todos los pesos se anulan se usa el punto más cercano
+        nearest = temps[np.argmin(distances, axis=1)]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weighted = weights @ temps / total
+        result[start:start + chunk_size] = np.where(total < 1e-8, nearest, weighted)
+    return result
+
+
+class NearestNeighbourTemperatureModel:
+    """Inferencia fuzzy sobre los vecinos más cercanos de la tabla RGB (KD-tree)
+
+    Con k=10 el peso exp(-k*d²) es despreciable a partir de ~1.7 unidades RGB,
+    así que solo los vecinos dentro del radio de corte contribuyen. La distancia al
+    punto más cercano de la tabla se reporta como medida de confianza.
+    """
+    def __init__(self, rgb_table, temps, k=10, n_neighbors=8, min_weight=1e-12):
+        if cKDTree is None:
+            raise ImportError("Se requiere scipy para el modelo KD-tree")
+        self.rgb_table = np.asarray(rgb_table, dtype=np.float64)
+        self.temps = np.asarray(temps, dtype=np.float64)
+        self.k = k
+        self.n_neighbors = min(n_neighbors, len(self.temps))
+        self.cutoff = np.sqrt(-np.log(min_weight) / k)
+        self.tree = cKDTree(self.rgb_table)
+
+    @classmethod
+    def from_dataframe(cls, rgb_data, k=10, **kwargs):
+        return cls(rgb_data[['R', 'G', 'B']].values, rgb_data['Temperature'].values, k, **kwargs)
+
+    def infer(self, rgb, chunk_size=1_000_000, workers=-1):
+        """Temperaturas y distancia a la tabla para un arreglo (..., 3) de valores RGB"""
+        rgb = np.asarray(rgb)
+        shape = rgb.shape[:-1]
+        flat = rgb.reshape(-1, 3).astype(np.float64)
+        temps = np.empty(len(flat), dtype=np.float64)
+        distance = np.empty(len(flat), dtype=np.float64)
+
+        for start in range(0, len(flat), chunk_size):
+            block = flat[start:start + chunk_size]
+            d, idx = self.tree.query(block, k=self.n_neighbors, workers=workers)
+            if self.n_neighbors == 1:
+                d, idx = d[:, None], idx[:, None]
+            weights = np.where(d <= self.cutoff, np.exp(-self.k * d**2), 0.0)
+            total = weights.sum(axis=1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                weighted = (weights * self.temps[idx]).sum(axis=1) / total
+            # Empates de distancia: el índice menor, igual que argmin sobre la tabla completa
+            ties = d <= d[:, :1] + 1e-9
+            nearest = np.where(ties, idx, len(self.temps)).min(axis=1)
+            temps[start:start + chunk_size] = np.where(total < 1e-8, self.temps[nearest], weighted)
+            distance[start:start + chunk_size] = d[:, 0]
+
+        return temps.reshape(shape), distance.reshape(shape)
+
+
+def _csv_hash(csv_path, k, bits):
+    digest = hashlib.sha1()
+    with open(csv_path, 'rb') as f:
+        digest.update(f.read())
+    digest.update(f"k={k};bits={bits}".encode())
+    return digest.hexdigest()[:16]
+
+
+class RGBTemperatureLUT:
+    """Tabla RGB -> temperatura cuantizada, precalculada una vez por CSV de calibración"""
+    def __init__(self, table, bits, k, path=None):
+        self.table = table
+        self.bits = bits
+        self.k = k
+        self.path = path
+        self.shift = 8 - bits
+        self.max_error = None
+        self.p99_error = None
+
+    @classmethod
+    def build(cls, rgb_data, k=10, bits=8):
+        """Evalúa la inferencia fuzzy en el centro de cada celda RGB cuantizada
+
+        Con bits=8 hay una celda por color entero, así que la tabla es exacta salvo el
+        redondeo a float16 (~32 MB); con menos bits la tabla ocupa menos pero pierde
+        precisión en los gradientes de la paleta.
+        """
+        rgb_table = rgb_data[['R', 'G', 'B']].values
+        temps = rgb_data['Temperature'].values
+        levels = 1 << bits
+        step = 256 // levels
+        centers = np.arange(levels) * step + (step - 1) / 2.0
+
+        grid = np.stack(np.meshgrid(centers, centers, centers, indexing='ij'), axis=-1).reshape(-1, 3)
+        dtype = np.float16 if bits == 8 else np.float32
+        if cKDTree is not None:
+            table = NearestNeighbourTemperatureModel(rgb_table, temps, k).infer(grid)[0]
+        else:
+            table = infer_temperature_fuzzy(rgb_table, temps, grid, k)
+        table = table.astype(dtype)
+        lut = cls(table.reshape(levels, levels, levels), bits, k)
+
+        # Error frente a la inferencia exacta en colores cercanos a la paleta
+        rng = np.random.default_rng(0)
+        sample = rgb_table[rng.integers(0, len(rgb_table), 2000)] + rng.integers(-3, 4, size=(2000, 3))
+        sample = np.clip(sample, 0, 255)
+        exact = infer_temperature_fuzzy(rgb_table, temps, sample, k)
+        error = np.abs(lut.lookup(sample) - exact)
+        lut.max_error = float(np.max(error))
+        lut.p99_error = float(np.percentile(error, 99))
+        return lut
+
+    @classmethod
+    def from_csv(cls, csv_path, k=10, bits=8, cache_dir=None):
+        """Carga la tabla desde la caché en disco o la construye y la guarda"""
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(os.path.abspath(csv_path)), '.rgb_lut_cache')
+        cache_path = os.path.join(cache_dir, f"lut_{_csv_hash(csv_path, k, bits)}.npy")
+
+        if os.path.exists(cache_path):
+            return cls(np.load(cache_path), bits, k, cache_path)
+
+        lut = cls.build(pd.read_csv(csv_path), k, bits)
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(cache_path, lut.table)
+        lut.path = cache_path
+        return lut
+
+    def lookup(self, rgb):
+        """Temperaturas para un arreglo (..., 3) de valores RGB de 0 a 255"""
+        idx = np.asarray(rgb).astype(np.uint8) >> self.shift
+        return self.table[idx[..., 0], idx[..., 1], idx[..., 2]].astype(np.float64)
+
+    def lookup_pixel(self, r, g, b):
+        return float(self.table[int(r) >> self.shift, int(g) >> self.shift, int(b) >> self.shift])
@@ -0,0 +1,105 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from batchProcessing import init_worker, frame_lut, load_rgb, split_chunks
+
+CUBE_FILE = 'cube.npy'
+INDEX_FILE = 'index.csv'
+
+
+def fill_cube_chunk(tasks, cube_path):
+    """Convierte un bloque de (fila, ruta) a mapas de temperatura dentro del cubo"""
+    cube = np.load(cube_path, mmap_mode='r+')
+    failed = []
+    for frame, path in tasks:
+        try:
+            cube[frame] = frame_lut(path).lookup(load_rgb(path)).astype(np.float16)
+        except Exception as e:
+            cube[frame] = np.nan
+            failed.append((path, str(e)))
+    cube.flush()
+    return len(tasks), failed
+
+
+def prepare_temperature_cube(image_paths, timestamps, output_dir):
+    """Crea el cubo vacío y su índice; regresa la ruta del cubo y las tareas por cuadro"""
+    os.makedirs(output_dir, exist_ok=True)
+    with Image.open(image_paths[0]) as img:
+        width, height = img.size
+
+    cube_path = os.path.join(output_dir, CUBE_FILE)
+    cube = np.lib.format.open_memmap(cube_path, mode='w+', dtype=np.float16,
+                                     shape=(len(image_paths), height, width))
+    del cube
+
+    pd.DataFrame({
+        'frame': np.arange(len(image_paths)),
+        'timestamp': [str(ts) for ts in timestamps],
+        'image': [os.path.basename(p) for p in image_paths]
+    }).to_csv(os.path.join(output_dir, INDEX_FILE), index=False)
+    return cube_path, list(enumerate(image_paths))
+
+
+def build_temperature_cube(image_paths, timestamps, lut, output_dir, workers=None,
+                           progress_callback=None):
+    """Genera un cubo T×H×W float16 mapeado en memoria con su índice de timestamps"""
+    if lut.path is None:
+        raise ValueError("La tabla RGB debe estar guardada en disco para usarse en paralelo")
+    cube_path, tasks = prepare_temperature_cube(image_paths, timestamps, output_dir)
+
+    done = 0
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(lut.path, lut.bits, lut.k)) as executor:
+        futures = [executor.submit(fill_cube_chunk, chunk, cube_path)
+                   for chunk in split_chunks(tasks, workers, max_chunk=32)]
+        for future in as_completed(futures):
+            n, chunk_failed = future.result()
+            done += n
+            failed.extend(chunk_failed)
+            if progress_callback is not None:
+                progress_callback(done, len(image_paths))
+    return failed
+
+
+class TemperatureCube:
+    """Consultas de punto, ROI y línea sobre el cubo de temperaturas de un experimento"""
+    def __init__(self, folder):
+        self.folder = folder
+        self.data = np.load(os.path.join(folder, CUBE_FILE), mmap_mode='r')
+        self.index = pd.read_csv(os.path.join(folder, INDEX_FILE), dtype={'timestamp': str})
+        self.frame_of = dict(zip(self.index['timestamp'], self.index['frame']))
+
+    @staticmethod
+    def exists(folder):
+        return (os.path.exists(os.path.join(folder, CUBE_FILE)) and
+                os.path.exists(os.path.join(folder, INDEX_FILE)))
+
+    @property
+    def timestamps(self):
+        return self.index['timestamp'].values
+
+    def frame(self, timestamp):
+        return self.data[self.frame_of[str(timestamp)]]
+
+    def point(self, x, y):
+        """Serie temporal de un pixel"""
+        return self.data[:, int(y), int(x)].astype(np.float32)
+
+    def roi(self, x0, y0, x1, y1, stat='mean'):
+        """Estadística por cuadro dentro del rectángulo [x0, x1) × [y0, y1)"""
+        block = self.data[:, int(y0):int(y1), int(x0):int(x1)].astype(np.float32)
+        func = {'mean': np.nanmean, 'max': np.nanmax, 'min': np.nanmin,
+                'median': np.nanmedian, 'std': np.nanstd}[stat]
+        return func(block.reshape(len(block), -1), axis=1)
+
+    def line(self, p0, p1, n_samples=None):
+        """Perfil T × n a lo largo del segmento p0 -> p1 (pixel más cercano)"""
+        if n_samples is None:
+            n_samples = int(np.hypot(p1[0] - p0[0], p1[1] - p0[1])) + 1
+        xs = np.rint(np.linspace(p0[0], p1[0], n_samples)).astype(int)
+        ys = np.rint(np.linspace(p0[1], p1[1], n_samples)).astype(int)
+        return self.data[:, ys, xs].astype(np.float32)
@@ -0,0 +1,182 @@
+"""
+Estimación de temperatura RGB sin interfaz gráfica para una o varias carpetas
+de experimento (o carpetas de campaña que contienen experimentos).
+
+Uso:
+    python temperaturePipeline.py <carpeta> [<carpeta> ...] --calibration rgb.csv --points puntos.json
+
+El archivo de puntos es un JSON como:
+    {"points": [[120, 85], [160, 90], [200, 95]], "radius": 2, "shape": "disk",
+     "track": false, "register": false, "reference": "20250708_141511_123.jpg"}
+o un CSV con columnas x, y. Cada experimento se guarda en
+<carpeta>/data_temperature.csv; los experimentos cuya salida es más reciente
+que sus entradas se omiten salvo con --force.
+"""
+import os
+import sys
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from rgbLookup import RGBTemperatureLUT
+from imageIndex import ImageIndex
+from pointStore import PointTable
+from batchProcessing import init_worker, process_points_chunk
+from pointTracking import track_points_chunk
+from frameRegistration import (registration_size, register_chunk, load_offsets, save_offsets,
+                               relative_offsets)
+
+OUTPUT_FILE = 'data_temperature.csv'
+
+
+def load_point_definition(path):
+    """Lee posiciones y opciones de parche/seguimiento del archivo de puntos"""
+    if path.lower().endswith('.csv'):
+        points = pd.read_csv(path)[['x', 'y']].astype(int).values.tolist()
+        config = {}
+    else:
+        with open(path) as f:
+            config = json.load(f)
+        points = config['points']
+    return {
+        'points': [(int(x), int(y)) for x, y in points],
+        'radius': int(config.get('radius', 0)),
+        'shape': config.get('shape', 'disk'),
+        'track': bool(config.get('track', False)),
+        'register': bool(config.get('register', False)),
+        'reference': config.get('reference'),
+    }
+
+
+def find_experiments(folders):
+    """Carpetas con data.csv; una carpeta de campaña se expande a sus subcarpetas"""
+    experiments = []
+    for folder in folders:
+        if os.path.exists(os.path.join(folder, 'data.csv')):
+            experiments.append(folder)
+            continue
+        for name in sorted(os.listdir(folder)):
+            sub = os.path.join(folder, name)
+            if os.path.exists(os.path.join(sub, 'data.csv')):
+                experiments.append(sub)
+    return experiments
+
+
+def is_up_to_date(folder, images_folder, inputs):
+    """La salida existe y es más reciente que data.csv, las imágenes y los archivos de entrada"""
+    output = os.path.join(folder, OUTPUT_FILE)
+    if not os.path.exists(output):
+        return False
+    sources = [os.path.join(folder, 'data.csv'), images_folder] + list(inputs)
+    newest = max(os.path.getmtime(p) for p in sources if os.path.exists(p))
+    return os.path.getmtime(output) >= newest
+
+
+def register_experiment(images_folder, tasks):
+    """Registro de cuadros de la carpeta (reutiliza y completa la caché de desplazamientos)"""
+    reference_path = tasks[0][2]
+    reference = os.path.basename(reference_path)
+    size = registration_size(reference_path)
+    offsets = load_offsets(images_folder, reference, size)
+    missing = [task for task in tasks if os.path.basename(task[2]) not in offsets]
+    if missing:
+        _, (results, _) = register_chunk(missing, reference_path, size)
+        for name, dx, dy, response in results:
+            offsets[name] = (dx, dy, response)
+        save_offsets(images_folder, reference, size, offsets)
+    return offsets
+
+
+def process_experiment(folder, images_subfolder, definition, tolerance_s):
+    """Asocia imágenes, calcula temperaturas y escribe data_temperature.csv (en un proceso del pool)"""
+    images_folder = os.path.join(folder, images_subfolder)
+    data_df = pd.read_csv(os.path.join(folder, 'data.csv'))
+    index = ImageIndex.for_folder(images_folder)
+    matches = index.match_all(data_df['timestamp'].astype(str), tolerance_s)
+    tasks = [(row, ts, os.path.join(images_folder, name))
+             for row, (ts, name) in enumerate(zip(data_df['timestamp'], matches)) if name]
+    if not tasks:
+        return folder, len(data_df), 0, ["No se encontraron imágenes correspondientes"]
+
+    positions = definition['points']
+    radius, shape = definition['radius'], definition['shape']
+    reference = definition['reference'] or os.path.basename(tasks[0][2])
+    offsets = None
+    if definition['register']:
+        offsets = relative_offsets(register_experiment(images_folder, tasks), reference)
+    if definition['track']:
+        _, (results, errors) = track_points_chunk(tasks, os.path.join(images_folder, reference),
+                                                  positions, radius, shape, offsets)
+    else:
+        _, (results, errors) = process_points_chunk(tasks, positions, radius, shape, offsets)
+
+    table = PointTable(n_points=len(positions))
+    table.update([(ts, points) for _, ts, points in results])
+    table.merge_into(data_df)
+
+    output = os.path.join(folder, OUTPUT_FILE)
+    tmp_path = output + ".tmp"
+    data_df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, output)
+    return folder, len(data_df), len(results), errors
+
+
+def run(folders, calibration, points_file, images_subfolder='cam2', workers=None,
+        tolerance_s=0.05, force=False):
+    definition = load_point_definition(points_file)
+    experiments = find_experiments(folders)
+    pending = [f for f in experiments
+               if force or not is_up_to_date(f, os.path.join(f, images_subfolder),
+                                             [calibration, points_file])]
+    skipped = len(experiments) - len(pending)
+    print(f"Experimentos: {len(experiments)} ({skipped} al día, {len(pending)} por procesar)")
+    if not pending:
+        return []
+
+    lut = RGBTemperatureLUT.from_csv(calibration)
+    summary = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(lut.path, lut.bits, lut.k)) as executor:
+        futures = {executor.submit(process_experiment, folder, images_subfolder,
+                                   definition, tolerance_s): folder for folder in pending}
+        for future in as_completed(futures):
+            folder = futures[future]
+            try:
+                _, n_rows, n_done, errors = future.result()
+            except Exception as e:
+                print(f"[ERROR] {folder}: {str(e)}")
+                summary.append((folder, 0, 0, [str(e)]))
+                continue
+            print(f"[OK] {folder}: {n_done} de {n_rows} filas con imagen, {len(errors)} errores")
+            for error in errors[:5]:
+                print(f"    {error}")
+            summary.append((folder, n_rows, n_done, errors))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimación de temperatura RGB sin interfaz gráfica")
+    parser.add_argument("folders", nargs="+", help="Carpetas de experimento o de campaña")
+    parser.add_argument("--calibration", required=True, help="CSV RGB-Temperatura (R, G, B, Temperature)")
+    parser.add_argument("--points", required=True, help="Archivo de puntos (JSON o CSV con x, y)")
+    parser.add_argument("--images", default="cam2", help="Subcarpeta de imágenes de cada experimento")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--tolerance", type=float, default=0.05,
+                        help="Tolerancia (s) para asociar imágenes por timestamp cercano")
+    parser.add_argument("--force", action="store_true", help="Re-procesa aunque la salida esté al día")
+    args = parser.parse_args()
+
+    for path in [args.calibration, args.points] + args.folders:
+        if not os.path.exists(path):
+            print(f"Error: No se encontró {path}")
+            sys.exit(1)
+    summary = run(args.folders, args.calibration, args.points, args.images, args.workers,
+                  args.tolerance, args.force)
+    if any(n_done == 0 for _, _, n_done, _ in summary):
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,26 @@ import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
 import pandas as pd
 import numpy as np
-from PIL import Image, ImageTk
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import os
-import re
 import sys
+import queue
+from rgbLookup import RGBTemperatureLUT, NearestNeighbourTemperatureModel, infer_temperature_fuzzy, cKDTree
+from temperatureMaps import prepare_temperature_cube, fill_cube_chunk
+from batchProcessing import BatchRunner, process_points_chunk, split_chunks
+from imageIndex import ImageIndex
+from pointStore import PointTable
+from imageCache import ImageCache
+from patchStatistics import patch_statistics, PATCH_SHAPES
+from pointTracking import track_points_chunk
+from wireProfile import resample_path, prepare_profile, fill_profile_chunk, merge_summaries
+from paletteCalibration import (LAYOUT_FILE, load_layout, read_colorbar, scale_chunk, load_scales,
+                                save_scales, build_normalized_lut, PaletteCalibration)
+from editJournal import EditJournal, journal_path
+from frameQuality import quality_chunk, suggest_bad_frames, save_quality
+from frameRegistration import (registration_size, register_chunk, load_offsets, save_offsets,
+                               relative_offsets, shift_position)
 
 class TemperatureAnalyzer:
     def __init__(self, root):
@@ -21,20 +35,36 @@ class TemperatureAnalyzer:
         self.rgb_temp_csv_file = ""
         self.data_df = None
         self.rgb_data = None
+        self.rgb_lut = None
+        self.rgb_model = None
         self.current_image_index = 0
-        self.point_positions = [None, None, None]
+        self.n_points = 3  # Puntos por imagen (se elige en la interfaz antes de iniciar)
+        self.point_positions = [None] * self.n_points
         self.point_markers = []
         self.images_list = []
-        self.temp_data = {}
+        self.temp_data = PointTable()
         self.default_positions = None
+        self.reference_image_index = None  # Imagen donde se definieron las posiciones por defecto
+        self.wire_vertices = []  # Vértices de la trayectoria del alambre
+        self.drawing_wire = False
+        self.wire_line = None
+        self.frame_offsets = {}  # Registro de cuadros: imagen -> (dx, dy, respuesta)
+        self.palette = None  # Calibración por cuadro según la barra de color
+        self.journal = None  # Diario de ediciones no guardadas junto a data.csv
+        self.unsaved_deletions = False
         self.first_points_set = False
         self.deleted_images = set()  # Conjunto de índices de imágenes eliminadas
+        self.suggested_deletions = {}  # Índice -> razón de las imágenes marcadas automáticamente
+        self.batch_runner = None  # Procesamiento en paralelo en curso
+        self.match_tolerance_s = 0.05  # Tolerancia para asociar imágenes por timestamp cercano
         
         # Variables para el control del canvas
         self.img = None
         self.fig = None
         self.ax = None
         self.canvas = None
+        self.image_artist = None
+        self.image_cache = ImageCache()
         
         self._create_ui()
         self.root.protocol("WM_DELETE_WINDOW", self._on_closing)
@@ -70,7 +100,10 @@ class TemperatureAnalyzer:
             ("Siguiente ▶", self._go_to_next),
             ("Última ⏭", self._go_to_last),
             ("🗑 Eliminar Imagen", self._delete_current_image),
-            ("💾 Guardar Datos", self._save_data)
+            ("💾 Guardar Datos", self._save_data),
+            ("🌡 Mapas de Temperatura", self._build_temperature_maps),
+            ("🔍 Detectar Imágenes Malas", self._detect_bad_frames),
+            ("⚑ Siguiente Marcada", self._go_to_next_flagged)
         ]
         
         for i, (text, command) in enumerate(nav_buttons[:4]):
@@ -88,16 +121,59 @@ class TemperatureAnalyzer:
                   command=nav_buttons[4][1]).grid(row=0, column=6, padx=10)
         ttk.Button(bottom_frame, text=nav_buttons[5][0], 
                   command=nav_buttons[5][1]).grid(row=0, column=7, padx=10)
+        ttk.Button(bottom_frame, text=nav_buttons[6][0], 
+                  command=nav_buttons[6][1]).grid(row=0, column=8, padx=10)
+        ttk.Button(bottom_frame, text=nav_buttons[7][0], 
+                  command=nav_buttons[7][1]).grid(row=0, column=9, padx=10)
+        ttk.Button(bottom_frame, text=nav_buttons[8][0], 
+                  command=nav_buttons[8][1]).grid(row=0, column=10, padx=5)
         
         # Sección de resultados
         results_frame = ttk.LabelFrame(self.root, text="Temperaturas", padding=10)
         results_frame.pack(fill=tk.X, padx=10, pady=5)
         
+        self.labels_frame = ttk.Frame(results_frame)
+        self.labels_frame.grid(row=0, column=0, columnspan=3, sticky="w")
         self.temp_labels = []
-        for i in range(3):
-            label = ttk.Label(results_frame, text=f"Punto {i+1}: --")
-            label.grid(row=0, column=i, padx=20)
-            self.temp_labels.append(label)
+        self._build_temp_labels()
+        
+        # Parche alrededor de cada punto (radio 0 = pixel único)
+        patch_frame = ttk.Frame(results_frame)
+        patch_frame.grid(row=1, column=0, columnspan=3, sticky="w", pady=(5, 0))
+        ttk.Label(patch_frame, text="Puntos:").pack(side=tk.LEFT)
+        self.n_points_var = tk.IntVar(value=self.n_points)
+        ttk.Spinbox(patch_frame, from_=1, to=10, width=4,
+                    textvariable=self.n_points_var).pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Label(patch_frame, text="Parche:").pack(side=tk.LEFT)
+        self.patch_shape_var = tk.StringVar(value=PATCH_SHAPES[0])
+        shape_box = ttk.Combobox(patch_frame, textvariable=self.patch_shape_var,
+                                 values=PATCH_SHAPES, state="readonly", width=8)
+        shape_box.pack(side=tk.LEFT, padx=5)
+        shape_box.bind("<<ComboboxSelected>>", lambda e: self._on_patch_changed())
+        ttk.Label(patch_frame, text="Radio (px):").pack(side=tk.LEFT, padx=(10, 0))
+        self.patch_radius_var = tk.IntVar(value=0)  # 0 = un solo pixel, como antes
+        ttk.Spinbox(patch_frame, from_=0, to=25, width=5, textvariable=self.patch_radius_var,
+                    command=self._on_patch_changed).pack(side=tk.LEFT, padx=5)
+        self.track_points_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(patch_frame, text="Seguir puntos en el procesamiento automático",
+                        variable=self.track_points_var).pack(side=tk.LEFT, padx=(15, 0))
+        ttk.Button(patch_frame, text="🎯 Registrar Cuadros",
+                   command=self._register_frames).pack(side=tk.LEFT, padx=(15, 0))
+        ttk.Button(patch_frame, text="🎨 Calibrar Paleta",
+                   command=self._calibrate_palette).pack(side=tk.LEFT, padx=5)
+        
+        # Perfil de temperatura a lo largo del alambre
+        wire_frame = ttk.Frame(results_frame)
+        wire_frame.grid(row=2, column=0, columnspan=3, sticky="w", pady=(5, 0))
+        self.wire_button = ttk.Button(wire_frame, text="〰 Trazar Alambre", command=self._toggle_wire_drawing)
+        self.wire_button.pack(side=tk.LEFT)
+        self.wire_spline_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(wire_frame, text="Spline", variable=self.wire_spline_var,
+                        command=self._draw_wire).pack(side=tk.LEFT, padx=5)
+        ttk.Button(wire_frame, text="📈 Perfil del Alambre",
+                   command=self._build_wire_profile).pack(side=tk.LEFT, padx=5)
+        self.wire_label = ttk.Label(wire_frame, text="Trayectoria: sin definir")
+        self.wire_label.pack(side=tk.LEFT, padx=10)
     
     def _select_folder(self):
         """Selecciona la carpeta con imágenes"""
@@ -144,6 +220,17 @@ class TemperatureAnalyzer:
                     messagebox.showerror("Error", "El CSV RGB no contiene las columnas necesarias")
                     self.rgb_data = None
                     return
+
+                # Tabla RGB -> temperatura precalculada (en caché por hash del CSV y k)
+                self.root.config(cursor="watch")
+                self.root.update_idletasks()
+                self.rgb_lut = RGBTemperatureLUT.from_csv(csv_file)
+                if cKDTree is not None:
+                    self.rgb_model = NearestNeighbourTemperatureModel.from_dataframe(self.rgb_data)
+                self.root.config(cursor="")
+                if self.rgb_lut.max_error is not None:
+                    print(f"Tabla RGB construida, error p99: {self.rgb_lut.p99_error:.3f} °C, "
+                          f"máximo: {self.rgb_lut.max_error:.3f} °C")
                 messagebox.showinfo("Información", f"Archivo RGB-Temperatura cargado: {csv_file}")
             except Exception as e:
                 messagebox.showerror("Error", f"Error al cargar RGB-Temperatura: {str(e)}")
@@ -167,6 +254,12 @@ class TemperatureAnalyzer:
             self.current_image_index = 0
             self.first_points_set = False
             self.deleted_images.clear()
+            self.suggested_deletions.clear()
+            self.palette = None
+            self.image_cache.clear()
+            self._set_point_count()
+            self._load_cached_offsets()
+            self._open_journal()
             self._load_current_image()
             
         except Exception as e:
@@ -174,29 +267,9 @@ class TemperatureAnalyzer:
     
     def _match_images_to_timestamps(self):
         """Busca imágenes correspondientes a los timestamps"""
-        self.images_list = []
+        index = ImageIndex.for_folder(self.images_folder)
         timestamps = self.data_df['timestamp'].astype(str).tolist()
-        all_files = [f for f in os.listdir(self.images_folder) 
-                    if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
-        
-        for ts in timestamps:
-            matched_file = self._find_matching_file(str(ts), all_files)
-            if matched_file:
-                self.images_list.append(matched_file)
-    
-    def _find_matching_file(self, timestamp, files):
-        """Encuentra el archivo que coincide con el timestamp"""
-        # Coincidencia exacta
-        for file in files:
-            if timestamp in file:
-                return file
-        
-        # Coincidencia por números extraídos
-        for file in files:
-            numbers = re.findall(r'\d+', file)
-            if timestamp in numbers:
-                return file
-        return None
+        self.images_list = [f for f in index.match_all(timestamps, self.match_tolerance_s) if f]
     
     def _load_current_image(self):
         """Carga y muestra la imagen actual"""
@@ -211,7 +284,9 @@ class TemperatureAnalyzer:
         
         # Mostrar estado de eliminación
         if self.current_image_index in self.deleted_images:
-            self.status_label.config(text="ELIMINADA", foreground="red")
+            reason = self.suggested_deletions.get(self.current_image_index)
+            self.status_label.config(text=f"ELIMINADA (sugerida: {reason})" if reason else "ELIMINADA",
+                                     foreground="red")
         else:
             self.status_label.config(text="", foreground="black")
         
@@ -222,46 +297,105 @@ class TemperatureAnalyzer:
             self._calculate_temperatures()
         except Exception as e:
             messagebox.showerror("Error", f"Error al cargar imagen: {str(e)}")
+        
+        # Precargar las imágenes vecinas mientras se revisa la actual
+        neighbours = [i for i in (self.current_image_index + 1, self.current_image_index - 1)
+                      if 0 <= i < len(self.images_list)]
+        self.image_cache.prefetch([os.path.join(self.images_folder, self.images_list[i])
+                                   for i in neighbours])
     
     def _restore_or_set_default_positions(self, timestamp):
         """Restaura posiciones guardadas o establece posiciones por defecto"""
-        if timestamp in self.temp_data:
+        saved_points = self.temp_data.get(timestamp)
+        if saved_points is not None:
             # Restaurar posiciones guardadas
-            for i, point_data in enumerate(self.temp_data[timestamp]):
+            for i, point_data in enumerate(saved_points):
                 if point_data is not None:
                     self.point_positions[i] = (point_data['x'], point_data['y'])
         elif self.default_positions:
-            # Usar posiciones por defecto
-            self.point_positions = self.default_positions.copy()
+            # Usar posiciones por defecto (trasladadas según el registro del cuadro)
+            offsets = self._point_offsets()
+            image_name = self.images_list[self.current_image_index]
+            self.point_positions = [shift_position(pos, offsets, image_name)
+                                    for pos in self.default_positions]
         else:
             # Resetear posiciones
-            self.point_positions = [None, None, None]
+            self.point_positions = [None] * self.n_points
+    
+    def _set_point_count(self):
+        """Aplica el número de puntos elegido y reserva la tabla para todos los timestamps"""
+        try:
+            n_points = max(1, int(self.n_points_var.get()))
+        except (tk.TclError, ValueError):
+            n_points = self.n_points
+        if n_points != self.n_points:
+            self.n_points = n_points
+            self.default_positions = None
+            self._build_temp_labels()
+            if self.fig is not None:
+                self._create_point_markers()
+                self.ax.set_title(f"Haga clic para seleccionar {self.n_points} puntos")
+        self.point_positions = [None] * self.n_points
+        self.temp_data = PointTable(self.n_points, self.data_df['timestamp'].tolist())
+    
+    def _build_temp_labels(self):
+        for label in self.temp_labels:
+            label.destroy()
+        self.temp_labels = []
+        for i in range(self.n_points):
+            label = ttk.Label(self.labels_frame, text=f"Punto {i+1}: --")
+            label.grid(row=i // 5, column=i % 5, padx=20)
+            self.temp_labels.append(label)
+    
+    def _create_point_markers(self):
+        """Un marcador por punto; los colores siguen el ciclo de matplotlib a partir de los originales"""
+        for marker in self.point_markers:
+            marker.remove()
+        colors = ['red', 'green', 'magenta'] + [f"C{i}" for i in range(10)]
+        self.point_markers = [self.ax.plot([], [], 'o', color=colors[i % len(colors)], markersize=10,
+                                           label=f"Punto {i+1}", visible=False)[0]
+                              for i in range(self.n_points)]
     
     def _setup_image_canvas(self, image_path):
-        """Configura el canvas para mostrar la imagen"""
-        # Limpiar canvas anterior
-        for widget in self.image_frame.winfo_children():
-            widget.destroy()
-        
-        self.img = Image.open(image_path)
-        
-        plt.close('all')
-        self.fig, self.ax = plt.subplots(figsize=(12, 8))
-        self.ax.imshow(self.img)
-        self.ax.set_title("Haga clic para seleccionar 3 puntos")
-        self.ax.axis('off')
+        """Muestra la imagen en la figura persistente (se crea solo la primera vez)"""
+        self.img = self.image_cache.get(image_path)
+        height, width = self.img.shape[:2]
         
-        canvas_widget = FigureCanvasTkAgg(self.fig, master=self.image_frame)
-        self.canvas = canvas_widget.get_tk_widget()
-        self.canvas.pack(fill=tk.BOTH, expand=True)
+        if self.fig is None:
+            self.fig, self.ax = plt.subplots(figsize=(12, 8))
+            self.image_artist = self.ax.imshow(self.img)
+            self.ax.set_title(f"Haga clic para seleccionar {self.n_points} puntos")
+            self.ax.axis('off')
+            
+            self._create_point_markers()
+            self.wire_line = self.ax.plot([], [], '-', color='cyan', linewidth=1.5)[0]
+            self._draw_wire()
+            
+            canvas_widget = FigureCanvasTkAgg(self.fig, master=self.image_frame)
+            self.canvas = canvas_widget.get_tk_widget()
+            self.canvas.pack(fill=tk.BOTH, expand=True)
+            
+            self.fig.canvas.mpl_connect('button_press_event', self._on_click)
+        else:
+            self.image_artist.set_data(self.img)
         
-        self.fig.canvas.mpl_connect('button_press_event', self._on_click)
+        # Ajustar los ejes si cambia el tamaño de la imagen
+        extent = (-0.5, width - 0.5, height - 0.5, -0.5)
+        if tuple(self.image_artist.get_extent()) != extent:
+            self.image_artist.set_extent(extent)
+            self.ax.set_xlim(-0.5, width - 0.5)
+            self.ax.set_ylim(height - 0.5, -0.5)
     
     def _on_click(self, event):
         """Maneja clics en la imagen para seleccionar puntos"""
         if event.xdata is None or event.ydata is None:
             return
         
+        if self.drawing_wire:
+            self.wire_vertices.append((float(event.xdata), float(event.ydata)))
+            self._draw_wire()
+            return
+        
         x, y = int(event.xdata), int(event.ydata)
         
         # Encontrar punto más cercano o crear nuevo
@@ -281,11 +415,14 @@ class TemperatureAnalyzer:
             not self.first_points_set):
             self.default_positions = self.point_positions.copy()
             self.first_points_set = True
+            self.reference_image_index = self.current_image_index
+            self._log_edit({'op': 'defaults', 'positions': self.default_positions,
+                            'reference': self.reference_image_index})
             messagebox.showinfo("Información", 
                 "Posiciones iniciales establecidas como referencia por defecto.")
         
         self._draw_points()
-        self._calculate_temperatures()
+        self._calculate_temperatures(record=True)
     
     def _find_closest_point(self, x, y, threshold=20):
         """Encuentra el punto más cercano dentro del umbral"""
@@ -302,78 +439,108 @@ class TemperatureAnalyzer:
         return closest_idx
     
     def _draw_points(self):
-        """Dibuja los puntos en la imagen"""
-        # Limpiar marcadores anteriores
-        for marker in self.point_markers:
-            if marker:
-                marker.remove()
-        self.point_markers = []
-        
-        colors = ['red', 'green', 'magenta']
-        
-        for i, pos in enumerate(self.point_positions):
+        """Actualiza los marcadores de los puntos sin recrearlos"""
+        for marker, pos in zip(self.point_markers, self.point_positions):
             if pos is not None:
-                x, y = pos
-                marker = self.ax.plot(x, y, 'o', color=colors[i], markersize=10, 
-                                     label=f"Punto {i+1}")[0]
-                self.point_markers.append(marker)
+                marker.set_data([pos[0]], [pos[1]])
+            marker.set_visible(pos is not None)
         
-        if any(pos is not None for pos in self.point_positions):
-            self.ax.legend()
+        visible = [marker for marker in self.point_markers if marker.get_visible()]
+        legend = self.ax.get_legend()
+        if visible:
+            self.ax.legend(handles=visible)
+        elif legend is not None:
+            legend.remove()
         
-        self.fig.canvas.draw()
+        self.fig.canvas.draw_idle()
     
-    def _calculate_temperatures(self):
-        """Calcula temperaturas para los puntos seleccionados"""
+    def _calculate_temperatures(self, record=False):
+        """Calcula temperaturas para los puntos seleccionados (estadísticas del parche)
+        
+        Solo con `record` (edición del usuario) se guardan en temp_data y en el diario;
+        al navegar o cambiar el parche únicamente se actualizan las etiquetas.
+        """
         if not hasattr(self, 'img') or self.img is None:
             return
         
         timestamp = self.data_df['timestamp'].iloc[self.current_image_index]
         
-        if timestamp not in self.temp_data:
-            self.temp_data[timestamp] = [None, None, None]
+        if record:
+            self.temp_data.ensure(timestamp)
         
         # Resetear etiquetas
-        for i in range(3):
-            self.temp_labels[i].config(text=f"Punto {i+1}: --")
+        for i, label in enumerate(self.temp_labels):
+            label.config(text=f"Punto {i+1}: --")
         
-        # Calcular para cada punto
-        for i, pos in enumerate(self.point_positions):
-            if pos is not None:
-                try:
-                    x, y = pos
-                    r, g, b = self.img.getpixel((x, y))[:3]
-                    temp = self._infer_temperature_fuzzy(r, g, b)
-                    
-                    self.temp_data[timestamp][i] = {
-                        'x': x, 'y': y, 'r': r, 'g': g, 'b': b, 'temperature': temp
-                    }
-                    
-                    self.temp_labels[i].config(
-                        text=f"Punto {i+1}: {temp:.2f} °C (R={r}, G={g}, B={b})")
-                    
-                except Exception as e:
-                    print(f"Error al procesar punto {i+1}: {str(e)}")
-        
-        self.root.update_idletasks()
-    
-    def _infer_temperature_fuzzy(self, r, g, b, k=10):
-        """Infiere temperatura usando enfoque fuzzy"""
-        if self.rgb_data is None:
-            return 0
-        
-        temps = self.rgb_data['Temperature'].values
-        rgb_data = self.rgb_data[['R', 'G', 'B']].values
+        height, width = self.img.shape[:2]
+        selected = [i for i, pos in enumerate(self.point_positions)
+                    if pos is not None and 0 <= pos[0] < width and 0 <= pos[1] < height]
+        if not selected or self.rgb_data is None:
+            self.root.update_idletasks()
+            return
         
-        input_rgb = np.array([r, g, b])
-        distances = np.linalg.norm(rgb_data - input_rgb, axis=1)
-        weights = np.exp(-k * distances**2)
+        try:
+            radius, shape = self._patch_settings()
+            stats = patch_statistics(self.img, [self.point_positions[i] for i in selected],
+                                     self._infer_temperature_array, radius, shape)
+        except Exception as e:
+            print(f"Error al procesar puntos: {str(e)}")
+            return
         
-        if np.sum(weights) < 1e-8:
-            return temps[np.argmin(distances)]
+        for j, i in enumerate(selected):
+            x, y = self.point_positions[i]
+            r, g, b = (int(v) for v in self.img[y, x, :3])
+            temp = float(stats['mean'][j])
+            
+            point = {
+                'x': x, 'y': y, 'r': r, 'g': g, 'b': b, 'temperature': temp,
+                'median': float(stats['median'][j]), 'max': float(stats['max'][j]),
+                'std': float(stats['std'][j])
+            }
+            if record:
+                self.temp_data.set_point(timestamp, i, point)
+                self._log_edit({'op': 'point', 'ts': str(timestamp), 'i': i, 'point': point})
+            
+            # Distancia RGB a la tabla de calibración como medida de confianza
+            confidence = ""
+            if self.rgb_model is not None:
+                distance = self.rgb_model.infer([r, g, b])[1]
+                confidence = f", dist={float(distance):.1f}"
+            self.temp_labels[i].config(
+                text=f"Punto {i+1}: {temp:.2f} ± {stats['std'][j]:.2f} °C, "
+                     f"máx {stats['max'][j]:.2f} (R={r}, G={g}, B={b}{confidence})")
         
-        weights /= np.sum(weights)
-        return np.dot(weights, temps)
+        self.root.update_idletasks()
+    
+    def _patch_settings(self):
+        """Radio y forma del parche elegidos en la interfaz"""
+        try:
+            radius = max(0, int(self.patch_radius_var.get()))
+        except (tk.TclError, ValueError):
+            radius = 0
+        return radius, self.patch_shape_var.get()
+    
+    def _on_patch_changed(self):
+        if self.images_list and self.img is not None:
+            self._calculate_temperatures()
+    
+    def _infer_temperature_array(self, rgb, k=10):
+        """Inferencia fuzzy (vía la tabla precalculada) para un arreglo (..., 3)"""
+        rgb = np.asarray(rgb)
+        lut = self._current_lut()
+        if lut is not None and lut.k == k:
+            return lut.lookup(rgb)
+        temps = infer_temperature_fuzzy(self.rgb_data[['R', 'G', 'B']].values,
+                                        self.rgb_data['Temperature'].values, rgb.reshape(-1, 3), k)
+        return temps.reshape(rgb.shape[:-1])
+    
+    def _current_lut(self):
+        """Tabla de la imagen actual: la de su escala si la paleta está calibrada"""
+        if self.palette is not None and self.images_list:
+            lut = self.palette.lut_for(self.images_list[self.current_image_index])
+            if lut is not None:
+                return lut
+        return self.rgb_lut
     
     def _delete_current_image(self):
         """Elimina/restaura la imagen actual del análisis"""
@@ -383,6 +550,9 @@ class TemperatureAnalyzer:
         if self.current_image_index in self.deleted_images:
             # Restaurar imagen
             self.deleted_images.remove(self.current_image_index)
+            self.suggested_deletions.pop(self.current_image_index, None)
+            self.unsaved_deletions = True
+            self._log_edit({'op': 'restore', 'ts': str(self.data_df['timestamp'].iloc[self.current_image_index])})
             self.status_label.config(text="", foreground="black")
             messagebox.showinfo("Información", "Imagen restaurada al análisis")
         else:
@@ -391,12 +561,12 @@ class TemperatureAnalyzer:
                 "¿Está seguro de eliminar esta imagen del análisis?\n"
                 "No se incluirá en el CSV final."):
                 self.deleted_images.add(self.current_image_index)
-                self.status_label.config(text="ELIMINADA", foreground="red")
-                
+                self.unsaved_deletions = True
                 # Eliminar datos de temperatura asociados
                 timestamp = self.data_df['timestamp'].iloc[self.current_image_index]
-                if timestamp in self.temp_data:
-                    del self.temp_data[timestamp]
+                self._log_edit({'op': 'delete', 'ts': [str(timestamp)]})
+                self.status_label.config(text="ELIMINADA", foreground="red")
+                self.temp_data.drop(timestamp)
                 
                 # Limpiar visualización
                 for label in self.temp_labels:
@@ -423,18 +593,21 @@ class TemperatureAnalyzer:
             self.current_image_index = len(self.images_list) - 1
             self._load_current_image()
     
-    def _save_data(self):
+    def _save_data(self, on_complete=None):
         """Guarda los datos de temperatura, procesando automáticamente imágenes válidas"""
         if self.data_df is None:
             messagebox.showwarning("Advertencia", "No hay datos para guardar")
-            return
+            return False
+        
+        if self.batch_runner is not None:
+            messagebox.showwarning("Advertencia", "Hay un procesamiento en curso")
+            return False
         
         if not self._validate_save_conditions():
-            return
+            return False
         
         try:
             self._prepare_dataframe_columns()
-            current_index = self.current_image_index
             
             # Procesar imágenes no visitadas (excluyendo eliminadas)
             unprocessed = self._get_unprocessed_images()
@@ -442,10 +615,23 @@ class TemperatureAnalyzer:
             if unprocessed and self.default_positions:
                 if messagebox.askyesno("Procesar imágenes", 
                     f"¿Procesar {len(unprocessed)} imágenes automáticamente?"):
-                    self._process_images_batch(unprocessed)
+                    self._process_images_batch(
+                        unprocessed, lambda cancelled: self._finish_save(on_complete))
+                    return True
+            
+            self._finish_save(on_complete)
+            return True
             
-            self._update_dataframe_with_temperatures()
-            self._save_filtered_dataframe()
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al guardar: {str(e)}")
+            return False
+    
+    def _finish_save(self, on_complete=None):
+        """Actualiza el DataFrame y escribe el CSV (al terminar el procesamiento en lote)"""
+        current_index = self.current_image_index
+        try:
+            if self._has_unsaved_changes():
+                self._write_data_csv()
             
             messagebox.showinfo("Éxito", "Datos guardados correctamente")
             self.current_image_index = current_index
@@ -453,6 +639,9 @@ class TemperatureAnalyzer:
             
         except Exception as e:
             messagebox.showerror("Error", f"Error al guardar: {str(e)}")
+        
+        if on_complete is not None:
+            on_complete()
     
     def _validate_save_conditions(self):
         """Valida condiciones para guardar"""
@@ -462,100 +651,475 @@ class TemperatureAnalyzer:
                 return False
             else:
                 # Usar primera entrada como referencia
-                first_timestamp = next(iter(self.temp_data))
-                if all(point is not None for point in self.temp_data[first_timestamp]):
+                first_points = self.temp_data.first()
+                if all(point is not None for point in first_points):
                     self.default_positions = [(point['x'], point['y']) 
-                                            for point in self.temp_data[first_timestamp]]
+                                            for point in first_points]
+                    rows = np.flatnonzero(self.data_df['timestamp'].values == self.temp_data.first_timestamp())
+                    self.reference_image_index = int(rows[0]) if len(rows) else None
         return True
     
     def _prepare_dataframe_columns(self):
         """Prepara columnas en el DataFrame"""
-        for i in range(3):
-            for col_type in ['temp', 'x', 'y']:
-                col_name = f'{col_type}_point{i+1}'
-                if col_name not in self.data_df.columns:
-                    self.data_df[col_name] = None
+        for col_name in self.temp_data.output_columns():
+            if col_name not in self.data_df.columns:
+                self.data_df[col_name] = None
     
     def _get_unprocessed_images(self):
         """Obtiene lista de imágenes no procesadas y no eliminadas"""
-        unprocessed = []
-        for i, timestamp in enumerate(self.data_df['timestamp']):
-            if (timestamp not in self.temp_data and 
-                i < len(self.images_list) and 
-                i not in self.deleted_images):
-                unprocessed.append((i, timestamp))
-        return unprocessed
-    
-    def _process_images_batch(self, unprocessed_list):
-        """Procesa un lote de imágenes automáticamente"""
-        progress_window = self._create_progress_window(len(unprocessed_list))
-        
-        for count, (idx, ts) in enumerate(unprocessed_list):
-            image_path = os.path.join(self.images_folder, self.images_list[idx])
+        timestamps = self.data_df['timestamp']
+        mask = ~timestamps.isin(self.temp_data.processed_timestamps()).values
+        mask[len(self.images_list):] = False
+        mask[list(self.deleted_images)] = False
+        return [(i, timestamps.iloc[i]) for i in np.flatnonzero(mask)]
+    
+    def _process_images_batch(self, unprocessed_list, on_done):
+        """Procesa un lote de imágenes en paralelo sin bloquear la interfaz"""
+        tasks = [(idx, ts, os.path.join(self.images_folder, self.images_list[idx]))
+                 for idx, ts in unprocessed_list]
+        radius, shape = self._patch_settings()
+        reference = self.reference_image_index
+        if (self.track_points_var.get() and reference is not None and
+                reference < len(self.images_list)):
+            # Seguimiento cuadro a cuadro: bloques contiguos anclados al cuadro de referencia
+            reference_path = os.path.join(self.images_folder, self.images_list[reference])
+            self._run_batch(track_points_chunk, split_chunks(tasks, max_chunk=128),
+                            (reference_path, list(self.default_positions), radius, shape,
+                             self._point_offsets()),
+                            "Siguiendo puntos", self._merge_point_results, on_done)
+        else:
+            self._run_batch(process_points_chunk, split_chunks(tasks),
+                            (list(self.default_positions), radius, shape, self._point_offsets()),
+                            "Procesando imágenes", self._merge_point_results, on_done)
+    
+    def _merge_point_results(self, result):
+        """Incorpora los resultados de un bloque procesado"""
+        results, errors = result
+        self.temp_data.update([(ts, points) for idx, ts, points in results])
+        for error in errors:
+            print(error)
+    
+    def _toggle_wire_drawing(self):
+        """Inicia o termina el trazo de la trayectoria del alambre con clics sobre la imagen"""
+        if not self.drawing_wire:
+            self.wire_vertices = []
+            self.drawing_wire = True
+            self.wire_button.config(text="✔ Terminar Alambre")
+            self.wire_label.config(text="Haga clic a lo largo del alambre")
+        else:
+            self.drawing_wire = False
+            self.wire_button.config(text="〰 Trazar Alambre")
+            if len(self.wire_vertices) < 2:
+                self.wire_vertices = []
+                messagebox.showwarning("Advertencia", "La trayectoria necesita al menos dos puntos")
+        self._draw_wire()
+    
+    def _draw_wire(self):
+        """Dibuja la trayectoria del alambre (remuestreada si hay suficientes vértices)"""
+        if len(self.wire_vertices) >= 2:
+            xy, arc = resample_path(self.wire_vertices, spline=self.wire_spline_var.get())
+            self.wire_label.config(text=f"Trayectoria: {len(self.wire_vertices)} vértices, "
+                                        f"{arc[-1]:.0f} px")
+        else:
+            xy = np.asarray(self.wire_vertices, dtype=np.float64).reshape(-1, 2)
+            if not self.drawing_wire:
+                self.wire_label.config(text="Trayectoria: sin definir")
+        
+        if self.wire_line is not None:
+            self.wire_line.set_data(xy[:, 0], xy[:, 1])
+            self.fig.canvas.draw_idle()
+    
+    def _build_wire_profile(self):
+        """Muestrea la temperatura a lo largo del alambre en todas las imágenes válidas"""
+        if not self.images_list or self.rgb_lut is None:
+            messagebox.showwarning("Advertencia", "Debe iniciar el análisis con un CSV RGB cargado")
+            return
+        if len(self.wire_vertices) < 2 or self.drawing_wire:
+            messagebox.showwarning("Advertencia", "Primero trace y termine la trayectoria del alambre")
+            return
+        if self.batch_runner is not None:
+            messagebox.showwarning("Advertencia", "Hay un procesamiento en curso")
+            return
+        
+        valid = [i for i in range(len(self.images_list)) if i not in self.deleted_images]
+        image_paths = [os.path.join(self.images_folder, self.images_list[i]) for i in valid]
+        timestamps = [self.data_df['timestamp'].iloc[i] for i in valid]
+        output_dir = os.path.join(self.images_folder, 'wire_profile')
+        spline = self.wire_spline_var.get()
+        
+        try:
+            xy, arc = resample_path(self.wire_vertices, spline=spline)
+            profile_path, tasks = prepare_profile(image_paths, timestamps, xy, arc,
+                                                  self.wire_vertices, spline, output_dir)
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al preparar el perfil: {str(e)}")
+            return
+        
+        summaries = []
+        def on_result(result):
+            chunk_summaries, errors = result
+            summaries.extend(chunk_summaries)
+            for error in errors:
+                print(error)
+        
+        def on_done(cancelled):
+            if cancelled:
+                messagebox.showinfo("Perfil del alambre", "Procesamiento cancelado")
+                return
             try:
-                img = Image.open(image_path)
-                self.temp_data[ts] = [None, None, None]
-                
-                for i, pos in enumerate(self.default_positions):
-                    if pos and 0 <= pos[0] < img.width and 0 <= pos[1] < img.height:
-                        x, y = pos
-                        r, g, b = img.getpixel((x, y))[:3]
-                        temp = self._infer_temperature_fuzzy(r, g, b)
-                        
-                        self.temp_data[ts][i] = {
-                            'x': x, 'y': y, 'r': r, 'g': g, 'b': b, 'temperature': temp
-                        }
-                
-                self._update_progress(progress_window, count + 1, len(unprocessed_list))
-                
+                merge_summaries(self.data_df, summaries)
+                self._prepare_dataframe_columns()
+                self._write_data_csv()
+                messagebox.showinfo("Perfil del alambre", f"Perfil tiempo × arco guardado en:\n{output_dir}\n"
+                                    f"Resumen por imagen agregado a {os.path.basename(self.data_csv_file)}")
             except Exception as e:
-                print(f"Error procesando {image_path}: {str(e)}")
+                messagebox.showerror("Error", f"Error al guardar el perfil: {str(e)}")
         
-        progress_window.destroy()
+        self._run_batch(fill_profile_chunk, split_chunks(tasks),
+                        (profile_path, xy, arc, self._point_offsets()),
+                        "Muestreando el alambre", on_result, on_done)
+    
+    def _registration_reference(self):
+        """Imagen de referencia del registro (la primera) y tamaño reducido de trabajo"""
+        reference = self.images_list[0]
+        return reference, registration_size(os.path.join(self.images_folder, reference))
+    
+    def _load_cached_offsets(self):
+        """Carga el registro de cuadros guardado en la carpeta, si existe"""
+        try:
+            reference, size = self._registration_reference()
+            self.frame_offsets = load_offsets(self.images_folder, reference, size)
+        except Exception as e:
+            print(f"No se pudo cargar el registro de cuadros: {str(e)}")
+            self.frame_offsets = {}
+    
+    def _point_offsets(self):
+        """Desplazamientos por imagen respecto a la imagen donde se definieron los puntos"""
+        if not self.frame_offsets:
+            return None
+        index = self.reference_image_index
+        if index is None or index >= len(self.images_list):
+            index = 0
+        return relative_offsets(self.frame_offsets, self.images_list[index])
     
-    def _create_progress_window(self, total):
+    def _register_frames(self):
+        """Estima la traslación de cada cuadro (correlación de fase) y la guarda en caché"""
+        if not self.images_list:
+            messagebox.showwarning("Advertencia", "Debe iniciar el análisis primero")
+            return
+        if self.batch_runner is not None:
+            messagebox.showwarning("Advertencia", "Hay un procesamiento en curso")
+            return
+        
+        try:
+            reference, size = self._registration_reference()
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al leer la imagen de referencia: {str(e)}")
+            return
+        offsets = load_offsets(self.images_folder, reference, size)
+        tasks = [(i, None, os.path.join(self.images_folder, name))
+                 for i, name in enumerate(self.images_list) if name not in offsets]
+        
+        def on_result(result):
+            results, errors = result
+            for name, dx, dy, response in results:
+                offsets[name] = (dx, dy, response)
+            for error in errors:
+                print(error)
+        
+        def on_done(cancelled):
+            # Lo ya calculado se guarda aunque se cancele; se completa en la siguiente ejecución
+            save_offsets(self.images_folder, reference, size, offsets)
+            self.frame_offsets = offsets
+            weak = sum(1 for values in offsets.values() if values[2] < 0.1)
+            largest = max((np.hypot(v[0], v[1]) for v in offsets.values()), default=0.0)
+            messagebox.showinfo("Registro de cuadros",
+                                f"Cuadros registrados: {len(offsets)} de {len(self.images_list)}\n"
+                                f"Desplazamiento máximo: {largest:.1f} px\n"
+                                f"Registros poco confiables: {weak}")
+            self._load_current_image()
+        
+        if not tasks:
+            on_done(False)
+            return
+        self._run_batch(register_chunk, split_chunks(tasks),
+                        (os.path.join(self.images_folder, reference), size),
+                        "Registrando cuadros", on_result, on_done, use_lut=False)
+    
+    def _calibrate_palette(self):
+        """Lee la barra de color y la escala de cada cuadro para usar una tabla por rango"""
+        if not self.images_list or self.rgb_lut is None or self.img is None:
+            messagebox.showwarning("Advertencia", "Debe iniciar el análisis con un CSV RGB cargado")
+            return
+        if self.batch_runner is not None:
+            messagebox.showwarning("Advertencia", "Hay un procesamiento en curso")
+            return
+        
+        layout_path = os.path.join(self.images_folder, LAYOUT_FILE)
+        if not os.path.exists(layout_path):
+            layout_path = filedialog.askopenfilename(
+                title="Seleccionar posición de la barra de color (colorbar.json)",
+                filetypes=[("Archivos JSON", "*.json"), ("Todos los archivos", "*.*")])
+            if not layout_path:
+                return
+        try:
+            layout = load_layout(layout_path)
+            # La paleta se toma de la imagen actual; solo cambia la escala entre cuadros
+            normalized = build_normalized_lut(read_colorbar(self.img, layout), self.rgb_lut.k,
+                                              self.rgb_lut.bits,
+                                              os.path.join(self.images_folder, '.rgb_lut_cache'))
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al leer la barra de color: {str(e)}")
+            return
+        
+        scales = load_scales(self.images_folder)
+        tasks = [(i, None, os.path.join(self.images_folder, name))
+                 for i, name in enumerate(self.images_list) if name not in scales]
+        failed = []
+        def on_result(result):
+            results, errors = result
+            for name, tmin, tmax in results:
+                scales[name] = (tmin, tmax)
+            failed.extend(errors)
+        
+        def on_done(cancelled):
+            save_scales(self.images_folder, scales)
+            self.palette = PaletteCalibration(normalized, scales)
+            ranges = {(round(a, 1), round(b, 1)) for a, b in scales.values()}
+            for error in failed[:20]:
+                print(error)
+            messagebox.showinfo("Calibración de paleta",
+                                f"Imágenes con escala: {len(scales)} de {len(self.images_list)}\n"
+                                f"Rangos distintos: {len(ranges)}\n"
+                                f"Escalas no legibles: {len(failed)} (usan la tabla general)")
+            self._calculate_temperatures()
+        
+        if not tasks:
+            on_done(False)
+            return
+        self._run_batch(scale_chunk, split_chunks(tasks), (layout,), "Leyendo escalas",
+                        on_result, on_done, use_lut=False)
+    
+    def _detect_bad_frames(self):
+        """Evalúa la calidad de todas las imágenes y marca como eliminadas las sospechosas"""
+        if not self.images_list:
+            messagebox.showwarning("Advertencia", "Debe iniciar el análisis primero")
+            return
+        if self.batch_runner is not None:
+            messagebox.showwarning("Advertencia", "Hay un procesamiento en curso")
+            return
+        
+        tasks = [(i, None, os.path.join(self.images_folder, name))
+                 for i, name in enumerate(self.images_list)]
+        metrics = []
+        def on_result(result):
+            results, errors = result
+            metrics.extend(results)
+            for error in errors:
+                print(error)
+        
+        def on_done(cancelled):
+            if cancelled or not metrics:
+                return
+            quality = suggest_bad_frames(metrics)
+            save_quality(quality, self.images_folder, self.images_list)
+            flagged = quality[quality['reason'] != '']
+            self._apply_suggestions(dict(zip(flagged['index'].astype(int), flagged['reason'])))
+            timestamps = self.data_df['timestamp']
+            self._log_edit({'op': 'suggest', 'reasons': {str(timestamps.iloc[i]): reason for i, reason
+                                                         in self.suggested_deletions.items()}})
+            messagebox.showinfo("Calidad de imágenes",
+                                f"Imágenes marcadas para eliminar: {len(flagged)} de {len(quality)}\n"
+                                "Use '⚑ Siguiente Marcada' para revisarlas y "
+                                "'Eliminar Imagen' para restaurar las que sean válidas.")
+            self._load_current_image()
+        
+        self._run_batch(quality_chunk, split_chunks(tasks), (), "Evaluando imágenes",
+                        on_result, on_done, use_lut=False)
+    
+    def _apply_suggestions(self, reasons):
+        """Reemplaza las marcas automáticas anteriores y elimina las nuevas como el borrado manual"""
+        # Las marcas de una detección anterior que siguen eliminadas se restauran
+        self.deleted_images -= set(self.suggested_deletions)
+        self.suggested_deletions = dict(reasons)
+        self.deleted_images |= set(reasons)
+        for index in reasons:
+            if index < len(self.data_df):
+                self.temp_data.drop(self.data_df['timestamp'].iloc[index])
+        self.unsaved_deletions = True
+    
+    def _go_to_next_flagged(self):
+        """Salta a la siguiente imagen marcada automáticamente (vuelve al inicio al final)"""
+        flagged = sorted(i for i in self.suggested_deletions if i in self.deleted_images)
+        if not flagged:
+            messagebox.showinfo("Información", "No hay imágenes marcadas pendientes")
+            return
+        later = [i for i in flagged if i > self.current_image_index]
+        self.current_image_index = later[0] if later else flagged[0]
+        self._load_current_image()
+    
+    def _build_temperature_maps(self):
+        """Convierte todas las imágenes válidas en un cubo de temperaturas en disco"""
+        if not self.images_list or self.rgb_lut is None:
+            messagebox.showwarning("Advertencia", "Debe iniciar el análisis con un CSV RGB cargado")
+            return
+        if self.batch_runner is not None:
+            messagebox.showwarning("Advertencia", "Hay un procesamiento en curso")
+            return
+        
+        valid = [i for i in range(len(self.images_list)) if i not in self.deleted_images]
+        image_paths = [os.path.join(self.images_folder, self.images_list[i]) for i in valid]
+        timestamps = [self.data_df['timestamp'].iloc[i] for i in valid]
+        output_dir = os.path.join(self.images_folder, 'temperature_cube')
+        
+        try:
+            cube_path, tasks = prepare_temperature_cube(image_paths, timestamps, output_dir)
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al generar mapas: {str(e)}")
+            return
+        
+        failed = []
+        def on_done(cancelled):
+            status = "cancelado" if cancelled else "guardado"
+            messagebox.showinfo("Mapas de temperatura", f"Cubo de temperaturas {status} en:\n{output_dir}\n"
+                                f"Imágenes con error: {len(failed)}")
+        
+        self._run_batch(fill_cube_chunk, split_chunks(tasks, max_chunk=32), (cube_path,),
+                        "Generando mapas de temperatura", failed.extend, on_done)
+    
+    def _run_batch(self, func, chunks, args, title, on_result, on_done, use_lut=True):
+        """Lanza un procesamiento en paralelo y consulta su cola de progreso desde Tk"""
+        palette = None
+        if use_lut and self.palette is not None:
+            palette = (self.palette.normalized.path, self.palette.scales)
+        runner = BatchRunner(func, chunks, self.rgb_lut if use_lut else None, args=args, palette=palette)
+        self.batch_runner = runner
+        window = self._create_progress_window(runner.total, title, cancel=runner.cancel)
+        runner.start()
+        self.root.after(100, self._poll_batch, runner, window, on_result, on_done)
+    
+    def _poll_batch(self, runner, window, on_result, on_done):
+        """Procesa los mensajes pendientes del procesamiento en paralelo"""
+        try:
+            while True:
+                message = runner.queue.get_nowait()
+                if message[0] == 'result':
+                    on_result(message[1])
+                elif message[0] == 'progress':
+                    self._update_progress(window, message[1], message[2])
+                elif message[0] == 'finished':
+                    window.destroy()
+                    self.batch_runner = None
+                    if message[2]:
+                        messagebox.showerror("Error", f"Error en el procesamiento: {message[2]}")
+                    on_done(message[1])
+                    return
+        except queue.Empty:
+            pass
+        self.root.after(100, self._poll_batch, runner, window, on_result, on_done)
+    
+    def _create_progress_window(self, total, title="Procesando imágenes", cancel=None):
         """Crea ventana de progreso"""
         progress_window = tk.Toplevel(self.root)
-        progress_window.title("Procesando imágenes")
-        progress_window.geometry("300x100")
+        progress_window.title(title)
+        progress_window.geometry("300x130")
         
-        progress_window.label = ttk.Label(progress_window, text="Procesando imágenes...")
+        progress_window.label = ttk.Label(progress_window, text=f"{title}...")
         progress_window.label.pack(pady=10)
         
         progress_window.bar = ttk.Progressbar(progress_window, orient="horizontal", 
                                             length=250, mode="determinate", maximum=total)
-        progress_window.bar.pack(pady=10)
+        progress_window.bar.pack(pady=5)
+        
+        if cancel is not None:
+            ttk.Button(progress_window, text="Cancelar", command=cancel).pack(pady=5)
+            progress_window.protocol("WM_DELETE_WINDOW", cancel)
         
-        progress_window.update()
         return progress_window
     
     def _update_progress(self, window, current, total):
         """Actualiza la barra de progreso"""
         window.bar["value"] = current
         window.label.config(text=f"Procesando imagen {current} de {total}")
-        window.update()
+    
+    def _open_journal(self):
+        """Abre el diario de ediciones del data.csv y recupera lo no guardado"""
+        if self.journal is not None:
+            self.journal.close()
+        self.journal = EditJournal(journal_path(self.data_csv_file))
+        self.unsaved_deletions = False
+        events = self.journal.replay()
+        if events:
+            self._apply_journal(events)
+            messagebox.showinfo("Información",
+                f"Se recuperaron {len(events)} ediciones sin guardar de la sesión anterior")
+    
+    def _apply_journal(self, events):
+        """Reaplica las ediciones del diario sobre los datos recién cargados
+
+        Las eliminaciones se registran por timestamp, no por fila, para que sigan
+        apuntando a la misma imagen aunque data.csv se haya reescrito sin filas.
+        """
+        timestamps = {str(ts): ts for ts in self.data_df['timestamp']}
+        index_of = {str(ts): i for i, ts in enumerate(self.data_df['timestamp'])}
+        for event in events:
+            op = event.get('op')
+            if op == 'point' and event['ts'] in timestamps and event['i'] < self.n_points:
+                self.temp_data.set_point(timestamps[event['ts']], event['i'], event['point'])
+            elif op == 'defaults' and len(event['positions']) == self.n_points:
+                self.default_positions = [tuple(pos) for pos in event['positions']]
+                self.reference_image_index = event.get('reference')
+                self.first_points_set = True
+            elif op == 'delete' and 'ts' in event:
+                for ts in event['ts']:
+                    if ts in index_of:
+                        self.deleted_images.add(index_of[ts])
+                        self.temp_data.drop(timestamps[ts])
+                self.unsaved_deletions = True
+            elif op == 'restore' and event.get('ts') in index_of:
+                index = index_of[event['ts']]
+                self.deleted_images.discard(index)
+                self.suggested_deletions.pop(index, None)
+                self.unsaved_deletions = True
+            elif op == 'suggest':
+                self._apply_suggestions({index_of[ts]: reason for ts, reason in event['reasons'].items()
+                                         if ts in index_of})
+    
+    def _log_edit(self, event):
+        if self.journal is None:
+            return
+        try:
+            self.journal.append(event)
+        except OSError as e:
+            print(f"No se pudo escribir el diario de ediciones: {str(e)}")
+    
+    def _has_unsaved_changes(self):
+        return bool(self.temp_data.dirty) or self.unsaved_deletions
     
     def _update_dataframe_with_temperatures(self):
         """Actualiza el DataFrame con datos de temperatura"""
-        for timestamp, points in self.temp_data.items():
-            idx = self.data_df[self.data_df['timestamp'] == timestamp].index
-            if len(idx) == 0:
-                continue
-            
-            for i, point_data in enumerate(points):
-                if point_data is not None:
-                    self.data_df.loc[idx, f'temp_point{i+1}'] = point_data['temperature']
-                    self.data_df.loc[idx, f'x_point{i+1}'] = point_data['x']
-                    self.data_df.loc[idx, f'y_point{i+1}'] = point_data['y']
+        self.temp_data.merge_into(self.data_df, only_dirty=True)
+    
+    def _write_data_csv(self):
+        """Escribe data.csv con lo editado y vacía el diario (compactación)"""
+        self._update_dataframe_with_temperatures()
+        self._save_filtered_dataframe()
+        self.temp_data.clear_dirty()
+        self.unsaved_deletions = False
+        if self.journal is not None:
+            self.journal.clear()
     
     def _save_filtered_dataframe(self):
         """Guarda el DataFrame excluyendo filas eliminadas"""
         # Crear DataFrame filtrado (excluir imágenes eliminadas)
-        valid_indices = [i for i in range(len(self.data_df)) if i not in self.deleted_images]
-        filtered_df = self.data_df.iloc[valid_indices].copy()
+        keep = np.ones(len(self.data_df), dtype=bool)
+        keep[list(self.deleted_images)] = False
+        filtered_df = self.data_df[keep]
         
-        # Guardar DataFrame filtrado
-        filtered_df.to_csv(self.data_csv_file, index=False)
+        # Guardar DataFrame filtrado (escritura atómica)
+        tmp_path = self.data_csv_file + ".tmp"
+        filtered_df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, self.data_csv_file)
         
         if self.deleted_images:
             print(f"Se excluyeron {len(self.deleted_images)} imágenes del archivo final")
@@ -563,16 +1127,30 @@ class TemperatureAnalyzer:
     def _on_closing(self):
         """Maneja el cierre de la ventana"""
         try:
-            plt.close('all')
-            if self.temp_data and messagebox.askyesno("Guardar", 
-                "¿Desea guardar los datos antes de salir?"):
-                self._save_data()
-            self.root.destroy()
+            if self.batch_runner is not None:
+                self.batch_runner.cancel()
+                return
+            if self._has_unsaved_changes():
+                if messagebox.askyesno("Guardar", "¿Desea guardar los datos antes de salir?"):
+                    # El cierre espera a que termine un posible procesamiento en lote
+                    if self._save_data(on_complete=self._close_window):
+                        return
+                elif self.journal is not None:
+                    # Ediciones descartadas: no recuperarlas en la siguiente sesión
+                    self.journal.clear()
+            self._close_window()
         except Exception as e:
             print(f"Error al cerrar: {str(e)}")
             self.root.destroy()
             sys.exit(0)
 
+    def _close_window(self):
+        if self.journal is not None:
+            self.journal.close()
+        self.image_cache.close()
+        plt.close('all')
+        self.root.destroy()
+
 if __name__ == "__main__":
     root = tk.Tk()
     app = TemperatureAnalyzer(root)
@@ -0,0 +1,19 @@
+import numpy as np
+
+from pointTracking import match_point
+
+
+def test_flat_template_keeps_previous_position():
+    prev_gray = np.full((120, 160), 128, dtype=np.uint8)
+    gray = prev_gray.copy()
+    gray[10:20, 10:20] = 200  # Textura en otra parte de la ventana de búsqueda
+    assert match_point(prev_gray, gray, (80, 60)) == ((80, 60), 0.0)
+
+
+def test_textured_template_follows_motion():
+    rng = np.random.default_rng(0)
+    prev_gray = (rng.random((120, 160)) * 255).astype(np.uint8)
+    gray = np.roll(prev_gray, (3, 5), axis=(0, 1))
+    pos, score = match_point(prev_gray, gray, (80, 60))
+    assert pos == (85, 63)
+    assert score > 0.99
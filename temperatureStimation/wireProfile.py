@@ -0,0 +1,117 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+from batchProcessing import frame_lut, load_rgb
+
+PROFILE_FILE = 'profile.npy'
+INDEX_FILE = 'index.csv'
+PATH_FILE = 'path.json'
+SUMMARY_COLUMNS = ('wire_temp_mean', 'wire_temp_max', 'wire_max_pos_px', 'wire_grad_max')
+
+
+def _catmull_rom(vertices, samples_per_segment=20):
+    """Curva Catmull-Rom que pasa por todos los vértices"""
+    pts = np.vstack([vertices[:1], vertices, vertices[-1:]])
+    t = np.linspace(0, 1, samples_per_segment, endpoint=False)[:, None]
+    curve = []
+    for i in range(1, len(pts) - 2):
+        p0, p1, p2, p3 = pts[i - 1], pts[i], pts[i + 1], pts[i + 2]
+        curve.append(0.5 * (2 * p1 + (p2 - p0) * t + (2 * p0 - 5 * p1 + 4 * p2 - p3) * t**2 +
+                            (3 * p1 - p0 - 3 * p2 + p3) * t**3))
+    curve.append(vertices[-1:])
+    return np.vstack(curve)
+
+
+def resample_path(vertices, spacing=1.0, spline=False):
+    """Puntos equiespaciados (cada `spacing` px) a lo largo de la trayectoria; regresa (xy, arco)"""
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 2)
+    if len(vertices) < 2:
+        raise ValueError("La trayectoria necesita al menos dos vértices")
+    dense = _catmull_rom(vertices) if spline and len(vertices) > 2 else vertices
+
+    segment = np.hypot(*np.diff(dense, axis=0).T)
+    cumulative = np.concatenate([[0.0], np.cumsum(segment)])
+    arc = np.arange(0.0, cumulative[-1] + 1e-9, spacing)
+    if cumulative[-1] - arc[-1] > 1e-6:
+        arc = np.append(arc, cumulative[-1])
+    xy = np.column_stack([np.interp(arc, cumulative, dense[:, 0]),
+                          np.interp(arc, cumulative, dense[:, 1])])
+    return xy, arc
+
+
+def sample_profile(rgb, xy, infer):
+    """Temperatura bilineal en posiciones subpixel: se infieren los 4 vecinos y se interpola"""
+    height, width = rgb.shape[:2]
+    x = np.clip(xy[:, 0], 0, width - 1)
+    y = np.clip(xy[:, 1], 0, height - 1)
+    x0 = np.minimum(np.floor(x).astype(np.int64), width - 2) if width > 1 else np.zeros(len(x), np.int64)
+    y0 = np.minimum(np.floor(y).astype(np.int64), height - 2) if height > 1 else np.zeros(len(y), np.int64)
+    x1 = np.minimum(x0 + 1, width - 1)
+    y1 = np.minimum(y0 + 1, height - 1)
+    fx, fy = x - x0, y - y0
+
+    corners = np.stack([rgb[y0, x0, :3], rgb[y0, x1, :3], rgb[y1, x0, :3], rgb[y1, x1, :3]], axis=1)
+    t = np.asarray(infer(corners), dtype=np.float64)
+    return ((1 - fx) * (1 - fy) * t[:, 0] + fx * (1 - fy) * t[:, 1] +
+            (1 - fx) * fy * t[:, 2] + fx * fy * t[:, 3])
+
+
+def profile_summary(profile, arc):
+    """Media, máximo, posición del máximo y gradiente máximo |dT/ds| (°C/px) de un perfil"""
+    if len(profile) > 1:
+        gradient = np.abs(np.gradient(profile, arc))
+        grad_max = float(np.nanmax(gradient))
+    else:
+        grad_max = np.nan
+    peak = int(np.nanargmax(profile))
+    return float(np.nanmean(profile)), float(profile[peak]), float(arc[peak]), grad_max
+
+
+def prepare_profile(image_paths, timestamps, xy, arc, vertices, spline, output_dir):
+    """Crea el arreglo tiempo × arco vacío, su índice y la definición de la trayectoria"""
+    os.makedirs(output_dir, exist_ok=True)
+    profile_path = os.path.join(output_dir, PROFILE_FILE)
+    profile = np.lib.format.open_memmap(profile_path, mode='w+', dtype=np.float32,
+                                        shape=(len(image_paths), len(arc)))
+    profile[:] = np.nan
+    del profile
+
+    pd.DataFrame({
+        'frame': np.arange(len(image_paths)),
+        'timestamp': [str(ts) for ts in timestamps],
+        'image': [os.path.basename(p) for p in image_paths]
+    }).to_csv(os.path.join(output_dir, INDEX_FILE), index=False)
+    with open(os.path.join(output_dir, PATH_FILE), 'w') as f:
+        json.dump({'vertices': np.asarray(vertices).tolist(), 'spline': bool(spline),
+                   'xy': xy.tolist(), 'arc_px': arc.tolist()}, f)
+    return profile_path, [(frame, ts, path) for frame, (ts, path) in enumerate(zip(timestamps, image_paths))]
+
+
+def fill_profile_chunk(tasks, profile_path, xy, arc, offsets=None):
+    """Muestrea el perfil de un bloque de (fila, timestamp, ruta); regresa los resúmenes por cuadro"""
+    profile = np.load(profile_path, mmap_mode='r+')
+    xy = np.asarray(xy, dtype=np.float64)
+    arc = np.asarray(arc, dtype=np.float64)
+    summaries = []
+    errors = []
+    for frame, ts, path in tasks:
+        try:
+            offset = offsets.get(os.path.basename(path), (0.0, 0.0)) if offsets else (0.0, 0.0)
+            values = sample_profile(load_rgb(path), xy + np.asarray(offset), frame_lut(path).lookup)
+            profile[frame] = values
+            summaries.append((ts, *profile_summary(values, arc)))
+        except Exception as e:
+            errors.append(f"Error procesando {path}: {str(e)}")
+    profile.flush()
+    return len(tasks), (summaries, errors)
+
+
+def merge_summaries(data_df, summaries):
+    """Agrega las columnas de resumen del perfil a data_df con un join por timestamp"""
+    summary = pd.DataFrame(summaries, columns=('timestamp',) + SUMMARY_COLUMNS).set_index('timestamp')
+    merged = data_df[['timestamp']].join(summary, on='timestamp')
+    for col in SUMMARY_COLUMNS:
+        data_df[col] = merged[col].values
+    return data_df